@@ -0,0 +1,100 @@
+"""
+Benchmark: negatives bulk file generation.
+Compares the streaming XLSX writer (services/xlsx_writer.py) and the CSV
+writer (services/bulk_writer.py) with the previous DataFrame + openpyxl path,
+reporting rows/s and peak RSS. Each run happens in a fresh interpreter so peak
+RSS isn't shared between them.
+
+Usage (from backend/):
+    python -m benchmarks.bulk_writer [--rows 50000]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+def _items(count: int) -> list:
+    return [
+        {
+            'customer_search_term': f'b0{i:08d}' if i % 5 == 0 else f'search term number {i}',
+            'campaign_name': f'Campaign {i % 200}',
+            'ad_group_name': f'Ad Group {i % 1000}',
+            'campaign_id': str(100000000 + i % 200),
+            'ad_group_id': str(200000000 + i % 1000),
+            'is_asin': i % 5 == 0,
+        }
+        for i in range(count)
+    ]
+
+
+def _openpyxl_file(items: list):
+    """The pre-streaming implementation: list of dicts -> DataFrame -> openpyxl."""
+    from io import BytesIO
+    import pandas as pd
+    from services.negative_generator import BULK_HEADERS, iter_negative_rows
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df = pd.DataFrame([row.to_dict() for row in iter_negative_rows(items)], columns=BULK_HEADERS)
+        df.to_excel(writer, sheet_name='Sponsored Products Campaigns', index=False)
+    output.seek(0)
+    return output
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run(method: str, rows: int) -> dict:
+    from services.negative_generator import generate_negatives_bulk_file
+
+    items = _items(rows)
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    if method == 'openpyxl':
+        output = _openpyxl_file(items)
+    else:
+        output = generate_negatives_bulk_file(items, format='csv' if method == 'csv' else 'xlsx')
+    elapsed = time.perf_counter() - started
+    return {
+        'method': method,
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_over_input_mb': round(_peak_rss_mb() - baseline, 1),
+        'file_kb': round(len(output.getvalue()) / 1024),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--method', choices=['streaming', 'csv', 'openpyxl'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        print(json.dumps(_run(args.method, args.rows)))
+        return
+
+    for method in ('streaming', 'csv', 'openpyxl'):
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bulk_writer', '--rows', str(args.rows), '--method', method],
+            check=True, capture_output=True, text=True
+        )
+        stats = json.loads(result.stdout)
+        print(
+            f"{stats['method']:>10}: {stats['rows']} rows in {stats['seconds']}s "
+            f"({stats['rows_per_second']} rows/s), peak RSS {stats['peak_rss_mb']} MB "
+            f"(+{stats['peak_rss_over_input_mb']} MB over input), {stats['file_kb']} KB"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: dictionary-encoded session columns.
+Compares a processed report whose name columns (CATEGORICAL_COLUMNS in
+services/parser.py) are plain strings with the same report dictionary-encoded,
+as stored sessions are: memory of the name columns and of the whole frame, and
+latency of the equality filters used by routers/analysis.py,
+calculate_campaign_metrics and analyze_budget_saturation. Results are checked
+to be identical for both encodings.
+
+Usage (from backend/):
+    python -m benchmarks.categorical [--rows 1000000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.analyzer import calculate_campaign_metrics
+from services.optimization import analyze_budget_saturation
+from services.parser import CATEGORICAL_COLUMNS
+
+
+def _report(rows: int) -> pd.DataFrame:
+    """Processed Search Term Report with str name columns (the pre-encoding layout)."""
+    rng = np.random.default_rng(0)
+    campaigns = rng.integers(0, 500, rows)
+    clicks = rng.integers(0, 40, rows).astype('int32')
+    spend = (clicks * rng.uniform(0.1, 1.2, rows)).round(2)
+    orders = np.where(rng.random(rows) < 0.3, rng.integers(1, 8, rows), 0).astype('int32')
+    return pd.DataFrame({
+        'Campaign Name': [f'Campaign {i}' for i in campaigns],
+        'Ad Group Name': [f'Ad Group {i}' for i in rng.integers(0, 2000, rows)],
+        'Targeting': [f'keyword {i}' for i in rng.integers(0, 20000, rows)],
+        'Match Type': rng.choice(['EXACT', 'PHRASE', 'BROAD', '-'], rows).astype(object),
+        'Portfolio': [f'Portfolio {i % 20}' for i in campaigns],
+        'Customer Search Term': [f'search term {i}' for i in rng.integers(0, rows // 4 + 1, rows)],
+        'Impressions': (clicks * rng.integers(5, 200, rows)).astype('int32'),
+        'Clicks': clicks,
+        'Spend': spend,
+        'Sales': (orders * rng.uniform(10, 60, rows)).round(2),
+        'Orders': orders,
+    })
+
+
+def _encoded(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def _mb(df: pd.DataFrame, columns=None) -> float:
+    usage = df.memory_usage(deep=True, index=False)
+    if columns is not None:
+        usage = usage[columns]
+    return usage.sum() / (1024 * 1024)
+
+
+def _operations(df: pd.DataFrame) -> dict:
+    campaign = 'Campaign 7'
+    ad_group = 'Ad Group 42'
+    campaigns = sorted(set(df['Campaign Name']))
+    bulk_df = pd.DataFrame({'Campaign Name': campaigns, 'Daily Budget': np.linspace(10, 200, len(campaigns))})
+    return {
+        'filter by campaign': lambda: df[df['Campaign Name'] == campaign],
+        'filter by campaign + ad group': lambda: df[(df['Campaign Name'] == campaign) & (df['Ad Group Name'] == ad_group)],
+        'calculate_campaign_metrics': lambda: calculate_campaign_metrics(df),
+        'analyze_budget_saturation': lambda: analyze_budget_saturation(df, bulk_df),
+    }
+
+
+def _time(fn, repeat: int):
+    """Best of `repeat` runs, in ms, and the last result."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def _same(left, right) -> bool:
+    if isinstance(left, pd.DataFrame):
+        return left.astype(str).reset_index(drop=True).equals(right.astype(str).reset_index(drop=True))
+    return left == right
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    plain = _report(args.rows)
+    encoded = _encoded(plain)
+    print(
+        f"{'name columns':>30}: {_mb(plain, CATEGORICAL_COLUMNS):.0f} MB -> "
+        f"{_mb(encoded, CATEGORICAL_COLUMNS):.0f} MB "
+        f"(session {_mb(plain):.0f} MB -> {_mb(encoded):.0f} MB)"
+    )
+
+    plain_ops = _operations(plain)
+    encoded_ops = _operations(encoded)
+    for name in plain_ops:
+        plain_ms, plain_result = _time(plain_ops[name], args.repeat)
+        encoded_ms, encoded_result = _time(encoded_ops[name], args.repeat)
+        status = 'identical' if _same(plain_result, encoded_result) else 'MISMATCH'
+        print(f"{name:>30}: {plain_ms:.1f} ms -> {encoded_ms:.1f} ms ({status})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: metric column cleaning in process_search_term_report.
+Compares the vectorized cleaning kernels with the previous per-cell
+Series.apply(clean_*) path on formatted metric strings ('$1,234.56', '12.5%',
+'1,234'), reporting rows/s.
+
+Usage (from backend/):
+    python -m benchmarks.cleaning [--rows 1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.parser import (
+    CURRENCY_COLUMNS,
+    INTEGER_COLUMNS,
+    PERCENTAGE_COLUMNS,
+    clean_currency,
+    clean_integer,
+    clean_percentage,
+    process_search_term_report,
+)
+
+
+def _report(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    money = rng.uniform(0, 5000, rows)
+    return pd.DataFrame({
+        'Campaign Name': [f'Campaign {i}' for i in rng.integers(0, 200, rows)],
+        'Impressions': [f'{v:,}' for v in rng.integers(0, 100000, rows)],
+        'Clicks': [f'{v:,}' for v in rng.integers(0, 2000, rows)],
+        'Spend': [f'${v:,.2f}' for v in money],
+        '7 Day Total Sales ($)': [f'${v:,.2f}' for v in money * 3],
+        '7 Day Total Orders (#)': rng.integers(0, 20, rows).astype(str),
+        'Total Advertising Cost of Sales (ACoS) ': [f'{v:.2f}%' for v in rng.uniform(0, 200, rows)],
+        'Click-Thru Rate (CTR)': [f'{v:.4f}%' for v in rng.uniform(0, 5, rows)],
+    })
+
+
+def _apply_path(raw: pd.DataFrame) -> pd.DataFrame:
+    df = raw.rename(columns={
+        '7 Day Total Sales ($)': 'Sales',
+        '7 Day Total Orders (#)': 'Orders',
+        'Total Advertising Cost of Sales (ACoS) ': 'ACOS',
+        'Click-Thru Rate (CTR)': 'CTR',
+    })
+    helpers = (
+        [(col, clean_integer) for col in INTEGER_COLUMNS]
+        + [(col, clean_currency) for col in CURRENCY_COLUMNS]
+        + [(col, clean_percentage) for col in PERCENTAGE_COLUMNS]
+    )
+    for col, helper in helpers:
+        if col in df.columns:
+            df[col] = df[col].apply(helper)
+    return df
+
+
+def _time(fn, raw: pd.DataFrame) -> float:
+    started = time.perf_counter()
+    fn(raw.copy())
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw = _report(args.rows)
+    for name, fn in (('vectorized', process_search_term_report), ('apply', _apply_path)):
+        seconds = _time(fn, raw)
+        print(f"{name:>10}: {args.rows} rows in {seconds:.2f}s ({round(args.rows / seconds)} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
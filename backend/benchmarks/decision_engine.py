@@ -0,0 +1,89 @@
+"""
+Benchmark: Decision Center computation.
+Compares the fused run_decision_engine (services/optimization.py) with calling
+analyze_bleeding_spend, analyze_high_acos, analyze_scale_opportunities,
+analyze_budget_saturation and calculate_health_score one after another, as
+the Decision Center route did before, on a processed report fixture. (The
+analyze_* functions share the engine's item builders, so the difference is the
+repeated scans, totals and rule evaluations.)
+
+Usage (from backend/):
+    python -m benchmarks.decision_engine [--rows 1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.optimization import (
+    analyze_bleeding_spend,
+    analyze_budget_saturation,
+    analyze_high_acos,
+    analyze_scale_opportunities,
+    calculate_health_score,
+    run_decision_engine,
+)
+
+
+def _report(rows: int) -> pd.DataFrame:
+    """Processed Search Term Report (canonical columns, cleaned types)."""
+    rng = np.random.default_rng(0)
+    clicks = rng.integers(0, 40, rows).astype('int32')
+    impressions = (clicks * rng.integers(5, 200, rows)).astype('int32')
+    spend = (clicks * rng.uniform(0.1, 1.2, rows)).round(2)
+    orders = np.where(rng.random(rows) < 0.3, rng.integers(1, 8, rows), 0).astype('int32')
+    sales = (orders * rng.uniform(10, 60, rows)).round(2)
+    acos = np.where(sales > 0, spend / np.where(sales > 0, sales, 1) * 100, np.nan)
+    targeting = np.where(rng.random(rows) < 0.2, [f'b0{i:08d}' for i in rng.integers(0, 5000, rows)], 'loose-match')
+    return pd.DataFrame({
+        'Campaign Name': pd.Categorical([f'Campaign {i}' for i in rng.integers(0, 500, rows)]),
+        'Ad Group Name': pd.Categorical([f'Ad Group {i}' for i in rng.integers(0, 2000, rows)]),
+        'Targeting': pd.Categorical(targeting),
+        'Match Type': pd.Categorical(rng.choice(['Exact', 'Phrase', 'Broad', '-'], rows)),
+        'Customer Search Term': [f'search term {i}' for i in rng.integers(0, rows // 4 + 1, rows)],
+        'Impressions': impressions,
+        'Clicks': clicks,
+        'Spend': spend,
+        'Sales': sales,
+        'Orders': orders,
+        'ACOS': acos,
+        'CTR': np.divide(clicks, impressions, out=np.zeros(rows), where=impressions > 0) * 100,
+        'CPC': np.divide(spend, clicks, out=np.zeros(rows), where=clicks > 0),
+        'Conversion Rate': np.divide(orders, clicks, out=np.zeros(rows), where=clicks > 0) * 100,
+    })
+
+
+def _bulk(df: pd.DataFrame) -> pd.DataFrame:
+    campaigns = df['Campaign Name'].cat.categories
+    return pd.DataFrame({'Campaign Name': campaigns, 'Daily Budget': np.linspace(10, 200, len(campaigns))})
+
+
+def _sequential(df: pd.DataFrame, bulk_df: pd.DataFrame) -> dict:
+    return {
+        'bleeding_spend': analyze_bleeding_spend(df),
+        'high_acos': analyze_high_acos(df),
+        'scale_opportunities': analyze_scale_opportunities(df),
+        'budget_saturation': analyze_budget_saturation(df, bulk_df),
+        'health_score': calculate_health_score(df),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = _report(args.rows)
+    bulk_df = _bulk(df)
+    for name, fn in (('fused', run_decision_engine), ('sequential', _sequential)):
+        started = time.perf_counter()
+        result = fn(df, bulk_df)
+        seconds = time.perf_counter() - started
+        counts = ', '.join(f"{key} {len(value)}" for key, value in result.items() if isinstance(value, list))
+        print(f"{name:>10}: {args.rows} rows in {seconds:.2f}s ({counts})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: Bulk Operations workbook parsing.
+Compares the streaming XLSX reader (services/xlsx_reader.py, via parse_file)
+with the previous pd.read_excel(sheet_name=None) path on a multi-sheet Bulk
+Operations workbook, reporting time and peak RSS. Each run happens in a fresh
+interpreter so peak RSS isn't shared between them.
+
+The fixture has 5 sheets and 48 columns: --rows rows on the Sponsored Products
+sheet, with SB/SD campaigns, search terms and portfolios sheets around it.
+It is written once per row count to the temp directory and reused.
+
+Usage (from backend/):
+    python -m benchmarks.xlsx_reader [--rows 20000]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Sheet name -> rows as a multiple of --rows (SP sheet first in priority, not in position)
+SHEETS = [
+    ('Portfolios', 0.01),
+    ('Sponsored Brands Campaigns', 1.0),
+    ('Sponsored Products Campaigns', 1.0),
+    ('Sponsored Display Campaigns', 1.0),
+    ('SP Search Term Report', 1.0),
+]
+
+COLUMNS = [
+    'Product', 'Entity', 'Operation', 'Campaign ID', 'Ad Group ID', 'Portfolio ID', 'Ad ID',
+    'Keyword ID', 'Product Targeting ID', 'Campaign Name', 'Ad Group Name',
+    'Campaign Name (Informational only)', 'Ad Group Name (Informational only)',
+    'Portfolio Name (Informational only)', 'Start Date', 'End Date', 'Targeting Type', 'State',
+    'Campaign State (Informational only)', 'Ad Group State (Informational only)', 'Daily Budget',
+    'SKU', 'ASIN (Informational only)', 'Eligibility Status (Informational only)',
+    'Reason for Ineligibility (Informational only)', 'Ad Group Default Bid',
+    'Ad Group Default Bid (Informational only)', 'Bid', 'Keyword Text', 'Native Language Keyword',
+    'Native Language Locale', 'Match Type', 'Bidding Strategy', 'Placement', 'Percentage',
+    'Product Targeting Expression', 'Resolved Product Targeting Expression (Informational only)',
+    'Impressions', 'Clicks', 'Click-through Rate', 'Spend', 'Sales', 'Orders', 'Units',
+    'Conversion Rate', 'ACOS', 'CPC', 'ROAS',
+]
+
+ENTITIES = ['Campaign', 'Ad Group', 'Product Ad', 'Keyword', 'Product Targeting', 'Bidding Adjustment']
+MATCH_TYPES = ['exact', 'phrase', 'broad']
+
+
+def _row(i: int) -> list:
+    campaign = i % 500
+    ad_group = i % 2000
+    clicks = i % 40
+    spend = round(clicks * 0.73, 2)
+    sales = round(spend * (i % 7) * 0.9, 2)
+    return [
+        'Sponsored Products', ENTITIES[i % len(ENTITIES)], '', 100000000 + campaign, 200000000 + ad_group,
+        300000 + campaign % 20, 400000000 + i, 500000000 + i, '',
+        f'Campaign {campaign}', f'Ad Group {ad_group}', f'Campaign {campaign}', f'Ad Group {ad_group}',
+        f'Portfolio {campaign % 20}', '20250101', '', 'Manual', 'enabled', 'enabled', 'enabled',
+        10 + campaign % 90, f'SKU-{i}', f'B0{i:08d}', 'Eligible', '', 0.75, 0.75, 0.5 + (i % 30) / 10,
+        f'keyword {i}', '', '', MATCH_TYPES[i % 3], 'Dynamic bids - down only', '', '',
+        '', '', 1000 + i % 9000, clicks, clicks / 1000, spend, sales, i % 5, i % 6,
+        0.1, spend / sales if sales else 0, spend / clicks if clicks else 0, sales / spend if spend else 0,
+    ]
+
+
+def _fixture(rows: int) -> str:
+    """Write (or reuse) the multi-sheet workbook for `rows` SP rows."""
+    path = os.path.join(tempfile.gettempdir(), f'bulk_benchmark_{rows}.xlsx')
+    if os.path.exists(path):
+        return path
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for name, scale in SHEETS:
+        sheet = workbook.create_sheet(name)
+        sheet.append(COLUMNS)
+        for i in range(max(int(rows * scale), 1)):
+            sheet.append(_row(i))
+    workbook.save(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run(method: str, path: str) -> dict:
+    from io import BytesIO
+    import pandas as pd
+    from services.parser import is_bulk_file_column, parse_file, select_sheet
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    if method == 'read_excel':
+        # The pre-streaming implementation: parse every sheet, then pick one
+        sheets = pd.read_excel(BytesIO(content), sheet_name=None)
+        df = sheets[select_sheet(list(sheets))]
+    else:
+        df = parse_file(content, 'bulk.xlsx', usecols=is_bulk_file_column if method == 'bulk_columns' else None)
+    elapsed = time.perf_counter() - started
+    return {
+        'method': method,
+        'rows': len(df),
+        'columns': len(df.columns),
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_over_input_mb': round(_peak_rss_mb() - baseline, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--method', choices=['read_excel', 'all_columns', 'bulk_columns'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    path = _fixture(args.rows)
+    if args.method:
+        print(json.dumps(_run(args.method, path)))
+        return
+
+    print(f'{path}: {os.path.getsize(path) / (1024 * 1024):.1f} MB, {len(SHEETS)} sheets, {len(COLUMNS)} columns')
+    for method in ('bulk_columns', 'all_columns', 'read_excel'):
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.xlsx_reader', '--rows', str(args.rows), '--method', method],
+            check=True, capture_output=True, text=True
+        )
+        stats = json.loads(result.stdout)
+        print(
+            f"{stats['method']:>12}: {stats['rows']} rows x {stats['columns']} columns in {stats['seconds']}s, "
+            f"peak RSS {stats['peak_rss_mb']} MB (+{stats['peak_rss_over_input_mb']} MB over input)"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -3,16 +3,30 @@ Amazon PPC Analyzer - Backend API
 FastAPI application for analyzing Amazon PPC data and generating bulk upload files.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from routers import upload, analysis, export
+from routers import upload, analysis, export, jobs
+from routers.upload import ingestion_plans
+from services.compute_pool import compute_pool, loop_lag
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_lag.start()
+    yield
+    await loop_lag.stop()
+    compute_pool.shutdown()
+
 
 app = FastAPI(
     title="Amazon PPC Analyzer API",
     description="API for analyzing Amazon PPC performance and generating bulk upload files",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for Next.js frontend
@@ -28,6 +42,7 @@ app.add_middleware(
 app.include_router(upload.router, prefix="/api/upload", tags=["Upload"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["Analysis"])
 app.include_router(export.router, prefix="/api/export", tags=["Export"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
 
 
 @app.get("/")
@@ -42,5 +57,11 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+async def metrics():
+    """Event-loop lag, compute pool and ingestion plan counters of this worker."""
+    return {**loop_lag.stats(), "compute_pool": compute_pool.stats(), "ingestion_plans": ingestion_plans.stats()}
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -21,9 +21,34 @@ class UploadResponse(BaseModel):
     columns: List[str]
     date_range: Optional[dict] = None
     campaigns: List[str] = []
+    memory_bytes: Optional[int] = None  # In-memory size of the session data
     message: str
 
 
+class UploadProgress(BaseModel):
+    """Progress of a streamed upload, polled by the client while it is processed."""
+    upload_id: str
+    status: str  # processing, done, failed
+    bytes_processed: int = 0
+    total_bytes: Optional[int] = None
+    rows_processed: int = 0
+    percent: Optional[float] = None
+    session_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobStatus(BaseModel):
+    """State of a background job, polled by the client until it finishes."""
+    job_id: str
+    kind: str  # search_term_report, search_terms
+    status: str  # queued, running, done, failed, cancelled
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = {}
+    error: Optional[str] = None
+
+
 class ValidationError(BaseModel):
     """File validation error details."""
     error: str
@@ -109,6 +134,48 @@ class AnalysisResponse(BaseModel):
     results: List[SearchTermResult]
 
 
+class RuleDefinition(BaseModel):
+    """A declarative rule, e.g. "Spend >= 10 and Sales == 0 and not is_asin(Targeting)"."""
+    name: str
+    expression: str
+    action: Optional[str] = None
+
+
+class RuleSetRequest(BaseModel):
+    """Custom rule set evaluated in one pass over the session data."""
+    rules: List[RuleDefinition] = []
+    rules_text: Optional[str] = Field(default=None, description="Rule set as a JSON/YAML document")
+    params: Dict[str, float] = Field(default={}, description="Named parameters referenced by the rules")
+
+
+class RuleMatch(BaseModel):
+    """A row matched by a custom rule (first matching rule wins)."""
+    id: int
+    rule: str
+    action: Optional[str] = None
+    campaign_name: Optional[str] = None
+    ad_group_name: Optional[str] = None
+    targeting: Optional[str] = None
+    match_type: Optional[str] = None
+    customer_search_term: Optional[str] = None
+    spend: float = 0.0
+    sales: float = 0.0
+
+
+class RuleEvaluationResponse(BaseModel):
+    """Response from custom rule evaluation."""
+    total_rows: int
+    total_matched: int
+    rule_counts: Dict[str, int]
+    results: List[RuleMatch]
+
+
+class BulkFileFormat(str, Enum):
+    XLSX = "xlsx"
+    CSV = "csv"
+    TSV = "tsv"
+
+
 class NegativeExportRequest(BaseModel):
     """Request for generating negative bulk file."""
     session_id: str
@@ -225,6 +292,18 @@ class FilterOptions(BaseModel):
     date_range: dict
 
 
+class CacheStats(BaseModel):
+    """Counters of this worker's analysis result cache."""
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: Optional[int] = None
+    max_entries: Optional[int] = None
+
+
 class BleedingSpendItem(BaseModel):
     """Item for Bleeding Spend widget (Immediate Negatives)."""
     id: Optional[int] = None
@@ -4,10 +4,11 @@ Provides endpoints for KPIs, campaign metrics, and search term analysis.
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, List
+from typing import Any, Callable, Optional, List
 import pandas as pd
 
 from models.schemas import (
+    CacheStats,
     KPIData,
     CampaignMetrics,
     MonthlyData,
@@ -20,7 +21,10 @@ from models.schemas import (
     HighACOSItem,
     ScaleOpportunityItem,
     BudgetSaturationItem,
-    HealthScore
+    HealthScore,
+    RuleSetRequest,
+    RuleMatch,
+    RuleEvaluationResponse
 )
 from services.analyzer import (
     calculate_kpis,
@@ -33,26 +37,28 @@ from services.parser import (
     get_unique_campaigns, 
     get_unique_ad_groups, 
     get_unique_portfolios, 
-    get_date_range,
-    enrich_with_ids
+    get_date_range
+)
+from services.bulk_index import enrich_with_ids
+from services.rules import RuleError, load_rules, evaluate_rules, first_matching_rule
+from services.compute_pool import run_cpu
+from services.result_cache import make_key
+from services.session_index import take_rows
+from routers.upload import (
+    get_session, get_session_index, get_session_cube, get_bulk_index, sessions, result_cache
 )
-from routers.upload import get_session, sessions
 
 router = APIRouter()
 
 
-@router.get("/kpis/{session_id}", response_model=KPIData)
-async def get_kpis(
-    session_id: str,
-    campaign: Optional[str] = Query(None, description="Filter by campaign name"),
-    ad_group: Optional[str] = Query(None, description="Filter by ad group name"),
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
-):
-    """Get aggregated KPI metrics for the uploaded data."""
-    df = get_session(session_id)
-    
-    # Apply filters
+def filter_rows(
+    df: pd.DataFrame,
+    campaign: Optional[str] = None,
+    ad_group: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """Apply the dashboard filters with boolean masks (raw rows or metrics cube cells)."""
     if campaign:
         df = df[df['Campaign Name'] == campaign]
     if ad_group:
@@ -61,9 +67,124 @@ async def get_kpis(
         df = df[df['Date'] >= start_date]
     if end_date:
         df = df[df['Date'] <= end_date]
+    return df
+
+
+def filter_session(
+    session_id: str,
+    df: pd.DataFrame,
+    campaign: Optional[str] = None,
+    ad_group: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Rows of the session matching the filters. Uses the session's filter index so
+    only the matching rows are touched; falls back to boolean masks otherwise.
+    """
+    if not (campaign or ad_group or start_date or end_date):
+        return df
+    positions = get_session_index(session_id, df).select(df, campaign, ad_group, start_date, end_date)
+    if positions is not None:
+        return take_rows(df, positions)
+    return filter_rows(df, campaign, ad_group, start_date, end_date)
+
+
+def filter_cube(session_id: str, df: pd.DataFrame, **filters) -> pd.DataFrame:
+    """Metrics cube cells of the session matching the filters (see services/metrics_cube.py)."""
+    return filter_rows(get_session_cube(session_id, df), **filters)
+
+
+def cached(endpoint: str, session_id: str, compute: Callable[[], Any], with_bulk: bool = False, **params) -> Any:
+    """
+    Serve a response from the result cache, computing it on a miss. The key
+    includes the stored versions of the session (and its bulk file), so a
+    replaced upload is never answered from old results.
+    """
+    version = sessions.version(session_id)
+    if version is None:
+        return compute()  # Missing session (404) or a store without versions
+    versions = (version, sessions.version(f"{session_id}_bulk")) if with_bulk else (version,)
+    return result_cache.get_or_compute(make_key(session_id, versions, endpoint, params), compute)
+
+
+@router.get("/cache/stats", response_model=CacheStats)
+async def get_cache_stats():
+    """Hit/miss counters of this worker's result cache."""
+    return CacheStats(**result_cache.stats())
+
+
+def kpis_for(session_id: str, **filters) -> KPIData:
+    """KPIs of a session (cached; runs in the compute pool)."""
+    def compute() -> KPIData:
+        df = get_session(session_id)
+        
+        # Apply filters (KPIs are sums, so the metrics cube answers them)
+        cells = filter_cube(session_id, df, **filters)
+        
+        kpis = calculate_kpis(cells)
+        return KPIData(**kpis)
+    
+    return cached('kpis', session_id, compute, **filters)
+
+
+def campaign_metrics_for(session_id: str, start_date: Optional[str], end_date: Optional[str]) -> List[CampaignMetrics]:
+    """Campaign metrics of a session (cached; runs in the compute pool)."""
+    def compute() -> List[CampaignMetrics]:
+        df = get_session(session_id)
+        
+        # Apply date filters
+        cells = filter_cube(session_id, df, start_date=start_date, end_date=end_date)
+        
+        metrics = calculate_campaign_metrics(cells)
+        return [CampaignMetrics(**m) for m in metrics]
+    
+    return cached('campaigns', session_id, compute, start_date=start_date, end_date=end_date)
+
+
+def monthly_data_for(session_id: str, campaign: Optional[str]) -> List[MonthlyData]:
+    """Monthly chart data of a session (cached; runs in the compute pool)."""
+    def compute() -> List[MonthlyData]:
+        df = get_session(session_id)
+        
+        cells = filter_cube(session_id, df, campaign=campaign)
+        
+        monthly = calculate_monthly_data(cells)
+        return [MonthlyData(**m) for m in monthly]
+    
+    return cached('monthly', session_id, compute, campaign=campaign)
+
+
+def filter_options_for(session_id: str) -> FilterOptions:
+    """Filter options of a session (cached; runs in the compute pool)."""
+    def compute() -> FilterOptions:
+        df = get_session(session_id)
+        # Cube cells keep first-appearance order, so unique values come out in the same order
+        cells = get_session_cube(session_id, df)
+        
+        return FilterOptions(
+            campaigns=get_unique_campaigns(cells),
+            ad_groups=get_unique_ad_groups(cells),
+            portfolios=get_unique_portfolios(cells),
+            date_range=get_date_range(cells)
+        )
     
-    kpis = calculate_kpis(df)
-    return KPIData(**kpis)
+    return cached('filters', session_id, compute)
+
+
+@router.get("/kpis/{session_id}", response_model=KPIData)
+async def get_kpis(
+    session_id: str,
+    campaign: Optional[str] = Query(None, description="Filter by campaign name"),
+    ad_group: Optional[str] = Query(None, description="Filter by ad group name"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)")
+):
+    """Get aggregated KPI metrics for the uploaded data."""
+    return await run_cpu(
+        kpis_for, session_id,
+        campaign=campaign, ad_group=ad_group, start_date=start_date, end_date=end_date
+    )
 
 
 @router.get("/campaigns/{session_id}", response_model=List[CampaignMetrics])
@@ -73,16 +194,7 @@ async def get_campaign_metrics(
     end_date: Optional[str] = Query(None)
 ):
     """Get campaign-level performance metrics."""
-    df = get_session(session_id)
-    
-    # Apply date filters
-    if start_date:
-        df = df[df['Date'] >= start_date]
-    if end_date:
-        df = df[df['Date'] <= end_date]
-    
-    metrics = calculate_campaign_metrics(df)
-    return [CampaignMetrics(**m) for m in metrics]
+    return await run_cpu(campaign_metrics_for, session_id, start_date, end_date)
 
 
 @router.get("/monthly/{session_id}", response_model=List[MonthlyData])
@@ -91,37 +203,17 @@ async def get_monthly_data(
     campaign: Optional[str] = Query(None)
 ):
     """Get monthly aggregated sales vs spend data for charts."""
-    df = get_session(session_id)
-    
-    if campaign:
-        df = df[df['Campaign Name'] == campaign]
-    
-    monthly = calculate_monthly_data(df)
-    return [MonthlyData(**m) for m in monthly]
+    return await run_cpu(monthly_data_for, session_id, campaign)
 
 
 @router.get("/filters/{session_id}", response_model=FilterOptions)
 async def get_filter_options(session_id: str):
     """Get available filter options from the uploaded data."""
-    df = get_session(session_id)
-    
-    return FilterOptions(
-        campaigns=get_unique_campaigns(df),
-        ad_groups=get_unique_ad_groups(df),
-        portfolios=get_unique_portfolios(df),
-        date_range=get_date_range(df)
-    )
+    return await run_cpu(filter_options_for, session_id)
 
 
-@router.post("/search-terms/{session_id}", response_model=AnalysisResponse)
-async def analyze_search_terms_endpoint(
-    session_id: str,
-    config: AnalysisConfig
-):
-    """
-    Run search term analysis with configurable rules.
-    Returns flagged search terms for negative keyword/ASIN generation.
-    """
+def run_search_term_analysis(session_id: str, config: AnalysisConfig) -> AnalysisResponse:
+    """Run search term analysis for a session and store its results (runs in the compute pool)."""
     df = get_session(session_id)
     
     # Convert Pydantic model to service config
@@ -142,11 +234,10 @@ async def analyze_search_terms_endpoint(
     results = [SearchTermResult(**row) for row in results_df.to_dict(orient='records')]
     
     # Enrich with IDs if Bulk File is available
-    bulk_key = f"{session_id}_bulk"
-    if bulk_key in sessions:
+    bulk_index = get_bulk_index(session_id)
+    if bulk_index is not None:
         try:
-             bulk_df = sessions[bulk_key]
-             enrich_with_ids(results, bulk_df)
+             enrich_with_ids(results, bulk_index)
              
              # Also update the stored dataframe with IDs for export fallback (though we prefer direct items now)
              # The results objects are modified in-place, but results_df is separate.
@@ -171,26 +262,101 @@ async def analyze_search_terms_endpoint(
     )
 
 
-@router.get("/search-terms/{session_id}/data")
-async def get_search_terms_data(
+@router.post("/search-terms/{session_id}", response_model=AnalysisResponse)
+async def analyze_search_terms_endpoint(
     session_id: str,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=10, le=200),
-    campaign: Optional[str] = None,
-    ad_group: Optional[str] = None,
-    sort_by: Optional[str] = None,
-    sort_order: str = Query("desc", pattern="^(asc|desc)$")
+    config: AnalysisConfig
 ):
     """
-    Get paginated search terms data for browsing.
+    Run search term analysis with configurable rules.
+    Returns flagged search terms for negative keyword/ASIN generation.
     """
+    return await run_cpu(run_search_term_analysis, session_id, config)
+
+
+def run_custom_rules(session_id: str, request: RuleSetRequest) -> RuleEvaluationResponse:
+    """Evaluate a rule set against a session (runs in the compute pool)."""
+    df = get_session(session_id)
+    
+    try:
+        if request.rules_text:
+            rules = load_rules(request.rules_text)
+        else:
+            rules = load_rules([r.model_dump() for r in request.rules])
+        if not rules:
+            raise RuleError("No rules provided")
+        masks = evaluate_rules(df, rules, params=request.params)
+    except RuleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    first = first_matching_rule(masks)
+    matched = first.notna().to_numpy()
+    flagged = df[matched]
+    actions = {r.name: r.action for r in rules}
+    
+    def text(col: str) -> list:
+        if col not in flagged.columns:
+            return [None] * len(flagged)
+        values = flagged[col].astype(object)
+        return values.where(values.notna(), None).map(lambda v: v if v is None else str(v)).tolist()
+    
+    def number(col: str) -> list:
+        if col not in flagged.columns:
+            return [0.0] * len(flagged)
+        return flagged[col].fillna(0).astype(float).tolist()
+    
+    results = [
+        RuleMatch(
+            id=int(idx),
+            rule=rule,
+            action=actions.get(rule),
+            campaign_name=campaign,
+            ad_group_name=ad_group,
+            targeting=targeting,
+            match_type=match_type,
+            customer_search_term=term,
+            spend=spend,
+            sales=sales
+        )
+        for idx, rule, campaign, ad_group, targeting, match_type, term, spend, sales in zip(
+            flagged.index, first[matched].tolist(),
+            text('Campaign Name'), text('Ad Group Name'), text('Targeting'),
+            text('Match Type'), text('Customer Search Term'),
+            number('Spend'), number('Sales')
+        )
+    ]
+    
+    return RuleEvaluationResponse(
+        total_rows=len(df),
+        total_matched=len(results),
+        rule_counts={name: int(masks[name].sum()) for name in masks.columns},
+        results=results
+    )
+
+
+@router.post("/rules/{session_id}", response_model=RuleEvaluationResponse)
+async def evaluate_custom_rules(session_id: str, request: RuleSetRequest):
+    """
+    Evaluate a custom declarative rule set in one pass over the session data.
+    Each row is assigned to the first rule (in order) that matches it.
+    """
+    return await run_cpu(run_custom_rules, session_id, request)
+
+
+def search_terms_page(
+    session_id: str,
+    page: int,
+    page_size: int,
+    campaign: Optional[str],
+    ad_group: Optional[str],
+    sort_by: Optional[str],
+    sort_order: str
+) -> dict:
+    """One page of a session's filtered, sorted rows (runs in the compute pool)."""
     df = get_session(session_id)
     
     # Apply filters
-    if campaign:
-        df = df[df['Campaign Name'] == campaign]
-    if ad_group:
-        df = df[df['Ad Group Name'] == ad_group]
+    df = filter_session(session_id, df, campaign, ad_group)
     
     # Apply sorting
     if sort_by and sort_by in df.columns:
@@ -201,6 +367,8 @@ async def get_search_terms_data(
     start = (page - 1) * page_size
     end = start + page_size
     page_df = df.iloc[start:end]
+    # Missing metrics (e.g. ACOS without sales) are NaN in float columns; JSON needs null
+    page_df = page_df.astype(object).where(page_df.notna(), None)
     
     return {
         "data": page_df.to_dict(orient='records'),
@@ -211,6 +379,22 @@ async def get_search_terms_data(
     }
 
 
+@router.get("/search-terms/{session_id}/data")
+async def get_search_terms_data(
+    session_id: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=10, le=200),
+    campaign: Optional[str] = None,
+    ad_group: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    sort_order: str = Query("desc", pattern="^(asc|desc)$")
+):
+    """
+    Get paginated search terms data for browsing.
+    """
+    return await run_cpu(search_terms_page, session_id, page, page_size, campaign, ad_group, sort_by, sort_order)
+
+
 @router.get("/decision-center/{session_id}", response_model=DecisionCenterResponse)
 async def get_decision_center_data(session_id: str):
     """
@@ -221,7 +405,18 @@ async def get_decision_center_data(session_id: str):
     - Scale Opportunities
     - Budget Saturation (requires Bulk file)
     - PPC Health Score
+    Cached per session and bulk file version.
     """
+    return await run_cpu(decision_center_for, session_id)
+
+
+def decision_center_for(session_id: str) -> DecisionCenterResponse:
+    """Decision Center of a session (cached; runs in the compute pool)."""
+    return cached('decision-center', session_id, lambda: build_decision_center(session_id), with_bulk=True)
+
+
+def build_decision_center(session_id: str) -> DecisionCenterResponse:
+    """Run the Decision Engine for a session and inject IDs from its bulk file."""
     # Get Search Term Data
     try:
         df = get_session(session_id)
@@ -231,33 +426,27 @@ async def get_decision_center_data(session_id: str):
         raise
 
     # Try to get Bulk Data (optional but needed for Budget widget)
-    bulk_df = pd.DataFrame()
-    bulk_key = f"{session_id}_bulk"
-    if bulk_key in sessions:
-        bulk_df = sessions[bulk_key]
-
-    # Run Analysis
-    from services.optimization import (
-        analyze_bleeding_spend,
-        analyze_high_acos,
-        analyze_scale_opportunities,
-        analyze_budget_saturation,
-        calculate_health_score
-    )
-    from services.parser import normalize_columns
+    bulk_df = sessions.get(f"{session_id}_bulk")
+    if bulk_df is None:
+        bulk_df = pd.DataFrame()
+
+    # Run Analysis (all widgets in one pass over shared aggregates)
+    from services.optimization import run_decision_engine
 
-    bleeding = analyze_bleeding_spend(df)
-    high_acos = analyze_high_acos(df)
-    scale = analyze_scale_opportunities(df)
-    budget = analyze_budget_saturation(df, bulk_df)
-    health = calculate_health_score(df)
+    decision = run_decision_engine(df, bulk_df)
+    bleeding = decision['bleeding_spend']
+    high_acos = decision['high_acos']
+    scale = decision['scale_opportunities']
+    budget = decision['budget_saturation']
+    health = decision['health_score']
 
     # --- ID Injection Logic ---
     if not bulk_df.empty:
         try:
-            enrich_with_ids(bleeding, bulk_df)
-            enrich_with_ids(high_acos, bulk_df)
-            enrich_with_ids(scale, bulk_df)
+            bulk_index = get_bulk_index(session_id)
+            enrich_with_ids(bleeding, bulk_index)
+            enrich_with_ids(high_acos, bulk_index)
+            enrich_with_ids(scale, bulk_index)
             # Budget items don't strictly need this as they are generated from bulk, 
             # but consistency helps if we ever need to cross-ref.
             # actually budget items already come from bulk_df merge in `analyze_budget_saturation`.
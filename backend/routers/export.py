@@ -3,25 +3,45 @@ Export router.
 Generates Amazon-compliant bulk upload files for negatives and auto campaigns.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from typing import List
 from datetime import date
 
-from models.schemas import NegativeExportRequest, AutoCampaignConfig, ManualCampaignConfig, BidChangeRequest, BudgetChangeRequest
+from models.schemas import (
+    NegativeExportRequest,
+    AutoCampaignConfig,
+    ManualCampaignConfig,
+    BidChangeRequest,
+    BudgetChangeRequest,
+    BulkFileFormat
+)
 from services.negative_generator import generate_negatives_bulk_file
 from services.campaign_generator import generate_auto_campaign_bulk_file, validate_ad_group_config
 from services.manual_campaign_generator import generate_manual_campaign_bulk_file
-from routers.upload import sessions
+from services.compute_pool import run_cpu
+from services.bulk_writer import BULK_FORMATS
+from services.xlsx_writer import iter_chunks
+from services.bulk_index import enrich_with_ids
+from routers.upload import get_bulk_index, sessions
 
 router = APIRouter()
 
+FORMAT_QUERY = Query(BulkFileFormat.XLSX, description="Output format: xlsx, csv or tsv")
 
-@router.post("/negatives")
-async def export_negatives(request: NegativeExportRequest):
-    """
-    Generate and download bulk upload file for negative keywords/ASINs.
-    """
+
+def bulk_file_response(output, name: str, format: BulkFileFormat) -> StreamingResponse:
+    """Download response for a generated bulk file, sent in chunks."""
+    media_type, extension = BULK_FORMATS[format.value]
+    return StreamingResponse(
+        iter_chunks(output),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={name}.{extension}"}
+    )
+
+
+def build_negatives_file(request: NegativeExportRequest, format: str = 'xlsx'):
+    """Collect the selected negatives and write their bulk file (runs in the compute pool)."""
     session_id = request.session_id
     selected_items = []
     
@@ -51,10 +71,9 @@ async def export_negatives(request: NegativeExportRequest):
         # CASE 2: Selected IDs (Requires backend session)
         else:
             results_key = f"{session_id}_results"
-            results_df = None
+            results_df = sessions.get(results_key)
             
-            if results_key in sessions:
-                results_df = sessions[results_key]
+            if results_df is not None:
                 if request.selected_ids:
                     results_df = results_df[results_df['id'].isin(request.selected_ids)]
             else:
@@ -86,68 +105,18 @@ async def export_negatives(request: NegativeExportRequest):
             if len(results_df) == 0:
                 raise HTTPException(status_code=400, detail="No items selected for export")
                 
-            # --- ID Mapping Logic (Only if using Backend data source) ---
-            bulk_key = f"{session_id}_bulk"
-            campaign_id_map = {}
-            ad_group_id_map = {}
-            portfolio_id_map = {}
-            
-            if bulk_key in sessions:
-                try:
-                    from services.parser import normalize_columns
-                    bulk_df = sessions[bulk_key]
-                    if 'Entity' in bulk_df.columns and 'Record Type' not in bulk_df.columns:
-                        bulk_df = bulk_df.rename(columns={'Entity': 'Record Type'})
-                    bulk_df = normalize_columns(bulk_df)
-                    
-                    def clean_id(val):
-                        if pd.isna(val): return None
-                        s = str(val).strip()
-                        if s.endswith('.0'): return s[:-2]
-                        return s
-
-                    cid_map = {}
-                    pid_map = {}
-                    def add_to_campaign_maps(df_subset, name_col, id_col, port_col=None):
-                        for _, row in df_subset.iterrows():
-                            c_name = str(row[name_col]).lower().strip()
-                            cid_map[c_name] = clean_id(row[id_col])
-                            if port_col and port_col in row and pd.notna(row[port_col]):
-                                pid_map[c_name] = clean_id(row[port_col])
-
-                    if 'Campaign Name' in bulk_df.columns and 'Campaign ID' in bulk_df.columns:
-                        add_to_campaign_maps(bulk_df.dropna(subset=['Campaign Name', 'Campaign ID']), 
-                                           'Campaign Name', 'Campaign ID', 
-                                           'Portfolio ID' if 'Portfolio ID' in bulk_df.columns else None)
-                    
-                    campaign_id_map = cid_map
-                    portfolio_id_map = pid_map
-
-                    ag_id_col = 'Ad Group ID'
-                    if 'Ad Group ID' not in bulk_df.columns and 'Ad Group' in bulk_df.columns:
-                        ag_id_col = 'Ad Group'
-                    
-                    if ag_id_col in bulk_df.columns and 'Ad Group Name' in bulk_df.columns:
-                        ag_data = bulk_df[['Campaign Name', 'Ad Group Name', ag_id_col]].dropna().drop_duplicates()
-                        for _, row in ag_data.iterrows():
-                            c_name = str(row['Campaign Name']).lower().strip()
-                            an_name = str(row['Ad Group Name']).lower().strip()
-                            ad_group_id_map[(c_name, an_name)] = clean_id(row[ag_id_col])
-                except Exception:
-                    pass
-
             selected_items = results_df.to_dict(orient='records')
-            for item in selected_items:
-                c_name = (item.get('campaign_name') or item.get('Campaign Name') or '').lower().strip()
-                a_name = (item.get('ad_group_name') or item.get('Ad Group Name') or '').lower().strip()
-                if c_name in campaign_id_map: item['campaign_id'] = campaign_id_map[c_name]
-                if c_name in portfolio_id_map: item['portfolio_id'] = portfolio_id_map[c_name]
-                if (c_name, a_name) in ad_group_id_map: item['ad_group_id'] = ad_group_id_map[(c_name, a_name)]
+
+            # --- ID Mapping Logic (Only if using Backend data source) ---
+            bulk_index = get_bulk_index(session_id)
+            if bulk_index is not None:
+                enrich_with_ids(selected_items, bulk_index)
 
         # Generate bulk file
         output = generate_negatives_bulk_file(
             selected_items=selected_items,
-            use_negative_phrase=request.use_negative_phrase
+            use_negative_phrase=request.use_negative_phrase,
+            format=format
         )
         
     except Exception as e:
@@ -156,18 +125,22 @@ async def export_negatives(request: NegativeExportRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
     
-    # Return as downloadable file
-    filename = f"negative_keywords_{date.today().strftime('%Y%m%d')}.xlsx"
+    return output
+
+
+@router.post("/negatives")
+async def export_negatives(request: NegativeExportRequest, format: BulkFileFormat = FORMAT_QUERY):
+    """
+    Generate and download bulk upload file for negative keywords/ASINs.
+    """
+    output = await run_cpu(build_negatives_file, request, format.value)
     
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    # Return as downloadable file
+    return bulk_file_response(output, f"negative_keywords_{date.today().strftime('%Y%m%d')}", format)
 
 
 @router.post("/auto-campaign")
-async def export_auto_campaign(config: AutoCampaignConfig):
+async def export_auto_campaign(config: AutoCampaignConfig, format: BulkFileFormat = FORMAT_QUERY):
     """
     Generate and download bulk upload file for an auto campaign.
     """
@@ -182,29 +155,25 @@ async def export_auto_campaign(config: AutoCampaignConfig):
         raise HTTPException(status_code=400, detail="; ".join(all_errors))
     
     # Generate bulk file
-    output = generate_auto_campaign_bulk_file(
+    output = await run_cpu(
+        generate_auto_campaign_bulk_file,
         campaign_name=config.campaign_name,
         daily_budget=config.daily_budget,
         bidding_strategy=config.bidding_strategy.value,
         start_date=config.start_date,
         ad_groups=[ag.model_dump() for ag in config.ad_groups],
         portfolio=config.portfolio,
-        placement_bid_adjustment=config.placement_bid_adjustment.model_dump() if config.placement_bid_adjustment else None
+        placement_bid_adjustment=config.placement_bid_adjustment.model_dump() if config.placement_bid_adjustment else None,
+        format=format.value
     )
     
     # Return as downloadable file
     safe_name = config.campaign_name.replace(' ', '_').replace('/', '_')[:50]
-    filename = f"auto_campaign_{safe_name}_{date.today().strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return bulk_file_response(output, f"auto_campaign_{safe_name}_{date.today().strftime('%Y%m%d')}", format)
 
 
 @router.post("/manual-campaign")
-async def export_manual_campaign(config: ManualCampaignConfig):
+async def export_manual_campaign(config: ManualCampaignConfig, format: BulkFileFormat = FORMAT_QUERY):
     """
     Generate and download bulk upload file for a manual campaign.
     """
@@ -217,25 +186,21 @@ async def export_manual_campaign(config: ManualCampaignConfig):
              raise HTTPException(status_code=400, detail=f"Ad Group {i+1} Name is required")
     
     # Generate bulk file
-    output = generate_manual_campaign_bulk_file(
+    output = await run_cpu(
+        generate_manual_campaign_bulk_file,
         campaign_name=config.campaign_name,
         daily_budget=config.daily_budget,
         bidding_strategy=config.bidding_strategy.value,
         start_date=config.start_date,
         ad_groups=[ag.model_dump() for ag in config.ad_groups],
         portfolio=config.portfolio,
-        placement_bid_adjustment=config.placement_bid_adjustment.model_dump() if config.placement_bid_adjustment else None
+        placement_bid_adjustment=config.placement_bid_adjustment.model_dump() if config.placement_bid_adjustment else None,
+        format=format.value
     )
     
     # Return as downloadable file
     safe_name = config.campaign_name.replace(' ', '_').replace('/', '_')[:50]
-    filename = f"manual_campaign_{safe_name}_{date.today().strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return bulk_file_response(output, f"manual_campaign_{safe_name}_{date.today().strftime('%Y%m%d')}", format)
 
 @router.post("/negatives/preview")
 async def preview_negatives(request: NegativeExportRequest):
@@ -246,14 +211,13 @@ async def preview_negatives(request: NegativeExportRequest):
     session_id = request.session_id
     results_key = f"{session_id}_results"
     
-    if results_key not in sessions:
+    results_df = sessions.get(results_key)
+    if results_df is None:
         raise HTTPException(
             status_code=404,
             detail="No analysis results found. Please run search term analysis first."
         )
     
-    results_df = sessions[results_key]
-    
     # Filter to selected IDs
     if request.selected_ids:
         results_df = results_df[results_df['id'].isin(request.selected_ids)]
@@ -277,36 +241,24 @@ async def preview_negatives(request: NegativeExportRequest):
 
 
 @router.post("/bid-optimization")
-async def export_bid_optimization(request: BidChangeRequest):
+async def export_bid_optimization(request: BidChangeRequest, format: BulkFileFormat = FORMAT_QUERY):
     """
     Generate bulk file for Bid optimizations (Scale Up / High CPC Down).
     """
     from services.bulk_optimizer import generate_bid_changes_file
     
-    output = generate_bid_changes_file(request.items)
-    
-    filename = f"bid_changes_{date.today().strftime('%Y%m%d')}.xlsx"
+    output = await run_cpu(generate_bid_changes_file, request.items, format.value)
     
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return bulk_file_response(output, f"bid_changes_{date.today().strftime('%Y%m%d')}", format)
 
 
 @router.post("/budget-optimization")
-async def export_budget_optimization(request: BudgetChangeRequest):
+async def export_budget_optimization(request: BudgetChangeRequest, format: BulkFileFormat = FORMAT_QUERY):
     """
     Generate bulk file for Budget optimizations.
     """
     from services.bulk_optimizer import generate_budget_changes_file
     
-    output = generate_budget_changes_file(request.items)
-    
-    filename = f"budget_changes_{date.today().strftime('%Y%m%d')}.xlsx"
+    output = await run_cpu(generate_budget_changes_file, request.items, format.value)
     
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return bulk_file_response(output, f"budget_changes_{date.today().strftime('%Y%m%d')}", format)
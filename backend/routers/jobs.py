@@ -0,0 +1,123 @@
+"""
+Jobs router.
+Background versions of the long-running upload and analysis endpoints: submit a
+job, poll /jobs/{job_id}, then fetch /jobs/{job_id}/result.
+"""
+
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from typing import Any
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+from models.schemas import AnalysisConfig, JobStatus
+from services.compute_pool import run_cpu
+from services.jobs import DONE, JobContext, create_job_manager
+from services.parser import detect_file_type
+from routers.analysis import run_search_term_analysis
+from routers.upload import _ingest_file, _ingest_stream, get_session, search_term_upload_response, sessions
+
+router = APIRouter()
+
+# Local in-process queue; job records live in the shared session store
+jobs = create_job_manager(sessions)
+
+
+def _json_result(response: BaseModel) -> Any:
+    """
+    JSON-ready result of a response model, serialized as the synchronous routes
+    serialize it (NaN/inf floats become null; model_dump would keep them, and
+    JSONResponse rejects them).
+    """
+    return json.loads(response.model_dump_json())
+
+
+def _job_status(job_id: str) -> JobStatus:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job)
+
+
+@router.post("/search-term-report", response_model=JobStatus, status_code=202)
+async def submit_search_term_report(file: UploadFile = File(...)):
+    """
+    Upload a Search Term Report as a background job.
+    The result is the same UploadResponse as /api/upload/search-term-report.
+    """
+    try:
+        file_type = detect_file_type(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The upload is closed once this request returns, so keep a copy for the job
+    spool = tempfile.NamedTemporaryFile(prefix='ppc_job_', suffix=f".{file_type}", delete=False)
+    try:
+        await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+    finally:
+        spool.close()
+    filename = file.filename
+    session_id = str(uuid.uuid4())
+
+    async def work(ctx: JobContext) -> Any:
+        if file_type in ('csv', 'zip'):
+            def on_progress(progress: dict) -> None:
+                ctx.check_cancelled()
+                ctx.progress(**progress)
+
+            with open(spool.name, 'rb') as source:
+                df = await run_in_threadpool(
+                    _ingest_stream, source, filename, os.path.getsize(spool.name), session_id, None, on_progress
+                )
+        else:
+            with open(spool.name, 'rb') as source:
+                content = source.read()
+            df = await run_cpu(_ingest_file, content, filename, session_id)
+        return _json_result(search_term_upload_response(df, session_id, filename))
+
+    return JobStatus(**jobs.submit('search_term_report', work, on_finish=lambda: os.unlink(spool.name)))
+
+
+@router.post("/search-terms/{session_id}", response_model=JobStatus, status_code=202)
+async def submit_search_term_analysis(session_id: str, config: AnalysisConfig):
+    """
+    Run search term analysis as a background job.
+    The result is the same AnalysisResponse as /api/analysis/search-terms.
+    """
+    get_session(session_id)  # 404 now rather than a failed job later
+
+    async def work(ctx: JobContext) -> Any:
+        response = await run_cpu(run_search_term_analysis, session_id, config)
+        return _json_result(response)
+
+    return JobStatus(**jobs.submit('search_terms', work))
+
+
+@router.get("/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """Status and progress of a job."""
+    return _job_status(job_id)
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a finished job (409 while it is queued or running, or if it failed)."""
+    status = _job_status(job_id)
+    if status.status != DONE:
+        raise HTTPException(status_code=409, detail=status.error or f"Job is {status.status}")
+    try:
+        return jobs.result(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job result expired")
+
+
+@router.delete("/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    if jobs.cancel(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job_id)
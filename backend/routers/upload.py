@@ -3,71 +3,357 @@ File upload router.
 Handles uploading and parsing of Amazon Search Term Reports and Bulk files.
 """
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Dict
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+import hashlib
 import uuid
 import pandas as pd
 
-from models.schemas import UploadResponse, ValidationError, FileType
+from models.schemas import UploadResponse, UploadProgress, ValidationError, FileType
 from services.parser import (
     parse_file,
-    validate_search_term_report,
+    is_bulk_file_column,
+    is_search_term_column,
     process_search_term_report,
+    read_csv_header,
+    read_file_sample,
+    iter_search_term_chunks,
     get_date_range,
     get_unique_campaigns,
     detect_file_type
 )
+from services.archives import iter_reports
+from services.compute_pool import run_cpu
+from services.jobs import JobCancelled
+from services.bulk_index import BulkIndex, build_bulk_index
+from services.metrics_cube import build_metrics_cube, cube_row_count
+from services.report_append import conform_columns, merge_report
+from services.ingestion_plans import create_plan_registry
+from services.result_cache import create_result_cache
+from services.session_index import SessionIndex, build_session_index
+from services.session_store import create_session_store, validate_key
 
 router = APIRouter()
 
-# In-memory session storage
-# In production, this would be Redis or similar
-sessions: Dict[str, pd.DataFrame] = {}
+# Session storage (memory-mapped Arrow files shared by all workers by default,
+# see services/session_store.py)
+# Supports dict-style access: sessions[key], `key in sessions`, sessions.get(key)
+sessions = create_session_store()
+
+# Per-worker cache of analysis responses, keyed by session data versions
+# (see services/result_cache.py)
+result_cache = create_result_cache()
+
+# Ingestion plans of known report header layouts (see services/ingestion_plans.py)
+ingestion_plans = create_plan_registry()
 
 
 def get_session(session_id: str) -> pd.DataFrame:
     """Get DataFrame from session storage."""
-    if session_id not in sessions:
+    try:
+        return sessions[session_id]
+    except KeyError:
         raise HTTPException(status_code=404, detail="Session not found. Please upload a file first.")
-    return sessions[session_id]
 
 
-@router.post("/search-term-report", response_model=UploadResponse)
-async def upload_search_term_report(file: UploadFile = File(...)):
+def _index_key(session_id: str) -> str:
+    return f"{session_id}_index"
+
+
+def get_session_index(session_id: str, df: pd.DataFrame) -> SessionIndex:
+    """Filter index of a session; rebuilt if missing or stale (e.g. sessions stored before indexes existed)."""
+    index = sessions.get(_index_key(session_id))
+    if index is None or index.row_count != len(df):
+        index = build_session_index(df)
+        sessions[_index_key(session_id)] = index
+    return index
+
+
+def _cube_key(session_id: str) -> str:
+    return f"{session_id}_cube"
+
+
+def get_session_cube(session_id: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Metrics cube of a session; rebuilt if missing or stale."""
+    cube = sessions.get(_cube_key(session_id))
+    if cube is None or cube_row_count(cube) != len(df):
+        cube = build_metrics_cube(df)
+        sessions[_cube_key(session_id)] = cube
+    return cube
+
+
+def _bulk_index_key(session_id: str) -> str:
+    return f"{session_id}_bulk_index"
+
+
+def get_bulk_index(session_id: str) -> Optional[BulkIndex]:
     """
-    Upload an Amazon Search Term Report (CSV or XLSX).
-    Returns a session ID for subsequent API calls.
+    ID lookup index of a session's bulk file, or None without one; built if
+    missing (e.g. bulk files stored before indexes existed).
     """
-    # Validate file type
+    frame = sessions.get(_bulk_index_key(session_id))
+    if frame is None:
+        bulk_df = sessions.get(f"{session_id}_bulk")
+        if bulk_df is None:
+            return None
+        frame = build_bulk_index(bulk_df).to_frame()
+        sessions[_bulk_index_key(session_id)] = frame
+    return BulkIndex.from_frame(frame)
+
+
+def _store_rollups(session_id: str, df: pd.DataFrame) -> None:
+    """Build and store the filter index and metrics cube of a stored session."""
+    sessions[_index_key(session_id)] = build_session_index(df)
+    sessions[_cube_key(session_id)] = build_metrics_cube(df)
+
+
+def _progress_key(upload_id: str) -> str:
+    return f"{upload_id}_progress"
+
+
+# Identical uploads share one stored dataset: its keys are named like a session's,
+# under "dataset<format>_<sha256 of the file>", and sessions link to them (hard
+# links with the disk store, so nothing is copied). Bump the format when ingestion
+# output changes, so datasets stored by older code aren't reused.
+DATASET_FORMAT = 1
+
+
+def _report_keys(owner: str) -> List[str]:
+    """Keys of an ingested Search Term Report (data first, then derived data)."""
+    return [owner, _index_key(owner), _cube_key(owner)]
+
+
+def _bulk_keys(owner: str) -> List[str]:
+    """Keys of an ingested Bulk File (data first, then derived data)."""
+    return [f"{owner}_bulk", _bulk_index_key(owner)]
+
+
+def _dataset_id(digest: str) -> str:
+    return f"dataset{DATASET_FORMAT}_{digest}"
+
+
+def _stream_digest(source: BinaryIO, block_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a seekable upload stream, read in blocks and rewound."""
+    start = source.tell()
+    digest = hashlib.sha256()
+    for block in iter(lambda: source.read(block_size), b''):
+        digest.update(block)
+    source.seek(start)
+    return digest.hexdigest()
+
+
+def _reuse_dataset(digest: str, keys: Callable[[str], List[str]], session_id: str) -> bool:
+    """
+    Point a session's keys at the stored dataset of an identical upload.
+    False if there is none (never uploaded, or evicted).
+    """
+    dataset_keys, session_keys = keys(_dataset_id(digest)), keys(session_id)
     try:
-        file_type = detect_file_type(file.filename)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    # Read file content
-    content = await file.read()
-    
-    # Parse file
+        sessions.link(dataset_keys[0], session_keys[0])
+    except (KeyError, ValueError):
+        return False
+    for src, dst in zip(dataset_keys[1:], session_keys[1:]):
+        try:
+            sessions.link(src, dst)
+        except KeyError:
+            sessions.delete(dst)  # Rebuilt from the data on first use
+    return True
+
+
+def _publish_dataset(digest: str, keys: Callable[[str], List[str]], session_id: str) -> None:
+    """Register a freshly ingested session's data as the dataset of its file contents."""
+    for src, dst in zip(keys(session_id), keys(_dataset_id(digest))):
+        try:
+            sessions.link(src, dst)
+        except (KeyError, ValueError):
+            pass
+
+
+def _report_chunks(filename: str, source: BinaryIO) -> Iterator[pd.DataFrame]:
+    """Cleaned chunks of one report of an upload; columns are validated before any data is read."""
+    if detect_file_type(filename) != 'csv':
+        # Workbooks need random access, so an archived workbook is read whole
+        yield _parse_report(source.read(), filename)
+        return
+
+    header = read_csv_header(source)
+    plan = ingestion_plans.plan_for(header.columns)
+    if not plan.is_valid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required columns: {', '.join(plan.missing)}"
+        )
+    yield from iter_search_term_chunks(source, header, plan=plan)
+
+
+def _ingest_stream(
+    source: BinaryIO,
+    filename: str,
+    total_bytes: Optional[int],
+    session_id: str,
+    upload_id: Optional[str],
+    on_progress: Optional[Callable[[dict], None]] = None
+) -> pd.DataFrame:
+    """
+    Stream a Search Term Report CSV (plain, gzipped, or a zip archive of reports)
+    into the session store chunk by chunk, so peak memory is bounded by the chunk
+    size rather than the file size. Compressed uploads are decompressed as the
+    parser reads them (services/archives.py); the reports of an archive are
+    stored as one session.
+    Progress (in upload bytes) is written to the store so any worker can answer
+    progress polls, and passed to `on_progress` (which may raise JobCancelled to
+    stop the upload).
+    """
+    progress = {"upload_id": upload_id, "status": "processing", "total_bytes": total_bytes}
+
+    def report(**fields):
+        if upload_id:
+            progress.update(fields)
+            sessions[_progress_key(upload_id)] = dict(progress)
+        if on_progress:
+            on_progress(dict(progress, **fields))
+
+    report(bytes_processed=0, rows_processed=0, percent=0.0 if total_bytes else None)
+
+    # An identical file was ingested before: reuse its dataset
+    digest = _stream_digest(source)
+    if _reuse_dataset(digest, _report_keys, session_id):
+        df = sessions[session_id]
+        report(status="done", bytes_processed=total_bytes or 0, rows_processed=len(df), percent=100.0, session_id=session_id)
+        return df
+
+    def chunks():
+        rows = 0
+        first = None
+        for name, stream in iter_reports(source, filename):
+            for chunk in _report_chunks(name, stream):
+                # Later reports of an archive are stored with the first one's columns and dtypes
+                if first is None:
+                    first = chunk.iloc[:0]
+                elif list(chunk.columns) != list(first.columns):
+                    chunk = conform_columns(chunk, first)
+                rows += len(chunk)
+                position = source.tell()
+                report(
+                    bytes_processed=position,
+                    rows_processed=rows,
+                    percent=round(min(position / total_bytes, 1.0) * 100, 1) if total_bytes else None
+                )
+                yield chunk
+
     try:
-        df = parse_file(content, file.filename)
+        rows = sessions.put_stream(session_id, chunks())
+    except JobCancelled:
+        # Clean up first: reporting checks for the cancellation again and raises
+        sessions.delete(session_id)
+        report(status="cancelled")
+        raise
+    except HTTPException as e:
+        report(status="failed", error=e.detail)
+        raise
+    except Exception as e:
+        report(status="failed", error=str(e))
+        raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
+
+    df = sessions[session_id]
+    _store_rollups(session_id, df)
+    _publish_dataset(digest, _report_keys, session_id)
+    report(status="done", rows_processed=rows, percent=100.0, session_id=session_id)
+    return df
+
+
+def _parse_report(content: bytes, filename: str) -> pd.DataFrame:
+    """Parse, validate and clean a whole Search Term Report."""
+    # Parse file (only the columns the analyzers use)
+    try:
+        df = parse_file(content, filename, usecols=is_search_term_column)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
     
     # Validate required columns
-    is_valid, missing = validate_search_term_report(df)
-    if not is_valid:
+    plan = ingestion_plans.plan_for(df.columns)
+    if not plan.is_valid:
         raise HTTPException(
             status_code=400,
-            detail=f"Missing required columns: {', '.join(missing)}"
+            detail=f"Missing required columns: {', '.join(plan.missing)}"
         )
     
     # Process and clean data
-    df = process_search_term_report(df)
+    return process_search_term_report(df, plan)
+
+
+def _ingest_file(content: bytes, filename: str, session_id: str) -> pd.DataFrame:
+    """Parse, clean and store a whole (XLSX) Search Term Report (runs in the compute pool)."""
+    # An identical file was ingested before: reuse its dataset
+    digest = hashlib.sha256(content).hexdigest()
+    if _reuse_dataset(digest, _report_keys, session_id):
+        return sessions[session_id]
+
+    df = _parse_report(content, filename)
     
-    # Generate session ID and store data
-    session_id = str(uuid.uuid4())
+    # Store data, its filter index and metrics cube
     sessions[session_id] = df
+    _store_rollups(session_id, df)
+    _publish_dataset(digest, _report_keys, session_id)
+    return df
+
+
+def _ingest_bulk_file(content: bytes, filename: str, bulk_session_id: str) -> pd.DataFrame:
+    """Parse and store a Bulk Operations file (runs in the compute pool)."""
+    # An identical file was ingested before: reuse its dataset
+    digest = hashlib.sha256(content).hexdigest()
+    if _reuse_dataset(digest, _bulk_keys, bulk_session_id):
+        return sessions[f"{bulk_session_id}_bulk"]
+
+    # Parse file (only the sheet and columns used for ID/budget lookups)
+    try:
+        df = parse_file(content, filename, usecols=is_bulk_file_column)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
     
+    # Store in session (using separate key) with its ID lookup index
+    try:
+        sessions[f"{bulk_session_id}_bulk"] = df
+        sessions[_bulk_index_key(bulk_session_id)] = build_bulk_index(df).to_frame()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _publish_dataset(digest, _bulk_keys, bulk_session_id)
+    return df
+
+
+def _append_report(
+    content: bytes,
+    filename: str,
+    session_id: str,
+    window_days: Optional[int]
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Merge a newer Search Term Report into a stored session (runs in the compute pool).
+    The session's data is rewritten (never modified in place: it may be shared with
+    other sessions of the same upload), its metrics cube updated for the new dates.
+    """
+    df = get_session(session_id)
+    new_df = _parse_report(content, filename)
+    result = merge_report(df, get_session_cube(session_id, df), new_df, window_days)
+
+    parts = [part for part in (result.kept, result.added) if len(part)] or [result.kept]
+    try:
+        sessions.put_stream(session_id, parts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Failed to append file: {str(e)}")
+
+    df = sessions[session_id]
+    # Row positions changed, so the filter index is rebuilt
+    sessions[_index_key(session_id)] = build_session_index(df)
+    sessions[_cube_key(session_id)] = result.cube if result.cube is not None else build_metrics_cube(df)
+    # Analysis results of the previous data
+    sessions.delete(f"{session_id}_results")
+    return df, {'added': len(result.added), 'replaced': result.replaced, 'expired': result.expired}
+
+
+def search_term_upload_response(df: pd.DataFrame, session_id: str, filename: str) -> UploadResponse:
+    """Upload response describing a stored Search Term Report."""
     # Get metadata
     date_range = get_date_range(df)
     campaigns = get_unique_campaigns(df)
@@ -79,10 +365,82 @@ async def upload_search_term_report(file: UploadFile = File(...)):
         columns=list(df.columns),
         date_range=date_range,
         campaigns=campaigns,
-        message=f"Successfully uploaded {file.filename} with {len(df)} rows"
+        memory_bytes=int(df.memory_usage(index=True, deep=True).sum()),
+        message=f"Successfully uploaded {filename} with {len(df)} rows"
     )
 
 
+@router.post("/search-term-report", response_model=UploadResponse)
+async def upload_search_term_report(file: UploadFile = File(...), upload_id: Optional[str] = None):
+    """
+    Upload an Amazon Search Term Report (CSV or XLSX, optionally as .gz, or a .zip
+    of reports, which are combined into one session).
+    Returns a session ID for subsequent API calls.
+    CSV files are streamed in chunks; pass a client-generated `upload_id` to poll
+    /progress/{upload_id} while the file is processed.
+    """
+    # Validate file type
+    try:
+        file_type = detect_file_type(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if upload_id:
+        try:
+            validate_key(_progress_key(upload_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid upload_id")
+
+    # Generate session ID
+    session_id = str(uuid.uuid4())
+
+    if file_type in ('csv', 'zip'):
+        # Parse, clean and store in one streaming pass (off the event loop so
+        # progress polls are answered meanwhile). Streams from the upload's spooled
+        # file, which can't cross a process boundary, so this uses a thread
+        df = await run_in_threadpool(_ingest_stream, file.file, file.filename, file.size, session_id, upload_id)
+    else:
+        # Read file content
+        content = await file.read()
+        
+        df = await run_cpu(_ingest_file, content, file.filename, session_id)
+    
+    return search_term_upload_response(df, session_id, file.filename)
+
+
+@router.post("/search-term-report/{session_id}/append", response_model=UploadResponse)
+async def append_search_term_report(
+    session_id: str,
+    file: UploadFile = File(...),
+    window_days: Optional[int] = Query(None, ge=1)
+):
+    """
+    Append a newer Search Term Report (e.g. yesterday's) to an existing session.
+    Rows with the same date, campaign, ad group, targeting and search term are
+    replaced by the new report's. With `window_days`, rows older than that many
+    days before the latest date are dropped, keeping a rolling window.
+    """
+    # Validate file type
+    try:
+        detect_file_type(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Read file content
+    content = await file.read()
+
+    df, counts = await run_cpu(_append_report, content, file.filename, session_id, window_days)
+    # Free this worker's now-stale results (other workers miss on the new data version)
+    result_cache.invalidate(session_id)
+
+    response = search_term_upload_response(df, session_id, file.filename)
+    response.message = (
+        f"Appended {file.filename} to session: {counts['added']} rows added "
+        f"({counts['replaced']} replaced), {counts['expired']} expired, {len(df)} rows total"
+    )
+    return response
+
+
 @router.post("/bulk-file", response_model=UploadResponse)
 async def upload_bulk_file(file: UploadFile = File(...), session_id: str = None):
     """
@@ -98,15 +456,10 @@ async def upload_bulk_file(file: UploadFile = File(...), session_id: str = None)
     # Read file content
     content = await file.read()
     
-    # Parse file
-    try:
-        df = parse_file(content, file.filename)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse file: {str(e)}")
-    
-    # Store in session (using separate key)
     bulk_session_id = session_id or str(uuid.uuid4())
-    sessions[f"{bulk_session_id}_bulk"] = df
+    df = await run_cpu(_ingest_bulk_file, content, file.filename, bulk_session_id)
+    # Free this worker's now-stale results (other workers miss on the new bulk version)
+    result_cache.invalidate(bulk_session_id)
     
     return UploadResponse(
         session_id=bulk_session_id,
@@ -114,31 +467,19 @@ async def upload_bulk_file(file: UploadFile = File(...), session_id: str = None)
         row_count=len(df),
         columns=list(df.columns),
         campaigns=df['Campaign Name'].dropna().unique().tolist() if 'Campaign Name' in df.columns else [],
+        memory_bytes=int(df.memory_usage(index=True, deep=True).sum()),
         message=f"Successfully uploaded bulk file {file.filename}"
     )
 
 
-@router.post("/validate")
-async def validate_file(file: UploadFile = File(...)):
+def _validate_content(source: BinaryIO, filename: str, file_type: str):
     """
-    Validate a file structure before full upload.
-    Returns column information and validation status.
+    Check a file's Search Term Report columns from its header and a sample of rows.
+    The rest of the file is only scanned for its row count, never parsed.
     """
-    # Validate file type
-    try:
-        file_type = detect_file_type(file.filename)
-    except ValueError as e:
-        return ValidationError(
-            error="Invalid file type",
-            details=str(e)
-        )
-    
-    # Read file content
-    content = await file.read()
-    
-    # Parse file
+    # Parse header and sample
     try:
-        df = parse_file(content, file.filename)
+        sample, row_count = read_file_sample(source, filename)
     except Exception as e:
         return ValidationError(
             error="Failed to parse file",
@@ -146,27 +487,71 @@ async def validate_file(file: UploadFile = File(...)):
         )
     
     # Check for required columns
-    is_valid, missing = validate_search_term_report(df)
+    plan = ingestion_plans.plan_for(sample.columns)
     
-    if not is_valid:
+    if not plan.is_valid:
         return ValidationError(
             error="Missing required columns",
-            missing_columns=missing
+            missing_columns=plan.missing
+        )
+    
+    # Type check: the sample must clean like a real upload
+    try:
+        process_search_term_report(sample[plan.usecols], plan)
+    except Exception as e:
+        return ValidationError(
+            error="Failed to parse file",
+            details=str(e)
         )
     
     return {
         "valid": True,
-        "columns": list(df.columns),
-        "row_count": len(df),
+        "columns": list(sample.columns),
+        "row_count": row_count,
         "file_type": file_type
     }
 
 
+@router.post("/validate")
+async def validate_file(file: UploadFile = File(...)):
+    """
+    Validate a file structure before full upload.
+    Returns column information and validation status.
+    """
+    # Validate file type
+    try:
+        file_type = detect_file_type(file.filename)
+    except ValueError as e:
+        return ValidationError(
+            error="Invalid file type",
+            details=str(e)
+        )
+    
+    # Reads from the upload's spooled file (a cheap, mostly I/O-bound pass), so this
+    # uses a thread rather than the compute pool
+    return await run_in_threadpool(_validate_content, file.file, file.filename, file_type)
+
+
+@router.get("/progress/{upload_id}", response_model=UploadProgress)
+async def get_upload_progress(upload_id: str):
+    """Processing progress of a streamed upload started with the given upload_id."""
+    progress = sessions.get(_progress_key(upload_id)) if upload_id else None
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return UploadProgress(**progress)
+
+
 @router.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session and its data."""
-    if session_id in sessions:
-        del sessions[session_id]
-    if f"{session_id}_bulk" in sessions:
-        del sessions[f"{session_id}_bulk"]
+    for key in (
+        session_id,
+        _index_key(session_id),
+        _cube_key(session_id),
+        f"{session_id}_bulk",
+        _bulk_index_key(session_id),
+        f"{session_id}_results"
+    ):
+        sessions.delete(key)
+    result_cache.invalidate(session_id)
     return {"message": "Session deleted"}
@@ -3,10 +3,12 @@ Search Term Analysis Engine.
 Implements configurable rules for identifying underperforming search terms.
 """
 
+import numpy as np
 import pandas as pd
 from typing import List, Optional
 from dataclasses import dataclass
 from services.parser import is_asin
+from services.rules import Rule, evaluate_rules, map_unique
 
 
 @dataclass
@@ -90,6 +92,37 @@ def apply_rule_spend_no_sales(row: pd.Series, config: AnalysisConfig) -> bool:
     return spend >= config.min_spend and sales <= config.max_sales
 
 
+# Declarative versions of apply_rule_high_acos / apply_rule_spend_no_sales,
+# compiled to column masks by services.rules
+HIGH_ACOS_RULE = Rule(
+    name='High ACOS',
+    expression=(
+        "notna(col('ACOS', None)) and col('ACOS', None) != 0 and col('ACOS', None) >= target_acos"
+        " and not contains(lower(col('Match Type', '')), 'exact')"
+        " and not is_asin(col('Targeting', ''))"
+    ),
+)
+
+SPEND_NO_SALES_RULE = Rule(
+    name='Spend Without Sales',
+    expression=(
+        "col('Spend', 0) >= min_spend and col('Sales', 0) <= max_sales"
+        " and not contains(lower(col('Match Type', '')), 'exact')"
+        " and not is_asin(col('Targeting', ''))"
+    ),
+)
+
+# Evaluated in priority order
+SEARCH_TERM_RULES = [HIGH_ACOS_RULE, SPEND_NO_SALES_RULE]
+
+
+def _column(df: pd.DataFrame, col: str, default) -> pd.Series:
+    """Column accessor with a scalar default, like row.get(col, default)."""
+    if col in df.columns:
+        return df[col]
+    return pd.Series(default, index=df.index, dtype=object)
+
+
 def analyze_search_terms(df: pd.DataFrame, config: AnalysisConfig) -> pd.DataFrame:
     """
     Analyze search terms and flag those matching rules.
@@ -98,71 +131,85 @@ def analyze_search_terms(df: pd.DataFrame, config: AnalysisConfig) -> pd.DataFra
     - rule_triggered: Which rule flagged this term
     - is_asin: Whether the search term is an ASIN
     - negative_match_type: Suggested negative match type
-    """
-    results = []
     
-    for idx, row in df.iterrows():
-        search_term = str(row.get('Customer Search Term', ''))
-        
-        # Skip empty search terms
-        if not search_term.strip():
-            continue
-        
-        # Skip branded keywords if configured
-        if config.exclude_branded and is_branded_keyword(search_term, config.branded_terms):
-            continue
-        
-        # Determine the search term type
-        term_is_asin = is_asin(search_term)
-        
-        # Apply rules
-        rule = None
-        
-        if apply_rule_high_acos(row, config):
-            rule = 'High ACOS'
-        elif apply_rule_spend_no_sales(row, config):
-            rule = 'Spend Without Sales'
-        
-        # If no rule triggered, skip
-        if rule is None:
-            continue
-        
-        # Determine negative match type
-        if term_is_asin:
-            negative_match_type = 'Negative Product Targeting'
-        elif config.use_negative_phrase:
-            negative_match_type = 'Negative Phrase'
-        else:
-            negative_match_type = 'Negative Exact'
-        
-        # Build result row
-        result = {
-            'id': int(idx),
-            'date': row.get('Date').strftime('%Y-%m-%d') if pd.notna(row.get('Date')) else None,
-            'campaign_name': str(row.get('Campaign Name', '')),
-            'ad_group_name': str(row.get('Ad Group Name', '')),
-            'portfolio': str(row.get('Portfolio', '')) if pd.notna(row.get('Portfolio')) else None,
-            'targeting': str(row.get('Targeting', '')),
-            'match_type': str(row.get('Match Type', '')),
-            'customer_search_term': search_term,
-            'impressions': int(row.get('Impressions', 0)),
-            'clicks': int(row.get('Clicks', 0)),
-            'spend': float(row.get('Spend', 0)),
-            'sales': float(row.get('Sales', 0)),
-            'acos': float(row.get('ACOS')) if pd.notna(row.get('ACOS')) else None,
-            'orders': int(row.get('Orders', 0)),
-            'rule_triggered': rule,
-            'is_asin': term_is_asin,
-            'negative_match_type': negative_match_type,
-            'selected': True
-        }
-        results.append(result)
-    
-    return pd.DataFrame(results)
+    Rules are evaluated as boolean masks over whole columns (same logic as
+    apply_rule_high_acos / apply_rule_spend_no_sales); result rows keep the
+    original row order.
+    """
+    if df.empty or 'Customer Search Term' not in df.columns:
+        return pd.DataFrame([])
+
+    masks = evaluate_rules(df, SEARCH_TERM_RULES, params={
+        'target_acos': config.target_acos,
+        'min_spend': config.min_spend,
+        'max_sales': config.max_sales,
+    })
+    high_acos = masks[HIGH_ACOS_RULE.name].to_numpy()
+    no_sales = masks[SPEND_NO_SALES_RULE.name].to_numpy()
+
+    flagged = df[high_acos | no_sales]
+    high_acos = high_acos[high_acos | no_sales]
+
+    # Skip empty search terms
+    search_terms = map_unique(flagged['Customer Search Term'], str)
+    keep = map_unique(pd.Series(search_terms, dtype=object), lambda v: bool(v.strip())).astype(bool)
+
+    # Skip branded keywords if configured
+    if config.exclude_branded and config.branded_terms:
+        branded = map_unique(
+            pd.Series(search_terms, dtype=object), lambda v: is_branded_keyword(v, config.branded_terms)
+        ).astype(bool)
+        keep &= ~branded
+
+    flagged = flagged[keep]
+    high_acos = high_acos[keep]
+    search_terms = search_terms[keep]
+
+    if flagged.empty:
+        return pd.DataFrame([])
+
+    # Determine the search term type and negative match type
+    term_is_asin = map_unique(pd.Series(search_terms, dtype=object), is_asin).astype(bool)
+    phrase_or_exact = 'Negative Phrase' if config.use_negative_phrase else 'Negative Exact'
+    negative_match_type = np.where(term_is_asin, 'Negative Product Targeting', phrase_or_exact).astype(object)
+
+    # Build result columns
+    def to_text(col: str) -> np.ndarray:
+        return map_unique(_column(flagged, col, ''), str)
+
+    def to_optional(col: str, func) -> np.ndarray:
+        return map_unique(_column(flagged, col, None), lambda v: func(v) if pd.notna(v) else None)
+
+    results = pd.DataFrame({
+        'id': np.asarray(flagged.index, dtype='int64'),
+        'date': to_optional('Date', lambda v: v.strftime('%Y-%m-%d')),
+        'campaign_name': to_text('Campaign Name'),
+        'ad_group_name': to_text('Ad Group Name'),
+        'portfolio': to_optional('Portfolio', str),
+        'targeting': to_text('Targeting'),
+        'match_type': to_text('Match Type'),
+        'customer_search_term': search_terms,
+        'impressions': _column(flagged, 'Impressions', 0).to_numpy().astype('int64'),
+        'clicks': _column(flagged, 'Clicks', 0).to_numpy().astype('int64'),
+        'spend': _column(flagged, 'Spend', 0).to_numpy().astype('float64'),
+        'sales': _column(flagged, 'Sales', 0).to_numpy().astype('float64'),
+        'acos': to_optional('ACOS', float),
+        'orders': _column(flagged, 'Orders', 0).to_numpy().astype('int64'),
+        'rule_triggered': np.where(high_acos, 'High ACOS', 'Spend Without Sales').astype(object),
+        'is_asin': term_is_asin,
+        'negative_match_type': negative_match_type,
+        'selected': np.ones(len(flagged), dtype=bool),
+    })
+
+    # Match the dtype inference of the old row-by-row construction
+    for col in ['date', 'portfolio', 'acos']:
+        results[col] = pd.Series(results[col].tolist(), index=results.index)
+
+    return results
 
 
 def calculate_kpis(df: pd.DataFrame) -> dict:
-    """Calculate aggregated KPIs from the DataFrame."""
+    """Calculate aggregated KPIs from report rows (or metrics cube cells)."""
     total_sales = df['Sales'].sum() if 'Sales' in df.columns else 0
     ad_spend = df['Spend'].sum() if 'Spend' in df.columns else 0
     orders = int(df['Orders'].sum()) if 'Orders' in df.columns else 0
@@ -191,23 +238,22 @@ def calculate_kpis(df: pd.DataFrame) -> dict:
 
 
 def calculate_campaign_metrics(df: pd.DataFrame) -> List[dict]:
-    """Calculate metrics grouped by campaign."""
+    """Calculate metrics grouped by campaign (from report rows or metrics cube cells)."""
     if 'Campaign Name' not in df.columns:
         return []
     
-    grouped = df.groupby('Campaign Name').agg({
+    # One grouped pass (on the categorical codes) for the metrics and the portfolio
+    aggregations = {
         'Impressions': 'sum',
         'Clicks': 'sum',
         'Spend': 'sum',
         'Sales': 'sum',
         'Orders': 'sum'
-    }).reset_index()
-    
-    # Add portfolio if available
+    }
     if 'Portfolio' in df.columns:
-        portfolios = df.groupby('Campaign Name')['Portfolio'].first().reset_index()
-        grouped = grouped.merge(portfolios, on='Campaign Name', how='left')
-    else:
+        aggregations['Portfolio'] = 'first'
+    grouped = df.groupby('Campaign Name', observed=True).agg(aggregations).reset_index()
+    if 'Portfolio' not in grouped.columns:
         grouped['Portfolio'] = None
     
     results = []
@@ -231,7 +277,7 @@ def calculate_campaign_metrics(df: pd.DataFrame) -> List[dict]:
 
 
 def calculate_monthly_data(df: pd.DataFrame) -> List[dict]:
-    """Calculate monthly aggregated sales and spend for charts."""
+    """Calculate monthly aggregated sales and spend for charts (rows or cube cells)."""
     if 'Date' not in df.columns:
         return []
     
@@ -0,0 +1,65 @@
+"""
+Compressed uploads.
+Opens gzip- and zip-compressed uploads (Amazon report downloads, our report
+archive) as streams of the reports they contain, decompressing on the fly as
+the parser reads, so the uncompressed bytes are never held in memory.
+
+- report.csv.gz: one report
+- reports.zip: every CSV/XLSX member, in archive order (folders, hidden files
+  and macOS resource forks are skipped)
+"""
+
+import gzip
+import posixpath
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+
+# Compressed container formats, by filename extension
+COMPRESSIONS = {'gz': 'gzip', 'zip': 'zip'}
+
+# Report formats accepted inside a container
+REPORT_EXTENSIONS = ('csv', 'xlsx', 'xls')
+
+
+def detect_compression(filename: str) -> Optional[str]:
+    """'gzip' or 'zip' for compressed uploads (from the extension), else None."""
+    return COMPRESSIONS.get(filename.lower().rsplit('.', 1)[-1])
+
+
+def inner_filename(filename: str) -> str:
+    """Name of the report inside a gzip file ('report.csv.gz' -> 'report.csv')."""
+    return filename[:-3] if filename.lower().endswith('.gz') else filename
+
+
+def is_report_member(name: str) -> bool:
+    """Whether a zip member is a report (not a folder, hidden file or resource fork)."""
+    base = posixpath.basename(name)
+    if not base or base.startswith('.') or name.startswith('__MACOSX/'):
+        return False
+    return base.lower().rsplit('.', 1)[-1] in REPORT_EXTENSIONS
+
+
+def iter_reports(source: BinaryIO, filename: str) -> Iterator[Tuple[str, BinaryIO]]:
+    """
+    Yield (report filename, readable stream) for each report in an upload. Plain
+    uploads yield `source` itself. Member streams decompress as they are read and
+    are closed once the next member is requested.
+    """
+    compression = detect_compression(filename)
+    if compression is None:
+        yield filename, source
+        return
+
+    if compression == 'gzip':
+        with gzip.GzipFile(fileobj=source, mode='rb') as stream:
+            yield inner_filename(filename), stream
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir() and is_report_member(info.filename)]
+        if not members:
+            raise ValueError(f"No CSV or XLSX report found in {filename}")
+        for info in members:
+            with archive.open(info) as stream:
+                yield posixpath.basename(info.filename), stream
@@ -0,0 +1,181 @@
+"""
+Bulk Index.
+Campaign, portfolio and ad group ID lookup tables of a Bulk Operations file,
+keyed by lower-cased, stripped names. Built once at bulk upload time and
+stored in the session next to the bulk file, so analysis and export requests
+resolve IDs with a few joins instead of re-normalizing the bulk file.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+import pandas as pd
+
+from services.parser import normalize_columns
+
+
+# Columns of BulkIndex.to_frame(): one row per lookup entry, `kind` naming its table
+FRAME_COLUMNS = ['kind', 'campaign_key', 'ad_group_key', 'id']
+
+
+def _name_key(series: pd.Series) -> pd.Series:
+    """Lookup key of a name column (lower-cased, stripped)."""
+    return series.astype(str).str.lower().str.strip()
+
+
+def _clean_ids(series: pd.Series) -> pd.Series:
+    """ID column as strings without the '.0' left by float parsing."""
+    return series.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+
+def _lookup_table(sources: List[Tuple[pd.Series, ...]], key_names: List[str], id_name: str) -> pd.DataFrame:
+    """Stack (key columns..., id column) sources in priority order; later sources and rows win."""
+    frames = [
+        pd.DataFrame({
+            **{name: _name_key(col) for name, col in zip(key_names, cols[:-1])},
+            id_name: _clean_ids(cols[-1]),
+        })
+        for cols in sources
+    ]
+    if not frames:
+        return pd.DataFrame(columns=key_names + [id_name], dtype=object)
+    table = pd.concat(frames, ignore_index=True)
+    return table.drop_duplicates(subset=key_names, keep='last').reset_index(drop=True)
+
+
+@dataclass
+class BulkIndex:
+    """ID lookup tables of a Bulk File; each key appears once, holding the last ID the file lists for it."""
+    campaigns: pd.DataFrame   # campaign_key, campaign_id
+    portfolios: pd.DataFrame  # campaign_key, portfolio_id
+    ad_groups: pd.DataFrame   # campaign_key, ad_group_key, ad_group_id
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        All three tables as one string DataFrame (FRAME_COLUMNS), which the
+        session store keeps as a compact Arrow file shared by all workers.
+        """
+        parts = [
+            self.campaigns.rename(columns={'campaign_id': 'id'}).assign(kind='campaign'),
+            self.portfolios.rename(columns={'portfolio_id': 'id'}).assign(kind='portfolio'),
+            self.ad_groups.rename(columns={'ad_group_id': 'id'}).assign(kind='ad_group'),
+        ]
+        frame = pd.concat(parts, ignore_index=True).reindex(columns=FRAME_COLUMNS)
+        frame['kind'] = frame['kind'].astype('category')
+        for col in FRAME_COLUMNS[1:]:
+            frame[col] = frame[col].astype(object).where(frame[col].notna(), None)
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'BulkIndex':
+        def table(kind: str, keys: List[str], id_name: str) -> pd.DataFrame:
+            rows = frame.loc[frame['kind'] == kind, keys + ['id']]
+            return rows.rename(columns={'id': id_name}).reset_index(drop=True)
+
+        return cls(
+            campaigns=table('campaign', ['campaign_key'], 'campaign_id'),
+            portfolios=table('portfolio', ['campaign_key'], 'portfolio_id'),
+            ad_groups=table('ad_group', ['campaign_key', 'ad_group_key'], 'ad_group_id'),
+        )
+
+
+def build_bulk_index(bulk_df: pd.DataFrame) -> BulkIndex:
+    """
+    Build the ID lookup tables of a Bulk File. Names come from the standard
+    columns first, then the '(Informational only)' columns.
+    """
+    bdf = bulk_df
+    if 'Entity' in bdf.columns and 'Record Type' not in bdf.columns:
+        bdf = bdf.rename(columns={'Entity': 'Record Type'})
+    bdf = normalize_columns(bdf)
+    columns = {c.lower().strip(): c for c in bdf.columns}
+    c_info_col = columns.get('campaign name (informational only)')
+    a_info_col = columns.get('ad group name (informational only)')
+
+    # 1. Campaign IDs & Portfolio IDs
+    campaign_sources = []
+    portfolio_sources = []
+    if 'Campaign ID' in bdf.columns:
+        for name_col in ('Campaign Name', c_info_col):
+            if name_col is None or name_col not in bdf.columns:
+                continue
+            rows = bdf.dropna(subset=[name_col, 'Campaign ID'])
+            campaign_sources.append((rows[name_col], rows['Campaign ID']))
+            if 'Portfolio ID' in bdf.columns:
+                rows = rows.dropna(subset=['Portfolio ID'])
+                portfolio_sources.append((rows[name_col], rows['Portfolio ID']))
+
+    # 2. Ad Group IDs
+    ag_id_col = 'Ad Group ID'
+    if 'Ad Group ID' not in bdf.columns and 'Ad Group' in bdf.columns and 'Ad Group Name' in bdf.columns:
+        ag_id_col = 'Ad Group'
+
+    ad_group_sources = []
+    if ag_id_col in bdf.columns:
+        for name_cols in (('Campaign Name', 'Ad Group Name'), (c_info_col, a_info_col)):
+            if not all(col is not None and col in bdf.columns for col in name_cols):
+                continue
+            rows = bdf.dropna(subset=[*name_cols, ag_id_col])
+            ad_group_sources.append((rows[name_cols[0]], rows[name_cols[1]], rows[ag_id_col]))
+
+    return BulkIndex(
+        campaigns=_lookup_table(campaign_sources, ['campaign_key'], 'campaign_id'),
+        portfolios=_lookup_table(portfolio_sources, ['campaign_key'], 'portfolio_id'),
+        ad_groups=_lookup_table(ad_group_sources, ['campaign_key', 'ad_group_key'], 'ad_group_id'),
+    )
+
+
+def _set_id(item: object, field: str, value: Optional[str]) -> None:
+    """Set an ID on a dict or object, skipping empty IDs and fields a model doesn't declare."""
+    if not isinstance(value, str) or not value:
+        return
+    if isinstance(item, dict):
+        item[field] = value
+        return
+    fields = getattr(type(item), 'model_fields', None)
+    if fields is None or field in fields:
+        setattr(item, field, value)
+
+
+def enrich_with_ids(items: List[object], bulk: Union[pd.DataFrame, BulkIndex]) -> int:
+    """
+    Enrich a list of items (objects or dicts) with Campaign ID, Ad Group ID, and Portfolio ID
+    from a Bulk File's index, or the Bulk File DataFrame itself.
+    Returns the number of items enriched with at least an Ad Group ID.
+    """
+    if not items or (isinstance(bulk, pd.DataFrame) and bulk.empty):
+        return 0
+
+    try:
+        index = bulk if isinstance(bulk, BulkIndex) else build_bulk_index(bulk)
+
+        # Handle both dicts and objects (Pydantic models)
+        if isinstance(items[0], dict):
+            names = [(item.get('campaign_name', ''), item.get('ad_group_name', '')) for item in items]
+        else:
+            names = [(getattr(item, 'campaign_name', ''), getattr(item, 'ad_group_name', '')) for item in items]
+        keys = pd.DataFrame(names, columns=['campaign_key', 'ad_group_key'], dtype=object)
+        keys['campaign_key'] = _name_key(keys['campaign_key'])
+        keys['ad_group_key'] = _name_key(keys['ad_group_key'])
+
+        # Left joins keep the item order (each table key is unique)
+        matched = (
+            keys.merge(index.campaigns, on='campaign_key', how='left')
+            .merge(index.portfolios, on='campaign_key', how='left')
+            .merge(index.ad_groups, on=['campaign_key', 'ad_group_key'], how='left')
+        )
+
+        ids = [
+            matched[col].to_numpy(dtype=object, na_value=None)
+            for col in ('campaign_id', 'portfolio_id', 'ad_group_id')
+        ]
+        for item, cid, pid, agid in zip(items, *ids):
+            _set_id(item, 'campaign_id', cid)
+            _set_id(item, 'portfolio_id', pid)
+            _set_id(item, 'ad_group_id', agid)
+
+        return sum(agid is not None for agid in ids[2])
+
+    except Exception as e:
+        print(f"ID Enrichment Failed: {e}")
+        return 0
@@ -3,16 +3,28 @@ Bulk Optimizer Service.
 Generates Amazon Bulk Operations files for Bid and Budget optimizations.
 """
 
-import pandas as pd
 from io import BytesIO
-from typing import List, Dict, Any
+from typing import Iterable, Iterator, List, Dict, Any
 
-def generate_bid_changes_file(items: List[Dict[str, Any]]) -> BytesIO:
-    """
-    Generate bulk file for Bid Changes (e.g. Scale Up, High CPC Down).
-    """
-    rows = []
-    
+from services.bulk_rows import BulkRow, BulkSchema
+from services.bulk_writer import write_bulk_file
+
+
+# Column order (Amazon standard preference)
+BID_CHANGE_COLUMNS = [
+    'Record Type', 'Campaign Name', 'Campaign ID', 'Ad Group Name',
+    'Ad Group ID', 'Portfolio ID', 'Keyword Text', 'Product Target',
+    'Match Type', 'Max Bid', 'Operation'
+]
+
+BUDGET_CHANGE_COLUMNS = ['Record Type', 'Campaign Name', 'Campaign ID', 'Daily Budget', 'Operation']
+
+BID_CHANGE_SCHEMA = BulkSchema(BID_CHANGE_COLUMNS)
+BUDGET_CHANGE_SCHEMA = BulkSchema(BUDGET_CHANGE_COLUMNS)
+
+
+def iter_bid_change_rows(items: Iterable[Dict[str, Any]]) -> Iterator[BulkRow]:
+    """Bid change rows (BID_CHANGE_SCHEMA)."""
     for item in items:
         # Determine Record Type based on Targeting format
         # This is a heuristic - ideally we'd pass this info explicitly
@@ -20,8 +32,8 @@ def generate_bid_changes_file(items: List[Dict[str, Any]]) -> BytesIO:
         record_type = "Keyword"
         if targeting.lower().startswith('b0') or 'asin=' in targeting.lower():
             record_type = "Product Target"
-            
-        row = {
+
+        yield BID_CHANGE_SCHEMA.row({
             'Record Type': record_type,
             'Campaign Name': item.get('campaign_name'),
             'Campaign ID': item.get('campaign_id'),
@@ -33,54 +45,32 @@ def generate_bid_changes_file(items: List[Dict[str, Any]]) -> BytesIO:
             'Match Type': item.get('match_type'),
             'Max Bid': item.get('suggested_bid'),
             'Operation': 'Update'
-        }
-        
-        rows.append(row)
-        
-    df = pd.DataFrame(rows)
-    
-    # Reorder columns to Amazon standard preference (optional but good)
-    columns = [
-        'Record Type', 'Campaign Name', 'Campaign ID', 'Ad Group Name', 
-        'Ad Group ID', 'Portfolio ID', 'Keyword Text', 'Product Target', 
-        'Match Type', 'Max Bid', 'Operation'
-    ]
-    # Filter only columns that exist
-    columns = [c for c in columns if c in df.columns]
-    df = df[columns]
-    
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Bid Changes')
-        
-    output.seek(0)
-    return output
+        })
 
 
-def generate_budget_changes_file(items: List[Dict[str, Any]]) -> BytesIO:
-    """
-    Generate bulk file for Campaign Budget Changes.
-    """
-    rows = []
-    
+def iter_budget_change_rows(items: Iterable[Dict[str, Any]]) -> Iterator[BulkRow]:
+    """Budget change rows (BUDGET_CHANGE_SCHEMA)."""
     for item in items:
-        row = {
+        yield BUDGET_CHANGE_SCHEMA.row({
             'Record Type': 'Campaign',
             'Campaign Name': item.get('campaign_name'),
             'Campaign ID': item.get('campaign_id'),
             'Daily Budget': item.get('suggested_budget'),
             'Operation': 'Update'
-        }
-        rows.append(row)
-    
-    df = pd.DataFrame(rows)
-    
-    columns = ['Record Type', 'Campaign Name', 'Campaign ID', 'Daily Budget', 'Operation']
-    df = df[columns]
-    
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Budget Changes')
-        
-    output.seek(0)
-    return output
+        })
+
+
+def generate_bid_changes_file(items: List[Dict[str, Any]], format: str = 'xlsx') -> BytesIO:
+    """
+    Generate bulk file for Bid Changes (e.g. Scale Up, High CPC Down).
+    """
+    return write_bulk_file(BID_CHANGE_SCHEMA, iter_bid_change_rows(items), sheet_name='Bid Changes', format=format)
+
+
+def generate_budget_changes_file(items: List[Dict[str, Any]], format: str = 'xlsx') -> BytesIO:
+    """
+    Generate bulk file for Campaign Budget Changes.
+    """
+    return write_bulk_file(
+        BUDGET_CHANGE_SCHEMA, iter_budget_change_rows(items), sheet_name='Budget Changes', format=format
+    )
@@ -0,0 +1,79 @@
+"""
+Bulk Sheet Rows.
+Compact row model shared by the bulk file generators.
+
+A BulkSchema fixes the column order of a bulk sheet once; each BulkRow keeps
+only the cells that were set (column position -> value) in a __slots__ object,
+instead of a dict holding every column. Bulk rows typically set fewer than 10
+of 25-46 columns, and the writers (services/bulk_writer.py) emit the set cells
+straight from their positions.
+"""
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+class BulkSchema:
+    """Fixed column order of a bulk sheet."""
+
+    __slots__ = ('columns', 'positions')
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns: List[str] = list(columns)
+        self.positions: Dict[str, int] = {col: i for i, col in enumerate(self.columns)}
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def row(self, cells: Optional[Mapping[str, Any]] = None) -> 'BulkRow':
+        """New row, optionally filled from a column -> value mapping."""
+        row = BulkRow(self)
+        if cells:
+            row.update(cells)
+        return row
+
+
+class BulkRow:
+    """
+    One bulk sheet row. Supports the dict operations the generators use
+    (row[col] = value, row.update(...), row.get(col)); unset cells read as None
+    and unknown columns raise KeyError.
+    """
+
+    __slots__ = ('schema', 'cells')
+
+    def __init__(self, schema: BulkSchema):
+        self.schema = schema
+        self.cells: Dict[int, Any] = {}
+
+    def __setitem__(self, column: str, value: Any) -> None:
+        self.cells[self.schema.positions[column]] = value
+
+    def __getitem__(self, column: str) -> Any:
+        return self.cells.get(self.schema.positions[column])
+
+    def get(self, column: str, default: Any = None) -> Any:
+        position = self.schema.positions.get(column)
+        return self.cells.get(position, default) if position is not None else default
+
+    def update(self, cells: Mapping[str, Any]) -> None:
+        positions = self.schema.positions
+        for column, value in cells.items():
+            self.cells[positions[column]] = value
+
+    def set_cells(self) -> List[Tuple[int, Any]]:
+        """(position, value) of the set cells, in column order."""
+        return sorted(self.cells.items())
+
+    def values(self) -> List[Any]:
+        """All values in column order (None where unset)."""
+        values = [None] * len(self.schema.columns)
+        for position, value in self.cells.items():
+            values[position] = value
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.schema.columns, self.values()))
+
+    def __repr__(self) -> str:
+        cells = {self.schema.columns[i]: v for i, v in self.set_cells()}
+        return f'BulkRow({cells!r})'
@@ -0,0 +1,83 @@
+"""
+Bulk File Writer.
+Writes bulk sheet rows as XLSX (services/xlsx_writer.py), CSV or TSV.
+
+Rows are written one at a time as they are generated; the delimited formats
+skip the spreadsheet package entirely, which makes them the cheapest output
+when the consumer accepts them.
+"""
+
+import codecs
+import csv
+import math
+import numbers
+from io import BytesIO
+from typing import Any, BinaryIO, Iterable, List, Union
+
+import pandas as pd
+
+from services.bulk_rows import BulkRow, BulkSchema
+from services.xlsx_writer import write_sheet
+
+
+# format -> (media type, file extension)
+BULK_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv', 'csv'),
+    'tsv': ('text/tab-separated-values', 'tsv'),
+}
+
+_DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+
+def _text(value: Any) -> Any:
+    """Cell value for a delimited file (missing values are empty, like DataFrame.to_csv)."""
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, numbers.Real):
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    return None if pd.isna(value) else value
+
+
+def write_delimited(
+    output: BinaryIO,
+    columns: List[str],
+    rows: Iterable[Union[dict, BulkRow]],
+    delimiter: str = ','
+) -> int:
+    """
+    Write a header row plus one row per dict (values looked up by column name)
+    or BulkRow as UTF-8 delimited text into `output`. Returns the number of data rows.
+    """
+    stream = codecs.getwriter('utf-8')(output)
+    writer = csv.writer(stream, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        if isinstance(row, BulkRow) and row.schema.columns is columns:
+            values = row.values()
+        else:
+            values = [row.get(col) for col in columns]
+        writer.writerow([_text(value) for value in values])
+        count += 1
+    return count
+
+
+def write_bulk_file(
+    schema: BulkSchema,
+    rows: Iterable[Union[dict, BulkRow]],
+    sheet_name: str,
+    format: str = 'xlsx'
+) -> BytesIO:
+    """Bulk file of the schema's columns in the given format ('xlsx', 'csv' or 'tsv'), rewound for reading."""
+    if format not in BULK_FORMATS:
+        raise ValueError(f"Unsupported bulk file format: {format}")
+    output = BytesIO()
+    if format == 'xlsx':
+        write_sheet(output, schema.columns, rows, sheet_name)
+    else:
+        write_delimited(output, schema.columns, rows, _DELIMITERS[format])
+    output.seek(0)
+    return output
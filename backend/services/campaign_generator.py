@@ -4,11 +4,13 @@ Generates Amazon-compliant bulk upload files for Sponsored Products Auto campaig
 Uses official Amazon Advertising bulksheet column format.
 """
 
-import pandas as pd
 from io import BytesIO
 from typing import List, Optional
 from datetime import date
 
+from services.bulk_rows import BulkRow, BulkSchema
+from services.bulk_writer import write_bulk_file
+
 
 # Amazon Sponsored Products Bulksheet columns (official format)
 BULK_COLUMNS = [
@@ -40,9 +42,12 @@ BULK_COLUMNS = [
 ]
 
 
-def create_empty_row() -> dict:
+BULK_SCHEMA = BulkSchema(BULK_COLUMNS)
+
+
+def create_empty_row() -> BulkRow:
     """Create an empty row with all columns."""
-    return {col: '' for col in BULK_COLUMNS}
+    return BULK_SCHEMA.row()
 
 
 def generate_campaign_row(
@@ -51,7 +56,7 @@ def generate_campaign_row(
     bidding_strategy: str,
     start_date: date,
     portfolio_id: Optional[str] = None
-) -> dict:
+) -> BulkRow:
     """Generate a campaign row for bulk upload."""
     row = create_empty_row()
     row.update({
@@ -75,7 +80,7 @@ def generate_bidding_adjustment_row(
     campaign_name: str,
     placement: str,
     percentage: int
-) -> dict:
+) -> BulkRow:
     """
     Generate a bidding adjustment row for placement bid modifiers.
     
@@ -101,7 +106,7 @@ def generate_ad_group_row(
     campaign_name: str,
     ad_group_name: str,
     default_bid: float
-) -> dict:
+) -> BulkRow:
     """Generate an ad group row for bulk upload."""
     row = create_empty_row()
     row.update({
@@ -122,7 +127,7 @@ def generate_product_ad_row(
     campaign_name: str,
     ad_group_name: str,
     sku: str
-) -> dict:
+) -> BulkRow:
     """Generate a product ad row for a SKU."""
     row = create_empty_row()
     row.update({
@@ -144,7 +149,7 @@ def generate_auto_targeting_row(
     ad_group_name: str,
     targeting_type: str,
     bid: Optional[float] = None
-) -> dict:
+) -> BulkRow:
     """
     Generate an auto targeting row for bulk upload.
     
@@ -178,7 +183,8 @@ def generate_auto_campaign_bulk_file(
     start_date: date,
     ad_groups: List[dict],
     portfolio: Optional[str] = None,
-    placement_bid_adjustment: Optional[dict] = None
+    placement_bid_adjustment: Optional[dict] = None,
+    format: str = 'xlsx'
 ) -> BytesIO:
     """
     Generate an Amazon-compliant bulk upload file for an auto campaign.
@@ -205,9 +211,10 @@ def generate_auto_campaign_bulk_file(
             - top_of_search: int (0-900)
             - product_pages: int (0-900)
             - rest_of_search: int (0-900)
+        format: Output format, 'xlsx', 'csv' or 'tsv'
     
     Returns:
-        BytesIO object containing the Excel file
+        BytesIO object containing the bulk file
     """
     rows = []
     
@@ -296,16 +303,8 @@ def generate_auto_campaign_bulk_file(
                 bid=ag.get('complements_bid')
             ))
     
-    # Create DataFrame with Amazon column order
-    df = pd.DataFrame(rows, columns=BULK_COLUMNS)
-    
-    # Write to Excel
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Sponsored Products Campaigns', index=False)
-    
-    output.seek(0)
-    return output
+    # Write with Amazon column order
+    return write_bulk_file(BULK_SCHEMA, rows, sheet_name='Sponsored Products Campaigns', format=format)
 
 
 def validate_ad_group_config(ad_group: dict) -> List[str]:
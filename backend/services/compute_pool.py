@@ -0,0 +1,211 @@
+"""
+Compute Pool.
+Runs CPU-bound work (parsing, analysis, Decision Center, bulk-file generation)
+off the asyncio event loop, so one large request doesn't stall every other
+request on the worker.
+
+Work is dispatched to a thread or process pool with bounded concurrency: at
+most `max_workers` calls run at once, up to `max_queue` more wait for a slot,
+and further calls are rejected with 503. Each call has a timeout (504).
+
+Configuration (environment variables):
+- PPC_COMPUTE_EXECUTOR: 'thread' (default) or 'process'. Process pools need
+  picklable module-level functions and a session store shared between
+  processes ('disk' or 'redis', see services/session_store.py)
+- PPC_COMPUTE_WORKERS: concurrent calls (default: CPU count, at most 8)
+- PPC_COMPUTE_QUEUE: calls allowed to wait for a slot (default 64)
+- PPC_COMPUTE_TIMEOUT: seconds per call (default 300; 0 disables)
+
+A call that times out is abandoned but keeps running in its worker until done
+(threads can't be interrupted), so it still holds its concurrency slot.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+
+class _RaisedHTTPException:
+    __slots__ = ('status_code', 'detail')
+
+    def __init__(self, status_code: int, detail: Any):
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _invoke(fn: Callable, args: tuple, kwargs: dict) -> Any:
+    """
+    Run fn in a pool worker. HTTPExceptions are returned rather than raised, since
+    they don't survive pickling across a process boundary.
+    """
+    try:
+        return fn(*args, **kwargs)
+    except HTTPException as e:
+        return _RaisedHTTPException(e.status_code, e.detail)
+
+
+class ComputePool:
+    """Bounded executor for CPU-bound calls made from async routes."""
+
+    def __init__(
+        self,
+        executor: str = 'thread',
+        max_workers: int = 4,
+        max_queue: Optional[int] = 64,
+        timeout: Optional[float] = 300
+    ):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Unknown compute executor: {executor}")
+        self.executor_kind = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ppc-compute')
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        return self._slots
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Await fn(*args, **kwargs) in the pool. `timeout` overrides the pool
+        default for this call (the wait for a slot counts towards it).
+        """
+        slots = self._get_slots()
+        if self.max_queue is not None and self.running + self.waiting >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry shortly")
+
+        # Counted before the first await, so concurrent callers see each other
+        self.waiting += 1
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            result = await asyncio.wait_for(self._run(slots, fn, args, kwargs), timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=504, detail="Request timed out")
+
+        if isinstance(result, _RaisedHTTPException):
+            raise HTTPException(status_code=result.status_code, detail=result.detail)
+        return result
+
+    async def _run(self, slots: asyncio.Semaphore, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        try:
+            await slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._get_executor(), _invoke, fn, args, kwargs)
+        # Keep the slot until the worker is actually free, even if the caller gave up
+        future.add_done_callback(lambda _: self._release(slots))
+        self.running += 1
+        return await asyncio.shield(future)
+
+    def _release(self, slots: asyncio.Semaphore) -> None:
+        self.running -= 1
+        self.completed += 1
+        slots.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'executor': self.executor_kind,
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'timeout_seconds': self.timeout,
+            'running': self.running,
+            'waiting': self.waiting,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic timer fires. A loop blocked by
+    synchronous work shows up as lag roughly equal to the blocking time.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'event_loop_lag_ms': round(self.last_lag * 1000, 2),
+            'event_loop_max_lag_ms': round(self.max_lag * 1000, 2),
+        }
+
+
+def _env_number(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def create_compute_pool() -> ComputePool:
+    """Create the compute pool configured by PPC_COMPUTE_* environment variables."""
+    queue = int(_env_number('PPC_COMPUTE_QUEUE', 64))
+    return ComputePool(
+        executor=os.environ.get('PPC_COMPUTE_EXECUTOR', 'thread').lower(),
+        max_workers=int(_env_number('PPC_COMPUTE_WORKERS', min(os.cpu_count() or 1, 8))),
+        max_queue=queue if queue >= 0 else None,
+        timeout=_env_number('PPC_COMPUTE_TIMEOUT', 300) or None
+    )
+
+
+# Shared by all routers of this worker
+compute_pool = create_compute_pool()
+loop_lag = LoopLagMonitor()
+
+
+async def run_cpu(fn: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound call in the shared compute pool."""
+    return await compute_pool.run(fn, *args, **kwargs)
@@ -0,0 +1,123 @@
+"""
+Ingestion Plans.
+Registry of compiled Search Term Report ingestion plans (services/parser.py:
+IngestionPlan), keyed by a fingerprint of the raw header row.
+
+Uploads come in a small number of Amazon report layouts, so almost every upload
+finds its plan here and skips column detection (normalization, alias scan,
+validation, projection and kernel selection). New layouts are compiled once and
+saved as JSON files, shared by all workers and kept across restarts.
+
+Configuration (environment variables):
+- PPC_PLAN_DIR: directory for learned plans (default: <tmp>/ppc_ingestion_plans)
+- PPC_PLAN_ENTRIES: plans kept in memory per worker (default 1024)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from services.parser import IngestionPlan, compile_ingestion_plan
+
+
+# Bump whenever compile_ingestion_plan changes, so plans learned by older code are recompiled
+PLAN_FORMAT = 1
+
+
+def header_fingerprint(columns: List[str]) -> str:
+    """Hash of a raw header row (names, order and plan format)."""
+    raw = json.dumps([str(col) for col in columns], ensure_ascii=False)
+    return hashlib.sha256(f'{PLAN_FORMAT}:{raw}'.encode('utf-8')).hexdigest()[:32]
+
+
+class PlanRegistry:
+    """Memory LRU of ingestion plans backed by a directory of JSON files (None = memory only)."""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: Optional[int] = 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[str, IngestionPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loaded = 0
+        self.learned = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f'{fingerprint}.json')
+
+    def _load(self, fingerprint: str, columns: List[str]) -> Optional[IngestionPlan]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(fingerprint), encoding='utf-8') as f:
+                plan = IngestionPlan.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None  # Not learned yet, or unreadable: recompile
+        return plan if plan.columns == columns else None
+
+    def _save(self, fingerprint: str, plan: IngestionPlan) -> None:
+        if not self.directory:
+            return
+        path = self._path(fingerprint)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(plan.to_dict(), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            # Not persisted; this worker still keeps the plan in memory
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def plan_for(self, columns: List[str]) -> IngestionPlan:
+        """Plan of a raw header row: from memory, else from disk, else compiled and saved."""
+        columns = list(columns)
+        fingerprint = header_fingerprint(columns)
+        with self._lock:
+            plan = self._plans.get(fingerprint)
+            if plan is not None and plan.columns == columns:
+                self._plans.move_to_end(fingerprint)
+                self.hits += 1
+                return plan
+
+        plan = self._load(fingerprint, columns)
+        learned = plan is None
+        if learned:
+            plan = compile_ingestion_plan(columns)
+            self._save(fingerprint, plan)
+
+        with self._lock:
+            if learned:
+                self.learned += 1
+            else:
+                self.loaded += 1
+            self._plans[fingerprint] = plan
+            self._plans.move_to_end(fingerprint)
+            while self.max_entries is not None and len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'loaded': self.loaded,
+                'learned': self.learned,
+                'entries': len(self._plans),
+            }
+
+
+def create_plan_registry() -> PlanRegistry:
+    """Build the plan registry from environment settings (see module docstring)."""
+    directory = os.environ.get('PPC_PLAN_DIR') or os.path.join(tempfile.gettempdir(), 'ppc_ingestion_plans')
+    max_entries = int(os.environ.get('PPC_PLAN_ENTRIES') or 1024)
+    return PlanRegistry(directory, max_entries=max_entries or None)
@@ -0,0 +1,193 @@
+"""
+Background Jobs.
+Runs long uploads and analyses outside the HTTP request, so clients submit a
+job, poll its status and fetch the result instead of holding a connection open
+past proxy timeouts.
+
+Job records, progress and results live in the session store ("<job_id>_job",
+"<job_id>_job_progress", "<job_id>_job_result"), so any worker can answer
+polls. Progress is stored apart from the record, so progress reports from the
+job's thread never write back a stale status. Jobs run in the worker that
+accepted them (a local in-process queue): at most `max_running` at once, the
+rest wait queued. Their CPU-bound steps go through the compute pool
+(services/compute_pool.py).
+
+Cancelling a queued job drops it; a running job stops at its next
+cancellation check (e.g. between CSV chunks), or else its result is discarded.
+A finished status is never overwritten.
+
+Configuration (environment variables):
+- PPC_JOB_CONCURRENCY: jobs running at once per worker (default 2)
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.session_store import SessionStore
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled."""
+
+
+class JobContext:
+    """Handle passed to a running job for progress reports and cancellation checks."""
+
+    def __init__(self, manager: 'JobManager', job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+
+    def progress(self, **fields) -> None:
+        """Merge fields into the job's progress (visible to status polls)."""
+        self.manager._progress(self.job_id, fields)
+
+    def cancelled(self) -> bool:
+        return self.manager.is_cancelled(self.job_id)
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if the job was cancelled (safe to call from threads)."""
+        if self.cancelled():
+            raise JobCancelled()
+
+
+def job_key(job_id: str) -> str:
+    return f"{job_id}_job"
+
+
+def job_progress_key(job_id: str) -> str:
+    return f"{job_id}_job_progress"
+
+
+def job_result_key(job_id: str) -> str:
+    return f"{job_id}_job_result"
+
+
+class JobManager:
+    """Local in-process job queue backed by the session store."""
+
+    def __init__(self, store: SessionStore, max_running: int = 2):
+        self.store = store
+        self.max_running = max_running
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        return self._slots
+
+    def _update(self, job_id: str, **fields) -> dict:
+        job = dict(self.store.get(job_key(job_id)) or {})
+        if job.get('status') in FINISHED:
+            return job  # Finished elsewhere first (e.g. cancelled from another worker)
+        job.update(fields)
+        self.store[job_key(job_id)] = job
+        return job
+
+    def _progress(self, job_id: str, fields: dict) -> None:
+        # Only the job's own thread writes its progress, so this merge doesn't race
+        progress = self.store.get(job_progress_key(job_id)) or {}
+        self.store[job_progress_key(job_id)] = {**progress, **fields}
+
+    def submit(
+        self,
+        kind: str,
+        work: Callable[[JobContext], Awaitable[Any]],
+        on_finish: Optional[Callable[[], None]] = None
+    ) -> dict:
+        """
+        Queue `work(ctx)` as a job and return its record. The value work returns
+        is stored as the job result. `on_finish` runs once the job ends, even if
+        it was cancelled before it started (e.g. to remove temporary files).
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': QUEUED,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {},
+            'error': None,
+        }
+        self.store[job_key(job_id)] = job
+        task = asyncio.get_running_loop().create_task(self._run(job_id, work, on_finish))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+        return job
+
+    async def _run(
+        self,
+        job_id: str,
+        work: Callable[[JobContext], Awaitable[Any]],
+        on_finish: Optional[Callable[[], None]]
+    ) -> None:
+        ctx = JobContext(self, job_id)
+        try:
+            async with self._get_slots():
+                ctx.check_cancelled()
+                self._update(job_id, status=RUNNING, started_at=time.time())
+                result = await work(ctx)
+                ctx.check_cancelled()
+                self.store[job_result_key(job_id)] = result
+                self._update(job_id, status=DONE, finished_at=time.time())
+        except (JobCancelled, asyncio.CancelledError):
+            self._update(job_id, status=CANCELLED, finished_at=time.time())
+        except Exception as e:
+            if self.is_cancelled(job_id):
+                return
+            # HTTPExceptions from the shared route helpers carry the useful message
+            self._update(job_id, status=FAILED, finished_at=time.time(), error=str(getattr(e, 'detail', e)))
+        finally:
+            if on_finish is not None:
+                on_finish()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_key(job_id))
+        if job is None:
+            return None
+        progress = self.store.get(job_progress_key(job_id))
+        return {**job, 'progress': progress} if progress else job
+
+    def result(self, job_id: str) -> Any:
+        """Result of a finished job (KeyError if there is none)."""
+        return self.store[job_result_key(job_id)]
+
+    def is_cancelled(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return job is None or job.get('status') == CANCELLED
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Cancel a job. Jobs queued in this worker are dropped at once; jobs running
+        here or in other workers see the flag at their next check.
+        """
+        job = self.get(job_id)
+        if job is None or job['status'] in FINISHED:
+            return job
+        self._update(job_id, status=CANCELLED, finished_at=time.time())
+        job = self.get(job_id)
+        task = self._tasks.get(job_id)
+        if task is not None and job.get('started_at') is None:
+            task.cancel()
+        return job
+
+
+def create_job_manager(store: SessionStore) -> JobManager:
+    """Create the job manager configured by PPC_JOB_CONCURRENCY."""
+    return JobManager(store, max_running=int(os.environ.get('PPC_JOB_CONCURRENCY') or 2))
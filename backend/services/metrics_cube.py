@@ -0,0 +1,60 @@
+"""
+Metrics Cube.
+Pre-aggregated rollup of a Search Term Report over (campaign, ad group, match type,
+portfolio, date), built once per session. The KPI, campaign and monthly
+calculations only sum metrics, so they give the same results on cube cells as on
+raw rows while touching far fewer rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Cube dimensions (every dashboard filter and grouping is on one of these)
+CUBE_DIMENSIONS = ['Campaign Name', 'Ad Group Name', 'Match Type', 'Portfolio', 'Date']
+
+# Summed metrics
+CUBE_METRICS = ['Impressions', 'Clicks', 'Spend', 'Sales', 'Orders']
+
+# Number of report rows in each cell
+ROWS_COLUMN = 'Rows'
+
+
+def build_metrics_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roll a processed Search Term Report up to one row per distinct combination of
+    the cube dimensions. Cells keep the order of their first report row, so
+    order-dependent aggregations (e.g. the first Portfolio of a campaign) match.
+    Rows with missing dimension values keep cells of their own.
+    """
+    dimensions = [c for c in CUBE_DIMENSIONS if c in df.columns]
+    metrics = [c for c in CUBE_METRICS if c in df.columns]
+    rows = df[dimensions + metrics].assign(**{ROWS_COLUMN: np.ones(len(df), dtype=np.int64)})
+    if not dimensions:
+        return rows.sum().to_frame().T
+
+    cube = rows.groupby(dimensions, observed=True, dropna=False, sort=False).sum()
+    return cube.reset_index()
+
+
+def cube_row_count(cube: pd.DataFrame) -> int:
+    """Number of report rows a cube was built from."""
+    return int(cube[ROWS_COLUMN].sum()) if ROWS_COLUMN in cube.columns else -1
+
+
+def update_metrics_cube(cube: pd.DataFrame, rows: pd.DataFrame, dates, keep_from=None) -> pd.DataFrame:
+    """
+    Cube after replacing the cells of `dates` with the rollup of `rows` (every
+    report row on those dates), without re-rolling the other dates. With
+    `keep_from`, cells dated before it are dropped.
+    """
+    keep = ~cube['Date'].isin(dates)
+    if keep_from is not None:
+        keep &= ~(cube['Date'] < keep_from)
+    cells = [cube[keep.to_numpy()], build_metrics_cube(rows)]
+    updated = pd.concat(cells, ignore_index=True)
+    # Keep the categorical dimensions categorical (categories of both parts)
+    for col in cube.select_dtypes('category').columns:
+        if col in updated.columns and not isinstance(updated[col].dtype, pd.CategoricalDtype):
+            updated[col] = updated[col].astype('category')
+    return updated
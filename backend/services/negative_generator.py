@@ -3,10 +3,11 @@ Negative Keyword and Product Target Generator.
 Generates Amazon-compliant bulk upload files for negatives.
 """
 
-import pandas as pd
 from io import BytesIO
-from typing import List
+from typing import Iterable, Iterator, List
 from services.parser import is_asin
+from services.bulk_rows import BulkRow, BulkSchema
+from services.bulk_writer import write_bulk_file
 
 
 # Standard Amazon Bulk Upload Columns (v2.0 / Extended)
@@ -69,21 +70,19 @@ def classify_negative_type(search_term: str) -> str:
     return 'negative_keyword'
 
 
-def generate_empty_row() -> dict:
+NEGATIVE_SCHEMA = BulkSchema(BULK_HEADERS)
+
+
+def generate_empty_row() -> BulkRow:
     """Create a row with all headers empty."""
-    return {col: None for col in BULK_HEADERS}
+    return NEGATIVE_SCHEMA.row()
 
 
-def generate_negatives_bulk_file(
-    selected_items: List[dict],
+def iter_negative_rows(
+    selected_items: Iterable[dict],
     use_negative_phrase: bool = False
-) -> BytesIO:
-    """
-    Generate an Amazon-compliant bulk upload file for negative keywords and product targets.
-    Uses the single-sheet format with specific headers.
-    """
-    rows = []
-    
+) -> Iterator[BulkRow]:
+    """Bulk sheet rows (NEGATIVE_SCHEMA) for negative keywords and product targets."""
     match_type = 'Negative Phrase' if use_negative_phrase else 'Negative Exact'
     
     for item in selected_items:
@@ -137,25 +136,29 @@ def generate_negatives_bulk_file(
             row['Keyword Text'] = search_term
             row['Match Type'] = match_type
             
-        rows.append(row)
-    
-    # Create DataFrame
-    output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        if not rows:
-            # Empty template
-            df = pd.DataFrame(columns=BULK_HEADERS)
-        else:
-            df = pd.DataFrame(rows, columns=BULK_HEADERS)
-            
-        # Write to "Sponsored Products Campaigns" sheet (Standard for Bulk 2.0)
-        # Or "Bulk" as in macro? Macro reads from Bulk, writes to "Working" then likely used for upload.
-        # Standard sheet name is "Sponsored Products Campaigns".
-        df.to_excel(writer, sheet_name='Sponsored Products Campaigns', index=False)
-    
-    output.seek(0)
-    return output
+        yield row
+
+
+def generate_negatives_bulk_file(
+    selected_items: List[dict],
+    use_negative_phrase: bool = False,
+    format: str = 'xlsx'
+) -> BytesIO:
+    """
+    Generate an Amazon-compliant bulk upload file for negative keywords and product targets.
+    Uses the single-sheet format with specific headers.
+    Rows are streamed into the file (no items gives the header-only template);
+    `format` is 'xlsx', 'csv' or 'tsv'.
+    """
+    # Write to "Sponsored Products Campaigns" sheet (Standard for Bulk 2.0)
+    # Or "Bulk" as in macro? Macro reads from Bulk, writes to "Working" then likely used for upload.
+    # Standard sheet name is "Sponsored Products Campaigns".
+    return write_bulk_file(
+        NEGATIVE_SCHEMA,
+        iter_negative_rows(selected_items, use_negative_phrase),
+        sheet_name='Sponsored Products Campaigns',
+        format=format
+    )
 
 
 def generate_negatives_csv(
@@ -165,12 +168,4 @@ def generate_negatives_csv(
     """
     Generate a CSV bulk upload file for negative keywords.
     """
-    # Simply reuse the Excel logic but save as CSV
-    # Note: CSV usually doesn't have sheets, but structure is same rows
-    excel_io = generate_negatives_bulk_file(selected_items, use_negative_phrase)
-    df = pd.read_excel(excel_io)
-    
-    output = BytesIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-    return output
+    return generate_negatives_bulk_file(selected_items, use_negative_phrase, format='csv')
@@ -3,8 +3,9 @@ Optimization Service.
 Contains logic for generating actionable insights for the Decision Engine.
 """
 
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 from models.schemas import (
     BleedingSpendItem,
     HighACOSItem,
@@ -12,6 +13,238 @@ from models.schemas import (
     BudgetSaturationItem,
     HealthScore
 )
+from services.rules import Rule, evaluate_rules
+
+
+# Declarative selection rules for the Decision Engine widgets (see services.rules)
+BLEEDING_SPEND_RULE = Rule(
+    name='Bleeding Spend',
+    expression=(
+        "Spend >= min_spend and Sales == 0 and Clicks >= min_clicks"
+        " and col('Match Type') != 'Exact'"
+        " and not startswith(lower(col('Targeting', '')), 'b0')"
+    ),
+    action='Negative',
+)
+
+HIGH_ACOS_RULE = Rule(
+    name='High ACOS',
+    expression="ACOS > target_acos and Spend > 0",
+)
+
+SCALE_OPPORTUNITY_RULE = Rule(
+    name='Scale Opportunity',
+    expression="ACOS <= target_acos * 0.8 and Orders >= min_orders",
+    action='Bid Increase',
+)
+
+
+# Columns each widget needs
+BLEEDING_REQUIRED = ['Spend', 'Sales', 'Clicks', 'Match Type']
+HIGH_ACOS_REQUIRED = ['ACOS', 'Spend']
+SCALE_REQUIRED = ['ACOS', 'Orders']
+HEALTH_REQUIRED = ['Spend', 'Sales', 'Match Type']
+
+
+def _has_columns(df: pd.DataFrame, columns: List[str]) -> bool:
+    return all(col in df.columns for col in columns)
+
+
+def _take(df: pd.DataFrame, positions: np.ndarray, col: str, default=None) -> list:
+    """Values of a column at the given row positions, like row.get(col, default)."""
+    if col not in df.columns:
+        return [default] * len(positions)
+    return df[col].to_numpy()[positions].tolist()
+
+
+def _take_float(df: pd.DataFrame, positions: np.ndarray, col: str, default=0.0) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(positions), default, dtype='float64')
+    return df[col].to_numpy(dtype='float64', na_value=np.nan)[positions]
+
+
+def compute_account_totals(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Account-level aggregates shared by the Decision Engine widgets.
+    Computed once per request instead of once per widget.
+    """
+    totals = {
+        col: df[col].sum() if col in df.columns else 0
+        for col in ['Impressions', 'Clicks', 'Spend', 'Sales', 'Orders']
+    }
+    has_health_columns = _has_columns(df, HEALTH_REQUIRED)
+    totals['Wasted Spend'] = df['Spend'][df['Sales'] == 0].sum() if has_health_columns else 0
+    totals['Exact Spend'] = df['Spend'][df['Match Type'] == 'Exact'].sum() if has_health_columns else 0
+    return totals
+
+
+def _build_bleeding_items(df: pd.DataFrame, mask: pd.Series) -> List[BleedingSpendItem]:
+    positions = np.flatnonzero(mask.to_numpy())
+    spend = _take(df, positions, 'Spend')
+    clicks = _take(df, positions, 'Clicks')
+
+    results = [
+        BleedingSpendItem(
+            id=int(idx),
+            search_term=term,
+            campaign_name=campaign,
+            ad_group_name=ad_group,
+            match_type=match_type,
+            spend=s,
+            clicks=int(c),
+            # Severity = Spend * Clicks (higher spend/clicks = more urgent)
+            severity_score=s * c,
+            action_type="Negative"
+        )
+        for idx, term, campaign, ad_group, match_type, s, c in zip(
+            df.index[positions],
+            _take(df, positions, 'Customer Search Term', 'Unknown'),
+            _take(df, positions, 'Campaign Name', 'Unknown'),
+            _take(df, positions, 'Ad Group Name', 'Unknown'),
+            _take(df, positions, 'Match Type', 'Unknown'),
+            spend,
+            clicks
+        )
+    ]
+    return sorted(results, key=lambda x: x.severity_score, reverse=True)
+
+
+def _build_high_acos_items(df: pd.DataFrame, mask: pd.Series, totals: Dict[str, Any]) -> List[HighACOSItem]:
+    # Account averages as benchmarks
+    total_impressions = totals['Impressions']
+    total_clicks = totals['Clicks']
+    avg_ctr = total_clicks / total_impressions if total_impressions > 0 else 0
+    avg_cpc = totals['Spend'] / total_clicks if total_clicks > 0 else 0
+    avg_cvr = totals['Orders'] / total_clicks if total_clicks > 0 else 0
+
+    positions = np.flatnonzero(mask.to_numpy())
+    ctr = _take_float(df, positions, 'CTR')
+    cpc = _take_float(df, positions, 'CPC')
+    cvr = _take_float(df, positions, 'Conversion Rate')
+
+    # Diagnose Root Cause (prioritize in order)
+    conditions = [
+        cvr < avg_cvr * 0.7,  # Significantly lower CVR
+        cpc > avg_cpc * 1.3,  # Significantly higher CPC
+        ctr < avg_ctr * 0.7,  # Significantly lower CTR
+    ]
+    root_cause = np.select(conditions, ["Low CVR", "High CPC", "Low CTR"], "General Efficiency")
+    value = np.select(conditions, [cvr, cpc, ctr], 0.0)
+    benchmark = np.select(conditions, [avg_cvr, avg_cpc, avg_ctr], 0.0)
+    action = np.select(conditions, ["Review Listing/Target", "Bid Down", "Negative"], "Optimization")
+
+    results = [
+        HighACOSItem(
+            id=int(idx),
+            search_term=term,
+            targeting=targeting,
+            match_type=match_type,
+            campaign_name=campaign,
+            acos=acos,
+            spend=spend,
+            sales=sales,
+            root_cause=cause,
+            value=v,
+            avg_value=b,
+            action_type=a
+        )
+        for idx, term, targeting, match_type, campaign, acos, spend, sales, cause, v, b, a in zip(
+            df.index[positions],
+            _take(df, positions, 'Customer Search Term', 'Unknown'),
+            _take(df, positions, 'Targeting'),
+            _take(df, positions, 'Match Type'),
+            _take(df, positions, 'Campaign Name', 'Unknown'),
+            _take(df, positions, 'ACOS', 0),
+            _take(df, positions, 'Spend', 0),
+            _take(df, positions, 'Sales', 0),
+            root_cause.tolist(),
+            value.tolist(),
+            benchmark.tolist(),
+            action.tolist()
+        )
+    ]
+    return sorted(results, key=lambda x: x.spend, reverse=True)
+
+
+def _build_scale_items(df: pd.DataFrame, mask: pd.Series) -> List[ScaleOpportunityItem]:
+    positions = np.flatnonzero(mask.to_numpy())
+    cpc = _take(df, positions, 'CPC', 0)
+
+    results = [
+        ScaleOpportunityItem(
+            id=int(idx),
+            search_term=term,
+            targeting=targeting,
+            match_type=match_type,
+            campaign_name=campaign,
+            acos=acos,
+            orders=int(orders),
+            conversion_rate=cvr,
+            current_bid=bid, # Approx as CPC since we don't have actual bids in STR
+            suggested_bid=bid * 1.2, # Suggest 20% bid increase
+            action_type="Bid Increase"
+        )
+        for idx, term, targeting, match_type, campaign, acos, orders, cvr, bid in zip(
+            df.index[positions],
+            _take(df, positions, 'Customer Search Term', 'Unknown'),
+            _take(df, positions, 'Targeting'),
+            _take(df, positions, 'Match Type'),
+            _take(df, positions, 'Campaign Name', 'Unknown'),
+            _take(df, positions, 'ACOS', 0),
+            _take(df, positions, 'Orders', 0),
+            _take(df, positions, 'Conversion Rate', 0),
+            cpc
+        )
+    ]
+    return sorted(results, key=lambda x: x.orders, reverse=True)
+
+
+def _build_health_score(totals: Dict[str, Any]) -> HealthScore:
+    total_spend = totals['Spend']
+    total_sales = totals['Sales']
+    
+    # 1. Spend Efficiency (Wasted Spend %)
+    # Wasted = Spend with 0 sales
+    wasted_spend = totals['Wasted Spend']
+    waste_ratio = wasted_spend / total_spend if total_spend > 0 else 0
+    efficiency_score = max(0, 100 - (waste_ratio * 100))
+    
+    # 2. Exact Match Share
+    exact_share = totals['Exact Spend'] / total_spend if total_spend > 0 else 0
+    # Goal: 30-50% Exact is healthy, >80% is super healthy? Let's say higher is better for control.
+    exact_score = min(100, exact_share * 100 * 1.5) # Scale up so 66% = 100
+    
+    # 3. ACOS Health (Inverse of ACOS vs Target)
+    # Lower ACOS = Higher Score (capped at 100)
+    overall_acos = (total_spend / total_sales * 100) if total_sales > 0 else 100
+    acos_score = max(0, 100 - overall_acos)
+    
+    # Weighted Total
+    # Efficiency 40%, Exact Share 30%, ACOS 30%
+    final_score = int((efficiency_score * 0.4) + (exact_score * 0.3) + (acos_score * 0.3))
+    
+    return HealthScore(
+        score=final_score,
+        spend_efficiency_score=int(efficiency_score),
+        acos_stability_score=int(acos_score),
+        exact_match_score=int(exact_score),
+        details={
+            "wasted_spend": wasted_spend,
+            "waste_ratio": waste_ratio,
+            "overall_acos": overall_acos
+        }
+    )
+
+
+def _empty_health_score() -> HealthScore:
+    return HealthScore(
+        score=0, 
+        spend_efficiency_score=0, 
+        acos_stability_score=0, 
+        exact_match_score=0, 
+        details={}
+    )
+
 
 def analyze_bleeding_spend(
     df: pd.DataFrame, 
@@ -22,47 +255,15 @@ def analyze_bleeding_spend(
     Identify search terms with zero sales and high spend.
     Rule: Spend >= min_spend AND Sales == 0 AND Clicks >= min_clicks AND Match Type != Exact
     """
-    if df.empty:
-        return []
-
-    # Ensure required columns exist
-    required = ['Spend', 'Sales', 'Clicks', 'Match Type']
-    if not all(col in df.columns for col in required):
+    if df.empty or not _has_columns(df, BLEEDING_REQUIRED):
         return []
 
-    # Filter for bleeding spend
-    mask = (
-        (df['Spend'] >= min_spend) & 
-        (df['Sales'] == 0) & 
-        (df['Clicks'] >= min_clicks) &
-        (df['Match Type'] != 'Exact')
-    )
-    
-    # If Targeting exists, filter out ASINs
-    if 'Targeting' in df.columns:
-        mask = mask & (~df['Targeting'].str.lower().str.startswith('b0', na=False))
-
-    bleeding = df[mask].copy()
-    
-    results = []
-    for idx, row in bleeding.iterrows():
-        # Severity = Spend * Clicks (higher spend/clicks = more urgent)
-        severity = row['Spend'] * row['Clicks']
-        
-        item = BleedingSpendItem(
-            id=int(idx),
-            search_term=row.get('Customer Search Term', 'Unknown'),
-            campaign_name=row.get('Campaign Name', 'Unknown'),
-            ad_group_name=row.get('Ad Group Name', 'Unknown'),
-            match_type=row.get('Match Type', 'Unknown'),
-            spend=row['Spend'],
-            clicks=int(row['Clicks']),
-            severity_score=severity,
-            action_type="Negative"
-        )
-        results.append(item)
-        
-    return sorted(results, key=lambda x: x.severity_score, reverse=True)
+    # ASIN targets are excluded when Targeting exists
+    mask = evaluate_rules(df, [BLEEDING_SPEND_RULE], params={
+        'min_spend': min_spend,
+        'min_clicks': min_clicks,
+    })[BLEEDING_SPEND_RULE.name]
+    return _build_bleeding_items(df, mask)
 
 
 def analyze_high_acos(
@@ -76,71 +277,11 @@ def analyze_high_acos(
     - High CPC: CPC > avg_cpc
     - Low CVR: CVR < avg_cvr
     """
-    if df.empty:
+    if df.empty or not _has_columns(df, HIGH_ACOS_REQUIRED):
         return []
-        
-    # Calculate account averages for benchmarks
-    total_impressions = df['Impressions'].sum() if 'Impressions' in df.columns else 0
-    total_clicks = df['Clicks'].sum() if 'Clicks' in df.columns else 0
-    total_spend = df['Spend'].sum() if 'Spend' in df.columns else 0
-    total_orders = df['Orders'].sum() if 'Orders' in df.columns else 0
 
-    avg_ctr = total_clicks / total_impressions if total_impressions > 0 else 0
-    avg_cpc = total_spend / total_clicks if total_clicks > 0 else 0
-    avg_cvr = total_orders / total_clicks if total_clicks > 0 else 0
-    
-    # Filter for High ACOS
-    if 'ACOS' not in df.columns or 'Spend' not in df.columns:
-        return []
-
-    mask = (df['ACOS'] > target_acos) & (df['Spend'] > 0)
-    high_acos_df = df[mask].copy()
-    
-    results = []
-    for idx, row in high_acos_df.iterrows():
-        ctr = row.get('CTR', 0)
-        cpc = row.get('CPC', 0)
-        cvr = row.get('Conversion Rate', 0)
-        
-        # Diagnose Root Cause (prioritize in order)
-        root_cause = "General Efficiency"
-        value = 0.0
-        benchmark = 0.0
-        action = "Optimization"
-        
-        if cvr < avg_cvr * 0.7: # Significantly lower CVR
-            root_cause = "Low CVR"
-            value = cvr
-            benchmark = avg_cvr
-            action = "Review Listing/Target"
-        elif cpc > avg_cpc * 1.3: # Significantly higher CPC
-            root_cause = "High CPC"
-            value = cpc
-            benchmark = avg_cpc
-            action = "Bid Down"
-        elif ctr < avg_ctr * 0.7: # Significantly lower CTR
-            root_cause = "Low CTR"
-            value = ctr
-            benchmark = avg_ctr
-            action = "Negative"
-            
-        item = HighACOSItem(
-            id=int(idx),
-            search_term=row.get('Customer Search Term', 'Unknown'),
-            targeting=row.get('Targeting'),
-            match_type=row.get('Match Type'),
-            campaign_name=row.get('Campaign Name', 'Unknown'),
-            acos=row.get('ACOS', 0),
-            spend=row.get('Spend', 0),
-            sales=row.get('Sales', 0),
-            root_cause=root_cause,
-            value=value,
-            avg_value=benchmark,
-            action_type=action
-        )
-        results.append(item)
-        
-    return sorted(results, key=lambda x: x.spend, reverse=True)
+    mask = evaluate_rules(df, [HIGH_ACOS_RULE], params={'target_acos': target_acos})[HIGH_ACOS_RULE.name]
+    return _build_high_acos_items(df, mask, compute_account_totals(df))
 
 
 def analyze_scale_opportunities(
@@ -152,40 +293,14 @@ def analyze_scale_opportunities(
     Find profitable terms ready to scale.
     Rule: ACOS <= Target * 0.8 AND Orders >= min_orders
     """
-    if df.empty or 'ACOS' not in df.columns or 'Orders' not in df.columns:
+    if df.empty or not _has_columns(df, SCALE_REQUIRED):
         return []
         
-    efficient_threshold = target_acos * 0.8
-    
-    mask = (
-        (df['ACOS'] <= efficient_threshold) & 
-        (df['Orders'] >= min_orders)
-    )
-    
-    scale_df = df[mask].copy()
-    
-    results = []
-    for idx, row in scale_df.iterrows():
-        cpc = row.get('CPC', 0)
-        # Suggest 20% bid increase
-        suggested = cpc * 1.2
-        
-        item = ScaleOpportunityItem(
-            id=int(idx),
-            search_term=row.get('Customer Search Term', 'Unknown'),
-            targeting=row.get('Targeting'),
-            match_type=row.get('Match Type'),
-            campaign_name=row.get('Campaign Name', 'Unknown'),
-            acos=row.get('ACOS', 0),
-            orders=int(row.get('Orders', 0)),
-            conversion_rate=row.get('Conversion Rate', 0),
-            current_bid=cpc, # Approx as CPC since we don't have actual bids in STR
-            suggested_bid=suggested,
-            action_type="Bid Increase"
-        )
-        results.append(item)
-        
-    return sorted(results, key=lambda x: x.orders, reverse=True)
+    mask = evaluate_rules(df, [SCALE_OPPORTUNITY_RULE], params={
+        'target_acos': target_acos,
+        'min_orders': min_orders,
+    })[SCALE_OPPORTUNITY_RULE.name]
+    return _build_scale_items(df, mask)
 
 
 def analyze_budget_saturation(
@@ -203,44 +318,45 @@ def analyze_budget_saturation(
     if 'Campaign Name' not in str_df.columns or 'Spend' not in str_df.columns or 'Sales' not in str_df.columns:
          return []
 
-    campaign_metrics = str_df.groupby('Campaign Name').agg({
+    campaign_metrics = str_df.groupby('Campaign Name', observed=True).agg({
         'Spend': 'sum',
         'Sales': 'sum'
     }).reset_index()
     
     # Calculate Campaign ACOS
-    campaign_metrics['ACOS'] = campaign_metrics.apply(
-        lambda x: (x['Spend'] / x['Sales'] * 100) if x['Sales'] > 0 else 0, axis=1
-    )
+    spend = campaign_metrics['Spend'].to_numpy(dtype='float64')
+    sales = campaign_metrics['Sales'].to_numpy(dtype='float64')
+    campaign_metrics['ACOS'] = np.divide(spend, sales, out=np.zeros_like(spend), where=sales > 0) * 100
     
     # Merge with Bulk Data (Budgets)
     if 'Daily Budget' not in bulk_df.columns:
         return []
 
-    merged = pd.merge(campaign_metrics, bulk_df, on='Campaign Name', how='inner')
+    # Only the budget column is needed from the bulk file (it may carry its own Spend/Sales columns)
+    merged = pd.merge(campaign_metrics, bulk_df[['Campaign Name', 'Daily Budget']], on='Campaign Name', how='inner')
     
-    results = []
-    for _, row in merged.iterrows():
-        spend = row['Spend']
-        budget = row['Daily Budget']
-        acos = row['ACOS']
-        
-        if budget <= 0:
-            continue
-            
-        utilization = spend / budget
-        
-        if acos < 30.0: # Hardcoded "Profitable" threshold for now
-             item = BudgetSaturationItem(
-                campaign_name=row['Campaign Name'],
-                daily_budget=budget,
-                spend=spend,
-                utilization=0.0, # Placeholder
-                acos=acos,
-                suggested_budget=budget * 1.2,
-                action_type="Budget Increase"
-            )
-             results.append(item)
+    budget = merged['Daily Budget']
+    # Skip zero budgets; keep campaigns under the hardcoded "Profitable" threshold for now
+    keep = ~(budget <= 0) & (merged['ACOS'] < 30.0)
+    merged = merged[keep]
+    
+    results = [
+        BudgetSaturationItem(
+            campaign_name=campaign,
+            daily_budget=b,
+            spend=s,
+            utilization=0.0, # Placeholder
+            acos=acos,
+            suggested_budget=b * 1.2,
+            action_type="Budget Increase"
+        )
+        for campaign, b, s, acos in zip(
+            merged['Campaign Name'].tolist(),
+            merged['Daily Budget'].tolist(),
+            merged['Spend'].tolist(),
+            merged['ACOS'].tolist()
+        )
+    ]
             
     return sorted(results, key=lambda x: x.acos)
 
@@ -249,57 +365,65 @@ def calculate_health_score(df: pd.DataFrame) -> HealthScore:
     """
     Calculate overall PPC Health Score (0-100).
     """
-    if df.empty:
-        return HealthScore(
-            score=0, 
-            spend_efficiency_score=0, 
-            acos_stability_score=0, 
-            exact_match_score=0, 
-            details={}
-        )
+    if df.empty or not _has_columns(df, HEALTH_REQUIRED):
+        return _empty_health_score()
 
-    required = ['Spend', 'Sales', 'Match Type']
-    if not all(col in df.columns for col in required):
-         return HealthScore(
-            score=0, 
-            spend_efficiency_score=0, 
-            acos_stability_score=0, 
-            exact_match_score=0, 
-            details={}
-        )
+    return _build_health_score(compute_account_totals(df))
 
-    total_spend = df['Spend'].sum()
-    total_sales = df['Sales'].sum()
-    
-    # 1. Spend Efficiency (Wasted Spend %)
-    # Wasted = Spend with 0 sales
-    wasted_spend = df[df['Sales'] == 0]['Spend'].sum()
-    waste_ratio = wasted_spend / total_spend if total_spend > 0 else 0
-    efficiency_score = max(0, 100 - (waste_ratio * 100))
-    
-    # 2. Exact Match Share
-    exact_spend = df[df['Match Type'] == 'Exact']['Spend'].sum()
-    exact_share = exact_spend / total_spend if total_spend > 0 else 0
-    # Goal: 30-50% Exact is healthy, >80% is super healthy? Let's say higher is better for control.
-    exact_score = min(100, exact_share * 100 * 1.5) # Scale up so 66% = 100
-    
-    # 3. ACOS Health (Inverse of ACOS vs Target)
-    # Lower ACOS = Higher Score (capped at 100)
-    overall_acos = (total_spend / total_sales * 100) if total_sales > 0 else 100
-    acos_score = max(0, 100 - overall_acos)
-    
-    # Weighted Total
-    # Efficiency 40%, Exact Share 30%, ACOS 30%
-    final_score = int((efficiency_score * 0.4) + (exact_score * 0.3) + (acos_score * 0.3))
+
+def run_decision_engine(
+    df: pd.DataFrame,
+    bulk_df: pd.DataFrame,
+    target_acos: float = 30.0,
+    min_spend: float = 10.0,
+    min_clicks: int = 5,
+    min_orders: int = 3
+) -> Dict[str, Any]:
+    """
+    Compute every Decision Center widget in a single pass.
+    Account totals are aggregated once and all selection rules are evaluated
+    together (sharing sub-expressions), instead of each analyze_* function
+    re-scanning and copying the report. Output matches the individual functions.
     
-    return HealthScore(
-        score=final_score,
-        spend_efficiency_score=int(efficiency_score),
-        acos_stability_score=int(acos_score),
-        exact_match_score=int(exact_score),
-        details={
-            "wasted_spend": wasted_spend,
-            "waste_ratio": waste_ratio,
-            "overall_acos": overall_acos
+    Returns a dict with bleeding_spend, high_acos, scale_opportunities,
+    budget_saturation and health_score.
+    """
+    if df.empty:
+        return {
+            'bleeding_spend': [],
+            'high_acos': [],
+            'scale_opportunities': [],
+            'budget_saturation': [],
+            'health_score': _empty_health_score()
         }
-    )
+
+    totals = compute_account_totals(df)
+
+    rules = []
+    if _has_columns(df, BLEEDING_REQUIRED):
+        rules.append(BLEEDING_SPEND_RULE)
+    if _has_columns(df, HIGH_ACOS_REQUIRED):
+        rules.append(HIGH_ACOS_RULE)
+    if _has_columns(df, SCALE_REQUIRED):
+        rules.append(SCALE_OPPORTUNITY_RULE)
+
+    masks = evaluate_rules(df, rules, params={
+        'target_acos': target_acos,
+        'min_spend': min_spend,
+        'min_clicks': min_clicks,
+        'min_orders': min_orders,
+    })
+
+    def built(rule: Rule, builder, *args) -> list:
+        return builder(df, masks[rule.name], *args) if rule.name in masks.columns else []
+
+    return {
+        'bleeding_spend': built(BLEEDING_SPEND_RULE, _build_bleeding_items),
+        'high_acos': built(HIGH_ACOS_RULE, _build_high_acos_items, totals),
+        'scale_opportunities': built(SCALE_OPPORTUNITY_RULE, _build_scale_items),
+        'budget_saturation': analyze_budget_saturation(df, bulk_df),
+        'health_score': (
+            _build_health_score(totals) if _has_columns(df, HEALTH_REQUIRED)
+            else _empty_health_score()
+        )
+    }
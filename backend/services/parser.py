@@ -3,11 +3,18 @@ File parsing service for CSV and XLSX files.
 Handles Amazon Search Term Reports and Bulk Operations files.
 """
 
+import numpy as np
 import pandas as pd
+from dataclasses import asdict, dataclass
 from io import BytesIO
-from typing import Tuple, List, Optional
+from pandas.io.parsers import TextParser
+import zipfile
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Tuple, List, Optional
 import re
 
+from services.archives import detect_compression, inner_filename, iter_reports
+from services.xlsx_reader import XlsxWorkbook
+
 
 # Required columns for Search Term Report
 SEARCH_TERM_REQUIRED_COLUMNS = [
@@ -74,47 +81,125 @@ COLUMN_MAPPINGS = {
 }
 
 
+# Report columns the analyzers use: required columns, mapping targets and the date
+# (lower-cased; the 'Ad Group' alias is renamed to 'Ad Group Name' during processing)
+SEARCH_TERM_COLUMNS = (
+    {c.lower() for c in SEARCH_TERM_REQUIRED_COLUMNS}
+    | {c.lower() for c in COLUMN_MAPPINGS.values()}
+    | {'date', 'ad group'}
+)
+
+# Repeated text columns stored as categoricals (small integer codes per row)
+CATEGORICAL_COLUMNS = ['Campaign Name', 'Ad Group Name', 'Targeting', 'Match Type', 'Portfolio']
+
+
+def is_search_term_column(name) -> bool:
+    """usecols filter for Search Term Report uploads."""
+    return normalize_column_name(str(name)).lower().strip() in SEARCH_TERM_COLUMNS
+
+
 def detect_file_type(filename: str) -> str:
-    """Detect file type from filename extension."""
-    ext = filename.lower().split('.')[-1]
+    """
+    Detect file type from filename extension: 'csv' or 'xlsx' (also when gzipped,
+    e.g. 'report.csv.gz'), or 'zip' for zip archives of reports.
+    """
+    if detect_compression(filename) == 'zip':
+        return 'zip'
+    ext = inner_filename(filename).lower().split('.')[-1]
     if ext == 'csv':
         return 'csv'
     elif ext in ['xlsx', 'xls']:
         return 'xlsx'
     else:
-        raise ValueError(f"Unsupported file type: {ext}. Please upload CSV or XLSX files.")
+        raise ValueError(
+            f"Unsupported file type: {ext}. Please upload CSV or XLSX files (optionally as .gz or .zip)."
+        )
+
+
+# Preferred sheets of a Bulk Operations workbook, in priority order (else the first sheet)
+BULK_SHEET_PRIORITY = ['Sponsored Products Campaigns', 'Sponsored Products']
+
+# Bulk File columns used for ID resolution and budget analysis (lower-cased raw names)
+BULK_FILE_COLUMNS = {
+    'product', 'entity', 'record type', 'operation', 'state',
+    'campaign id', 'ad group id', 'ad group', 'portfolio id', 'keyword id', 'product targeting id',
+    'campaign name', 'campaign', 'ad group name',
+    'campaign name (informational only)', 'ad group name (informational only)',
+    'portfolio name (informational only)',
+    'daily budget', 'campaign daily budget', 'budget',
+    'keyword text', 'match type', 'product targeting expression', 'bid', 'ad group default bid',
+}
+
+
+def is_bulk_file_column(name) -> bool:
+    """usecols filter for Bulk File uploads."""
+    return str(name).lower().strip() in BULK_FILE_COLUMNS
+
 
+def select_sheet(sheet_names: List[str]) -> str:
+    """Pick the sheet to analyze from a workbook's sheet names."""
+    for name in BULK_SHEET_PRIORITY:
+        if name in sheet_names:
+            return name
+    return sheet_names[0]
 
-def parse_file(content: bytes, filename: str) -> pd.DataFrame:
-    """Parse file content into a DataFrame."""
+
+def read_xlsx(content: bytes, usecols: Optional[Callable[[str], bool]] = None) -> pd.DataFrame:
+    """
+    Read the relevant sheet of an XLSX workbook.
+    The sheet is chosen from the workbook metadata and streamed, so other sheets are
+    never parsed, and only columns accepted by `usecols` are materialized. Values are
+    typed the same way pd.read_excel types them.
+    """
+    with XlsxWorkbook(content) as workbook:
+        header, rows = workbook.read_rows(select_sheet(workbook.sheet_names), usecols)
+    if not header:
+        return pd.DataFrame()
+    # Same type inference as read_excel (numeric text -> numbers, blanks -> NaN)
+    return TextParser([header] + rows, header=0).read()
+
+
+def parse_file(
+    content: bytes,
+    filename: str,
+    usecols: Optional[Callable[[str], bool]] = None
+) -> pd.DataFrame:
+    """
+    Parse file content into a DataFrame.
+    `usecols` optionally restricts which columns (by raw header name) are loaded.
+    Compressed files are decompressed while parsing; the reports of a zip
+    archive are concatenated.
+    """
     file_type = detect_file_type(filename)
     
-    if file_type == 'csv':
-        df = pd.read_csv(BytesIO(content))
-    else:
-        try:
-            # Read all sheets to find the correct one
-            sheets = pd.read_excel(BytesIO(content), sheet_name=None)
-            
-            # Prioritize "Sponsored Products Campaigns" sheet (standard Bulk File)
-            if 'Sponsored Products Campaigns' in sheets:
-                df = sheets['Sponsored Products Campaigns']
-            # Fallback for older formats or if not found
-            elif 'Sponsored Products' in sheets:
-                 df = sheets['Sponsored Products']
+    if detect_compression(filename):
+        frames = []
+        for name, stream in iter_reports(BytesIO(content), filename):
+            if detect_file_type(name) == 'csv':
+                frames.append(pd.read_csv(stream, usecols=usecols))
             else:
-                # Default to first sheet
-                df = list(sheets.values())[0]
-        except Exception:
-            # Fallback if sheet_name=None fails
-            df = pd.read_excel(BytesIO(content))
+                frames.append(parse_file(stream.read(), name, usecols))
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    elif file_type == 'csv':
+        df = pd.read_csv(BytesIO(content), usecols=usecols)
+    elif filename.lower().endswith('.xlsx'):
+        try:
+            df = read_xlsx(content, usecols)
+        except (KeyError, ValueError, SyntaxError, zipfile.BadZipFile):
+            # Unusual package layout (e.g. strict OOXML): let pandas handle it
+            workbook = pd.ExcelFile(BytesIO(content))
+            df = workbook.parse(select_sheet(workbook.sheet_names), usecols=usecols)
+    else:
+        # Legacy .xls: openpyxl can't read it, so use pandas (sheet chosen from metadata)
+        workbook = pd.ExcelFile(BytesIO(content))
+        df = workbook.parse(select_sheet(workbook.sheet_names), usecols=usecols)
     
     return df
 
 
 def normalize_column_name(col: str) -> str:
-    """Normalize column name for matching."""
-    normalized = col.lower().strip()
+    """Normalize column name for matching (non-string headers, e.g. numbers in a workbook, are matched as text)."""
+    normalized = str(col).lower().strip()
     return COLUMN_MAPPINGS.get(normalized, col)
 
 
@@ -122,7 +207,7 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     """Normalize column names using mapping."""
     new_columns = {}
     for col in df.columns:
-        normalized = col.lower().strip()
+        normalized = str(col).lower().strip()
         if normalized in COLUMN_MAPPINGS:
             new_columns[col] = COLUMN_MAPPINGS[normalized]
         else:
@@ -136,8 +221,14 @@ def validate_search_term_report(df: pd.DataFrame) -> Tuple[bool, List[str]]:
     Validate that the DataFrame contains required columns for Search Term Report.
     Returns (is_valid, missing_columns).
     """
+    missing = missing_search_term_columns(df.columns)
+    return len(missing) == 0, missing
+
+
+def missing_search_term_columns(columns) -> List[str]:
+    """Required Search Term Report columns a header lacks."""
     # Normalize for comparison
-    df_columns_lower = [col.lower().strip() for col in df.columns]
+    df_columns_lower = [str(col).lower().strip() for col in columns]
     
     missing = []
     for required in SEARCH_TERM_REQUIRED_COLUMNS:
@@ -150,7 +241,7 @@ def validate_search_term_report(df: pd.DataFrame) -> Tuple[bool, List[str]]:
         if req_lower not in df_columns_lower:
             missing.append(required)
     
-    return len(missing) == 0, missing
+    return missing
 
 
 def clean_percentage(value) -> Optional[float]:
@@ -198,71 +289,277 @@ def clean_integer(value) -> int:
     return 0
 
 
-def process_search_term_report(df: pd.DataFrame) -> pd.DataFrame:
+# Metric columns grouped by the cleaning kernel they need
+INTEGER_COLUMNS = ['Impressions', 'Clicks', 'Orders', 'Units']
+CURRENCY_COLUMNS = ['Spend', 'Sales', 'CPC']
+PERCENTAGE_COLUMNS = ['ACOS', 'ROAS', 'CTR', 'Conversion Rate']
+
+# Metric columns whose missing values count as 0
+ZERO_FILLED_COLUMNS = ['Impressions', 'Clicks', 'Spend', 'Sales', 'Orders', 'Units']
+
+
+def _coerce_numeric(series: pd.Series, strip_chars: str) -> pd.Series:
+    """
+    Vectorized core of the clean_* helpers.
+    Strips the given symbols from string cells and converts the column to float64,
+    with NaN wherever the scalar helper would fall back to its default.
+    """
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return series.astype('float64')
+
+    try:
+        text = series
+        for char in strip_chars:
+            text = text.str.replace(char, '', regex=False)
+        text = text.str.strip()
+    except AttributeError:
+        # No string cells at all (e.g. an object column of numbers)
+        return pd.to_numeric(series, errors='coerce').astype('float64')
+
+    # Non-string cells come back as NaN from the .str accessor; keep their original value
+    values = text.where(text.notna(), series) if series.dtype == object else text
+    try:
+        # Fast path: every cell parses cleanly
+        return values.astype('float64')
+    except (ValueError, TypeError):
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+
+
+def clean_percentage_series(series: pd.Series) -> pd.Series:
+    """Vectorized clean_percentage: float64 column, NaN for missing/invalid values."""
+    return _coerce_numeric(series, '%,')
+
+
+def clean_currency_series(series: pd.Series) -> pd.Series:
+    """Vectorized clean_currency: float64 column, 0.0 for missing/invalid values."""
+    return _coerce_numeric(series, '$,').fillna(0.0)
+
+
+def clean_integer_series(series: pd.Series) -> pd.Series:
+    """
+    Vectorized clean_integer: truncates toward zero like int(float(value)),
+    0 for missing/invalid values. Downcast to int32 when the values fit.
+    """
+    values = _coerce_numeric(series, ',')
+    values = np.trunc(values.where(np.isfinite(values), 0.0))
+    if values.empty or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max):
+        return values.astype('int32')
+    return values.astype('int64')
+
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    return pd.to_datetime(series, errors='coerce')
+
+
+# Cleaning kernels of an ingestion plan, by name
+CLEANING_KERNELS = {
+    'integer': clean_integer_series,
+    'currency': clean_currency_series,
+    'percentage': clean_percentage_series,
+    'date': _parse_dates,
+}
+
+
+@dataclass
+class IngestionPlan:
+    """
+    How to ingest a Search Term Report with a given raw header row: which columns
+    to read, how to rename and clean them. Compiled once per header layout
+    (compile_ingestion_plan) and cached by services/ingestion_plans.py.
+    """
+    columns: List[str]               # Raw header the plan was compiled for
+    usecols: List[str]               # Raw columns the analyzers use
+    missing: List[str]               # Required columns the header lacks
+    renames: Dict[str, str]          # Raw -> canonical names (incl. the 'Ad Group' alias)
+    text_columns: List[str]          # Raw non-metric columns (read as strings from CSV)
+    kernels: List[Tuple[str, str]]   # (canonical column, CLEANING_KERNELS name), in cleaning order
+    categorical: List[str]           # Canonical columns stored as categoricals
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.missing
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IngestionPlan':
+        plan = cls(**data)
+        plan.kernels = [tuple(kernel) for kernel in plan.kernels]
+        return plan
+
+
+def compile_ingestion_plan(columns: List[str]) -> IngestionPlan:
+    """Work out column selection, renames and cleaning for a raw header row."""
+    columns = list(columns)
+    renames = {}
+    for col in columns:
+        normalized = normalize_column_name(col)
+        if normalized != col:
+            renames[col] = normalized
+
+    # Handle Ad Group alias for STR specifically (Case Insensitive)
+    names = [renames.get(col, col) for col in columns]
+    if 'Ad Group Name' not in names:
+        ad_group_col = next((col for col in columns if str(col).lower().strip() == 'ad group'), None)
+        if ad_group_col:
+            renames[ad_group_col] = 'Ad Group Name'
+            names = [renames.get(col, col) for col in columns]
+
+    kernels = [(col, 'integer') for col in INTEGER_COLUMNS if col in names]
+    kernels += [(col, 'currency') for col in CURRENCY_COLUMNS if col in names]
+    kernels += [(col, 'percentage') for col in PERCENTAGE_COLUMNS if col in names]
+    if 'Date' in names:
+        kernels.append(('Date', 'date'))
+
+    usecols = [col for col in columns if is_search_term_column(col)]
+    metric_columns = set(INTEGER_COLUMNS + CURRENCY_COLUMNS + PERCENTAGE_COLUMNS)
+    return IngestionPlan(
+        columns=columns,
+        usecols=usecols,
+        missing=missing_search_term_columns(columns),
+        renames=renames,
+        text_columns=[col for col in usecols if normalize_column_name(col) not in metric_columns],
+        kernels=kernels,
+        categorical=[col for col in CATEGORICAL_COLUMNS if col in names],
+    )
+
+
+def process_search_term_report(df: pd.DataFrame, plan: Optional[IngestionPlan] = None) -> pd.DataFrame:
     """
     Process and clean a Search Term Report DataFrame.
-    Normalizes columns and cleans data types.
+    Normalizes columns and cleans data types, following `plan` when the caller
+    already has the plan of this header (else it is compiled here).
     """
+    if plan is None:
+        plan = compile_ingestion_plan(list(df.columns))
+
     # Normalize column names
-    df = normalize_columns(df)
-    
-    # Handle Ad Group alias for STR specifically (Case Insensitive)
-    ad_group_col = None
-    for col in df.columns:
-        if col.lower().strip() == 'ad group':
-            ad_group_col = col
-            break
-            
-    if ad_group_col and 'Ad Group Name' not in df.columns:
-        df = df.rename(columns={ad_group_col: 'Ad Group Name'})
+    df = df.rename(columns=plan.renames)
     
-    # Clean numeric columns
-    if 'Impressions' in df.columns:
-        df['Impressions'] = df['Impressions'].apply(clean_integer)
-    
-    if 'Clicks' in df.columns:
-        df['Clicks'] = df['Clicks'].apply(clean_integer)
-    
-    if 'Spend' in df.columns:
-        df['Spend'] = df['Spend'].apply(clean_currency)
-    
-    if 'Sales' in df.columns:
-        df['Sales'] = df['Sales'].apply(clean_currency)
-    
-    if 'Orders' in df.columns:
-        df['Orders'] = df['Orders'].apply(clean_integer)
-    
-    if 'Units' in df.columns:
-        df['Units'] = df['Units'].apply(clean_integer)
-    
-    if 'ACOS' in df.columns:
-        df['ACOS'] = df['ACOS'].apply(clean_percentage)
-    
-    if 'ROAS' in df.columns:
-        df['ROAS'] = df['ROAS'].apply(clean_percentage)
-    
-    if 'CTR' in df.columns:
-        df['CTR'] = df['CTR'].apply(clean_percentage)
-    
-    if 'CPC' in df.columns:
-        df['CPC'] = df['CPC'].apply(clean_currency)
-    
-    if 'Conversion Rate' in df.columns:
-        df['Conversion Rate'] = df['Conversion Rate'].apply(clean_percentage)
-    
-    # Parse date column if present
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    # Clean numeric and date columns (whole-column kernels, same results as the scalar helpers)
+    for col, kernel in plan.kernels:
+        if col in df.columns:
+            df[col] = CLEANING_KERNELS[kernel](df[col])
     
     # Fill NaN values for numeric columns
-    numeric_cols = ['Impressions', 'Clicks', 'Spend', 'Sales', 'Orders', 'Units']
-    for col in numeric_cols:
+    for col in ZERO_FILLED_COLUMNS:
         if col in df.columns:
             df[col] = df[col].fillna(0)
     
+    # Compact dtypes for repeated text columns
+    for col in plan.categorical:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
     return df
 
 
+# Rows per chunk when streaming CSV uploads (bounds peak memory during ingestion)
+CSV_CHUNK_ROWS = 100_000
+
+
+def read_csv_header(source: BinaryIO) -> pd.DataFrame:
+    """Read only the header row of a CSV stream (as an empty DataFrame) and rewind."""
+    start = source.tell()
+    header = pd.read_csv(source, nrows=0)
+    source.seek(start)
+    return header
+
+
+def iter_search_term_chunks(
+    source: BinaryIO,
+    header: pd.DataFrame,
+    chunksize: int = CSV_CHUNK_ROWS,
+    plan: Optional[IngestionPlan] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a Search Term Report CSV as cleaned chunks (see process_search_term_report).
+    Only the columns the analyzers use are parsed. Non-metric columns are read as
+    strings so every chunk has the same column types, whatever values happen to fall
+    in it. Always yields at least one (possibly empty) chunk.
+    """
+    if plan is None:
+        plan = compile_ingestion_plan(list(header.columns))
+    dtype = {col: str for col in plan.text_columns}
+
+    empty = True
+    for chunk in pd.read_csv(source, chunksize=chunksize, usecols=plan.usecols, dtype=dtype):
+        empty = False
+        yield process_search_term_report(chunk, plan)
+    if empty:
+        yield process_search_term_report(header[plan.usecols].astype(dtype), plan)
+
+
+# Rows read for type checks when validating an upload
+VALIDATION_SAMPLE_ROWS = 1000
+
+
+def count_csv_rows(source: BinaryIO, block_size: int = 1024 * 1024) -> int:
+    """
+    Number of data rows of a CSV stream from a line scan (no parsing), then rewind.
+    Values with embedded line breaks count as extra rows.
+    """
+    start = source.tell()
+    lines = 0
+    last = b''
+    for block in iter(lambda: source.read(block_size), b''):
+        lines += block.count(b'\n')
+        last = block[-1:]
+    source.seek(start)
+    if last and last != b'\n':
+        lines += 1  # Last line without a line break
+    return max(lines - 1, 0)
+
+
+def read_file_sample(
+    source: BinaryIO,
+    filename: str,
+    nrows: int = VALIDATION_SAMPLE_ROWS
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Read the header and the first `nrows` rows of a file, plus its total row count
+    from a cheap scan (CSV line count, XLSX sheet dimension), without parsing the rest.
+    For zip archives the sample is the first report's and the count covers all reports.
+    """
+    file_type = detect_file_type(filename)
+    if detect_compression(filename):
+        sample = None
+        row_count = 0
+        for name, stream in iter_reports(source, filename):
+            if detect_file_type(name) != 'csv':
+                stream = BytesIO(stream.read())  # Workbooks need random access
+            report_sample, report_rows = read_file_sample(stream, name, nrows)
+            if sample is None:
+                sample = report_sample
+            row_count += report_rows
+        return sample, row_count
+
+    start = source.tell()
+
+    if file_type == 'csv':
+        sample = pd.read_csv(source, nrows=nrows)
+        source.seek(start)
+        return sample, count_csv_rows(source)
+
+    if filename.lower().endswith('.xlsx'):
+        try:
+            with XlsxWorkbook(source) as workbook:
+                sheet = select_sheet(workbook.sheet_names)
+                header, rows = workbook.read_rows(sheet, max_rows=nrows)
+                row_count = workbook.row_count(sheet)
+            if not header:
+                return pd.DataFrame(), 0
+            return TextParser([header] + rows, header=0).read(), row_count
+        except (KeyError, ValueError, SyntaxError, zipfile.BadZipFile):
+            source.seek(start)  # Unusual package layout: let pandas handle it below
+
+    # Legacy .xls (at most 65,536 rows) and unusual XLSX layouts: parse the sheet
+    workbook = pd.ExcelFile(source)
+    df = workbook.parse(select_sheet(workbook.sheet_names))
+    return df.head(nrows), len(df)
+
+
 def is_asin(value: str) -> bool:
     """Check if a value is an ASIN (starts with b0 or B0)."""
     if not isinstance(value, str):
@@ -327,7 +624,7 @@ def process_bulk_file(df: pd.DataFrame) -> pd.DataFrame:
         'campaign daily budget': 'Daily Budget'
     }
     
-    df = df.rename(columns=lambda x: column_map.get(x.lower().strip(), x))
+    df = df.rename(columns=lambda x: column_map.get(str(x).lower().strip(), x))
     
     if 'Record Type' not in df.columns or 'Daily Budget' not in df.columns:
         # If standard columns missing, try to detect structure
@@ -357,130 +654,6 @@ def process_bulk_file(df: pd.DataFrame) -> pd.DataFrame:
     result = campaigns[cols].rename(columns={'Campaign': 'Campaign Name'})
     
     # Clean budget column
-    result['Daily Budget'] = result['Daily Budget'].apply(clean_currency)
+    result['Daily Budget'] = clean_currency_series(result['Daily Budget'])
     
     return result
-
-
-def enrich_with_ids(items: List[object], bulk_df: pd.DataFrame) -> int:
-    """
-    Enrich a list of items (objects or dicts) with Campaign ID, Ad Group ID, and Portfolio ID 
-    from a Bulk File DataFrame.
-    Returns the number of items enriched with at least an Ad Group ID.
-    """
-    if bulk_df.empty or not items:
-        return 0
-
-    try:
-        # Prepare Bulk DF for mapping
-        bdf = bulk_df.copy()
-        if 'Entity' in bdf.columns and 'Record Type' not in bdf.columns:
-            bdf = bdf.rename(columns={'Entity': 'Record Type'})
-        bdf = normalize_columns(bdf)
-
-        # Helper to clean IDs (remove .0 from floats)
-        def clean_id(val):
-            if pd.isna(val):
-                return None
-            s = str(val).strip()
-            if s.endswith('.0'):
-                return s[:-2]
-            return s
-
-        # 1. Campaign IDs & Portfolio IDs
-        cid_map = {}
-        pid_map = {}
-        
-        # Helper to add to maps
-        def add_to_campaign_maps(df_subset, name_col, id_col, port_col=None):
-            for _, row in df_subset.iterrows():
-                c_name = str(row[name_col]).lower().strip()
-                cid_map[c_name] = clean_id(row[id_col])
-                if port_col and port_col in row and pd.notna(row[port_col]):
-                    pid_map[c_name] = clean_id(row[port_col])
-
-        # Primary: Campaign Name
-        if 'Campaign Name' in bdf.columns and 'Campaign ID' in bdf.columns:
-            cols = ['Campaign Name', 'Campaign ID']
-            if 'Portfolio ID' in bdf.columns:
-                cols.append('Portfolio ID')
-            c_data = bdf[cols].dropna(subset=['Campaign Name', 'Campaign ID']).drop_duplicates()
-            add_to_campaign_maps(c_data, 'Campaign Name', 'Campaign ID', 'Portfolio ID' if 'Portfolio ID' in bdf.columns else None)
-            
-        # Secondary: Campaign Name (Informational only)
-        c_info_col = next((c for c in bdf.columns if c.lower().strip() == 'campaign name (informational only)'), None)
-        if c_info_col and 'Campaign ID' in bdf.columns:
-            cols = [c_info_col, 'Campaign ID']
-            if 'Portfolio ID' in bdf.columns:
-                cols.append('Portfolio ID')
-            c_data_info = bdf[cols].dropna(subset=[c_info_col, 'Campaign ID']).drop_duplicates()
-            add_to_campaign_maps(c_data_info, c_info_col, 'Campaign ID', 'Portfolio ID' if 'Portfolio ID' in bdf.columns else None)
-
-        # 2. Ad Group IDs
-        ag_id_col = 'Ad Group ID'
-        if 'Ad Group ID' not in bdf.columns and 'Ad Group' in bdf.columns:
-            if 'Ad Group Name' in bdf.columns:
-                ag_id_col = 'Ad Group'
-        
-        agid_map = {}
-        if ag_id_col in bdf.columns:
-            # Primary Source: Ad Group Name
-            if 'Campaign Name' in bdf.columns and 'Ad Group Name' in bdf.columns:
-                ag_data = bdf[['Campaign Name', 'Ad Group Name', ag_id_col]].dropna().drop_duplicates()
-                for _, row in ag_data.iterrows():
-                    cn = str(row['Campaign Name']).lower().strip()
-                    an = str(row['Ad Group Name']).lower().strip()
-                    agid_map[(cn, an)] = clean_id(row[ag_id_col])
-            
-            # Secondary Source: Informational Columns
-            c_info_col = next((c for c in bdf.columns if c.lower().strip() == 'campaign name (informational only)'), None)
-            a_info_col = next((c for c in bdf.columns if c.lower().strip() == 'ad group name (informational only)'), None)
-            
-            if c_info_col and a_info_col:
-                ag_data_info = bdf[[c_info_col, a_info_col, ag_id_col]].dropna().drop_duplicates()
-                for _, row in ag_data_info.iterrows():
-                    cn = str(row[c_info_col]).lower().strip()
-                    an = str(row[a_info_col]).lower().strip()
-                    agid_map[(cn, an)] = clean_id(row[ag_id_col])
-
-        # Inject into items
-        count = 0
-        for item in items:
-            # Handle both dicts and objects (Pydantic models)
-            is_dict = isinstance(item, dict)
-            
-            if is_dict:
-                c_name = str(item.get('campaign_name', '')).lower().strip()
-                a_name = str(item.get('ad_group_name', '')).lower().strip()
-            else:
-                c_name = str(getattr(item, 'campaign_name', '')).lower().strip()
-                a_name = str(getattr(item, 'ad_group_name', '')).lower().strip()
-            
-            cid = None
-            pid = None
-            agid = None
-            
-            if c_name in cid_map:
-                cid = cid_map[c_name]
-            
-            if c_name in pid_map:
-                pid = pid_map[c_name]
-            
-            if (c_name, a_name) in agid_map:
-                agid = agid_map[(c_name, a_name)]
-                count += 1
-            
-            if is_dict:
-                if cid: item['campaign_id'] = cid
-                if pid: item['portfolio_id'] = pid
-                if agid: item['ad_group_id'] = agid
-            else:
-                if cid: setattr(item, 'campaign_id', cid)
-                if pid: setattr(item, 'portfolio_id', pid)
-                if agid: setattr(item, 'ad_group_id', agid)
-        
-        return count
-        
-    except Exception as e:
-        print(f"ID Enrichment Failed: {e}")
-        return 0
@@ -0,0 +1,126 @@
+"""
+Report Append.
+Merges a newer Search Term Report (typically the latest day) into a session's
+report, so a rolling session can be kept up to date without re-uploading the
+whole window.
+
+Rows of the new report replace session rows with the same
+(date, campaign, ad group, targeting, search term) key: Amazon restates recent
+days as attribution settles, so the latest pull wins. The metrics cube is
+updated for the affected dates only (services/metrics_cube.py).
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from services.metrics_cube import update_metrics_cube
+from services.parser import ZERO_FILLED_COLUMNS
+
+
+# Identity of a report row across daily pulls (columns missing from a report are left out)
+DEDUP_KEY = ['Date', 'Campaign Name', 'Ad Group Name', 'Targeting', 'Customer Search Term']
+
+
+@dataclass
+class AppendResult:
+    """Outcome of merge_report: the session rows are `kept` followed by `added`."""
+    kept: pd.DataFrame
+    added: pd.DataFrame
+    cube: pd.DataFrame
+    replaced: int
+    expired: int
+
+    @property
+    def row_count(self) -> int:
+        return len(self.kept) + len(self.added)
+
+
+def concat_reports(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate processed report frames, keeping categorical columns categorical."""
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].select_dtypes('category').columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            df[col] = union_categoricals([f[col] for f in frames], ignore_order=True)
+        elif not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def conform_columns(df: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """
+    `df` with the columns of `like` (a processed report), in its order. Columns `df`
+    lacks take `like`'s dtype and are left empty, except metrics (0, as when parsing)
+    and integer/boolean columns, which can't hold NaN. Columns `like` lacks are dropped.
+    """
+    missing = [col for col in like.columns if col not in df.columns]
+    df = df.reindex(columns=like.columns)
+    for col in missing:
+        dtype = like[col].dtype
+        if col in ZERO_FILLED_COLUMNS or dtype.kind in 'biu':
+            df[col] = df[col].fillna(0)
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def _key_index(df: pd.DataFrame, keys: List[str]) -> pd.MultiIndex:
+    # Plain values, so categorical and string columns compare equal
+    return pd.MultiIndex.from_frame(df[keys].astype(object))
+
+
+def merge_report(
+    df: pd.DataFrame,
+    cube: pd.DataFrame,
+    new_df: pd.DataFrame,
+    window_days: Optional[int] = None
+) -> AppendResult:
+    """
+    Merge a processed report `new_df` into a session's report `df` and its metrics
+    cube. With `window_days`, rows dated more than that many days before the latest
+    date are dropped (rows without a date are kept).
+    """
+    new_df = conform_columns(new_df, df)
+    keys = [col for col in DEDUP_KEY if col in df.columns]
+    dated = 'Date' in df.columns
+
+    if keys:
+        new_df = new_df.drop_duplicates(subset=keys, keep='last')
+        # Only rows on the new report's dates can be replaced by it
+        candidates = df['Date'].isin(new_df['Date'].unique()) if dated else pd.Series(True, index=df.index)
+        replaced = candidates.copy()
+        replaced[candidates] = _key_index(df[candidates], keys).isin(_key_index(new_df, keys))
+    else:
+        replaced = pd.Series(False, index=df.index)
+    kept = df[~replaced.to_numpy()]
+
+    expired = 0
+    keep_from = None
+    if window_days and dated:
+        # NaT-safe: the kept rows are empty when the new report restates every date
+        latest = pd.Series([kept['Date'].max(), new_df['Date'].max()]).max()
+        if pd.notna(latest):
+            keep_from = latest.normalize() - timedelta(days=window_days - 1)
+            old_kept = kept['Date'] < keep_from
+            old_new = new_df['Date'] < keep_from
+            expired = int(old_kept.sum()) + int(old_new.sum())
+            kept = kept[~old_kept.to_numpy()]
+            new_df = new_df[~old_new.to_numpy()]
+
+    if dated:
+        # Re-roll the cells of the new report's dates from all their rows
+        dates = new_df['Date'].unique()
+        affected = concat_reports([kept[kept['Date'].isin(dates).to_numpy()], new_df])
+        cube = update_metrics_cube(cube, affected, dates, keep_from)
+    else:
+        cube = None  # Rebuilt from the merged report
+
+    return AppendResult(
+        kept=kept.reset_index(drop=True),
+        added=new_df.reset_index(drop=True),
+        cube=cube,
+        replaced=int(replaced.sum()),
+        expired=expired,
+    )
@@ -0,0 +1,106 @@
+"""
+Result Cache.
+Per-worker LRU memo of analysis responses, keyed by (session id, data versions,
+endpoint, normalized query parameters).
+
+Data versions come from the session store (SessionStore.version) and change
+whenever a session or its bulk file is replaced, in whichever worker, so stale
+results are never served; they just age out of the LRU.
+
+Configuration (environment variables):
+- PPC_RESULT_CACHE_MB: maximum total size of cached results (default 256)
+- PPC_RESULT_CACHE_ENTRIES: maximum number of cached results (default 4096)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from services.session_store import estimate_size
+
+
+def make_key(session_id: str, versions: Tuple[Hashable, ...], endpoint: str, params: Dict[str, Any]) -> tuple:
+    """Cache key; unset parameters (None or '') are dropped, the rest sorted by name."""
+    normalized = tuple(sorted((name, value) for name, value in params.items() if value not in (None, '')))
+    return (session_id, versions, endpoint, normalized)
+
+
+class ResultCache:
+    """LRU cache bounded by entry count and approximate byte size, with hit/miss counters."""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()  # key -> [value, size]
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key: tuple) -> None:
+        _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, or compute() it and cache the result (exceptions aren't cached)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = [value, size]
+            self._total_bytes += size
+            while (
+                (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop this worker's entries for a session (other workers miss on the new version)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == session_id]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+            }
+
+
+def create_result_cache() -> ResultCache:
+    """Create the result cache configured by PPC_RESULT_CACHE_* environment variables."""
+    max_mb = float(os.environ.get('PPC_RESULT_CACHE_MB') or 256)
+    max_entries = int(os.environ.get('PPC_RESULT_CACHE_ENTRIES') or 4096)
+    return ResultCache(max_bytes=int(max_mb * 1024 * 1024), max_entries=max_entries)
@@ -0,0 +1,372 @@
+"""
+Declarative Rule Engine.
+Compiles rule expressions over report columns into vectorized pandas masks.
+
+Expressions use a small, safe subset of Python syntax, e.g.:
+    Spend >= 10 and Sales == 0 and not is_asin(Targeting)
+    ACOS > target_acos * 1.5 and col('Match Type') in ('BROAD', 'PHRASE')
+
+Names resolve to rule parameters first, then to columns (underscores may stand
+in for spaces: Match_Type -> 'Match Type'). Arithmetic is on numbers and numeric
+columns only. Compiled expressions are cached by the hash of their syntax tree
+(the COMPILED_CACHE_SIZE most recent ones), and sub-expressions shared between
+rules are evaluated once per pass over the data.
+"""
+
+import ast
+import hashlib
+import json
+import operator
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from services.parser import is_asin
+
+
+class RuleError(ValueError):
+    """Raised when a rule expression cannot be parsed, compiled or evaluated."""
+
+
+@dataclass
+class Rule:
+    """A named rule expression with an optional suggested action."""
+    name: str
+    expression: str
+    action: Optional[str] = None
+
+    @property
+    def hash(self) -> str:
+        return compile_expression(self.expression).hash
+
+
+def map_unique(values, func: Callable[[Any], Any]) -> np.ndarray:
+    """
+    Apply a scalar function once per distinct value and broadcast the result back
+    to every row. Report columns like Match Type or Targeting repeat heavily,
+    so this is far cheaper than calling the function per row.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    for i, value in enumerate(uniques):
+        mapped[i] = func(value)
+    return mapped[codes]
+
+
+# --- Evaluation helpers ---
+
+class _Context:
+    """State for one evaluation pass: the data, parameters and shared results."""
+
+    def __init__(self, df: pd.DataFrame, params: Dict[str, Any]):
+        self.df = df
+        self.params = params
+        self.memo: Dict[str, Any] = {}
+
+    def column(self, name: str) -> pd.Series:
+        if name in self.df.columns:
+            return self.df[name]
+        spaced = name.replace('_', ' ')
+        if spaced in self.df.columns:
+            return self.df[spaced]
+        raise RuleError(f"Unknown column or parameter: {name}")
+
+    def constant(self, value) -> pd.Series:
+        if value is None:
+            return pd.Series(np.nan, index=self.df.index, dtype='float64')
+        return pd.Series(value, index=self.df.index, dtype=object)
+
+
+def _as_mask(ctx: _Context, value) -> pd.Series:
+    """Coerce an evaluated value to a boolean Series (missing -> False)."""
+    if isinstance(value, pd.Series):
+        if value.dtype == bool:
+            return value
+        return value.fillna(False).astype(bool)
+    return pd.Series(bool(value), index=ctx.df.index)
+
+
+def _string_function(func: Callable[..., Any]) -> Callable:
+    """Lift a scalar string function to Series arguments (first argument is the value)."""
+    def wrapper(ctx: _Context, value, *args):
+        if isinstance(value, pd.Series):
+            return pd.Series(map_unique(value, lambda v: func(str(v), *args)), index=value.index)
+        return func(str(value), *args)
+    return wrapper
+
+
+FUNCTIONS: Dict[str, Callable] = {
+    'is_asin': _string_function(is_asin),
+    'lower': _string_function(lambda v: v.lower()),
+    'strip': _string_function(lambda v: v.strip()),
+    'contains': _string_function(lambda v, sub: str(sub) in v),
+    'startswith': _string_function(lambda v, prefix: v.startswith(str(prefix))),
+    'isna': lambda ctx, value: value.isna() if isinstance(value, pd.Series) else pd.isna(value),
+    'notna': lambda ctx, value: value.notna() if isinstance(value, pd.Series) else pd.notna(value),
+}
+
+_COMPARISONS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+_ARITHMETIC = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float, np.number))
+
+
+def _numeric_operand(value):
+    """
+    Check an arithmetic operand: numbers and numeric columns only, so rules can't
+    repeat or concatenate strings (e.g. "ab" * 100000000) to exhaust memory.
+    """
+    if isinstance(value, pd.Series):
+        if pd.api.types.is_numeric_dtype(value):
+            return value
+    elif _is_number(value):
+        return value
+    raise RuleError("Arithmetic operands must be numbers or numeric columns")
+
+
+# --- Compiler ---
+
+@dataclass
+class CompiledExpression:
+    """A rule expression compiled to a function of (DataFrame, params)."""
+    expression: str
+    hash: str
+    _evaluate: Callable[[_Context], Any]
+
+    def evaluate(self, df: pd.DataFrame, params: Optional[Dict[str, Any]] = None) -> pd.Series:
+        """Evaluate to a boolean mask aligned with df."""
+        ctx = _Context(df, params or {})
+        return _as_mask(ctx, self._evaluate(ctx))
+
+
+def _compile_node(node: ast.AST) -> Callable[[_Context], Any]:
+    """Compile a syntax node into a memoized evaluation function."""
+    key = ast.dump(node)
+    evaluate = _compile_uncached(node)
+
+    def memoized(ctx: _Context):
+        if key not in ctx.memo:
+            ctx.memo[key] = evaluate(ctx)
+        return ctx.memo[key]
+    return memoized
+
+
+def _compile_uncached(node: ast.AST) -> Callable[[_Context], Any]:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda ctx: value
+
+    if isinstance(node, (ast.Tuple, ast.List)):
+        if not all(isinstance(e, ast.Constant) for e in node.elts):
+            raise RuleError("Only constant values are allowed in lists")
+        values = [e.value for e in node.elts]
+        return lambda ctx: values
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda ctx: ctx.params[name] if name in ctx.params else ctx.column(name)
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v) for v in node.values]
+        if isinstance(node.op, ast.And):
+            def evaluate_and(ctx):
+                mask = _as_mask(ctx, parts[0](ctx))
+                for part in parts[1:]:
+                    mask = mask & _as_mask(ctx, part(ctx))
+                return mask
+            return evaluate_and
+
+        def evaluate_or(ctx):
+            mask = _as_mask(ctx, parts[0](ctx))
+            for part in parts[1:]:
+                mask = mask | _as_mask(ctx, part(ctx))
+            return mask
+        return evaluate_or
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda ctx: ~_as_mask(ctx, operand(ctx))
+        if isinstance(node.op, ast.USub):
+            return lambda ctx: -_numeric_operand(operand(ctx))
+        raise RuleError(f"Unsupported operator: {type(node.op).__name__}")
+
+    if isinstance(node, ast.BinOp):
+        op = _ARITHMETIC.get(type(node.op))
+        if op is None:
+            raise RuleError(f"Unsupported operator: {type(node.op).__name__}")
+        for operand in (node.left, node.right):
+            if isinstance(operand, (ast.Tuple, ast.List)) or (
+                isinstance(operand, ast.Constant) and not _is_number(operand.value)
+            ):
+                raise RuleError("Arithmetic operands must be numbers or numeric columns")
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda ctx: op(_numeric_operand(left(ctx)), _numeric_operand(right(ctx)))
+
+    if isinstance(node, ast.Compare):
+        operands = [_compile_node(node.left)] + [_compile_node(c) for c in node.comparators]
+        ops = node.ops
+        for op in ops:
+            if type(op) not in _COMPARISONS and not isinstance(op, (ast.In, ast.NotIn)):
+                raise RuleError(f"Unsupported comparison: {type(op).__name__}")
+
+        def evaluate_compare(ctx):
+            mask = None
+            for i, op in enumerate(ops):
+                left, right = operands[i](ctx), operands[i + 1](ctx)
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    if not isinstance(left, pd.Series):
+                        left = ctx.constant(left)
+                    result = left.isin(right)
+                    if isinstance(op, ast.NotIn):
+                        result = ~result
+                else:
+                    result = _COMPARISONS[type(op)](left, right)
+                result = _as_mask(ctx, result)
+                mask = result if mask is None else mask & result
+            return mask
+        return evaluate_compare
+
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise RuleError("Only simple function calls are allowed")
+        name = node.func.id
+
+        # col('Column Name'[, default]) references a column by its exact name
+        if name == 'col':
+            if not 1 <= len(node.args) <= 2 or not all(isinstance(a, ast.Constant) for a in node.args):
+                raise RuleError("col() takes a column name and an optional default")
+            column = node.args[0].value
+            has_default = len(node.args) == 2
+            default = node.args[1].value if has_default else None
+
+            def evaluate_col(ctx):
+                if column in ctx.df.columns:
+                    return ctx.df[column]
+                if has_default:
+                    return ctx.constant(default)
+                raise RuleError(f"Unknown column: {column}")
+            return evaluate_col
+
+        func = FUNCTIONS.get(name)
+        if func is None:
+            raise RuleError(f"Unknown function: {name}")
+        args = [_compile_node(a) for a in node.args]
+        return lambda ctx: func(ctx, *[a(ctx) for a in args])
+
+    raise RuleError(f"Unsupported syntax: {type(node).__name__}")
+
+
+# Compiled expressions kept (rule sets come from clients, so the cache is bounded)
+COMPILED_CACHE_SIZE = 1024
+
+_compiled: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """Compile a rule expression, reusing the cached version for an identical syntax tree."""
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise RuleError(f"Invalid rule expression '{expression}': {e.msg}")
+
+    rule_hash = hashlib.sha1(ast.dump(tree.body).encode('utf-8')).hexdigest()
+    with _compiled_lock:
+        compiled = _compiled.get(rule_hash)
+        if compiled is not None:
+            _compiled.move_to_end(rule_hash)
+            return compiled
+
+    compiled = CompiledExpression(expression, rule_hash, _compile_node(tree.body))
+    with _compiled_lock:
+        _compiled[rule_hash] = compiled
+        _compiled.move_to_end(rule_hash)
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def evaluate_rules(
+    df: pd.DataFrame,
+    rules: List[Rule],
+    params: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Evaluate several rules in one pass over the data.
+    Returns a DataFrame of boolean masks (one column per rule name), aligned with df.
+    """
+    ctx = _Context(df, params or {})
+    masks = {}
+    for rule in rules:
+        compiled = compile_expression(rule.expression)
+        try:
+            masks[rule.name] = _as_mask(ctx, compiled._evaluate(ctx))
+        except RuleError:
+            raise
+        except Exception as e:
+            raise RuleError(f"Rule '{rule.name}' failed: {e}")
+    return pd.DataFrame(masks, index=df.index, columns=[r.name for r in rules])
+
+
+def first_matching_rule(masks: pd.DataFrame) -> pd.Series:
+    """Name of the first rule (in priority order) that matched each row, or None."""
+    matched = masks.any(axis=1)
+    first = masks.to_numpy().argmax(axis=1) if len(masks.columns) else np.zeros(len(masks), dtype=int)
+    names = np.asarray(masks.columns, dtype=object)[first] if len(masks.columns) else np.full(len(masks), None)
+    return pd.Series(np.where(matched, names, None), index=masks.index, dtype=object)
+
+
+def load_rules(source: Union[str, List[dict]]) -> List[Rule]:
+    """
+    Load rule definitions from a JSON/YAML document or a list of dicts.
+    Each definition needs 'name' and 'expression'; 'action' is optional.
+    """
+    definitions = source
+    if isinstance(source, str):
+        try:
+            definitions = json.loads(source)
+        except ValueError:
+            try:
+                import yaml
+            except ImportError:
+                raise RuleError("Rules are not valid JSON (YAML rule files require PyYAML)")
+            try:
+                definitions = yaml.safe_load(source)
+            except yaml.YAMLError as e:
+                raise RuleError(f"Invalid YAML rules: {e}")
+
+    if isinstance(definitions, dict):
+        definitions = definitions.get('rules', [])
+    if not isinstance(definitions, list):
+        raise RuleError("Rules must be a list of {name, expression} definitions")
+
+    rules = []
+    for d in definitions:
+        if not isinstance(d, dict) or 'name' not in d or 'expression' not in d:
+            raise RuleError("Each rule needs a 'name' and an 'expression'")
+        if any(r.name == str(d['name']) for r in rules):
+            raise RuleError(f"Duplicate rule name: {d['name']}")
+        rule = Rule(name=str(d['name']), expression=str(d['expression']), action=d.get('action'))
+        compile_expression(rule.expression)  # Fail fast on invalid syntax
+        rules.append(rule)
+    return rules
@@ -0,0 +1,174 @@
+"""
+Session Index.
+Row positions of a Search Term Report grouped by campaign, ad group and
+(campaign, ad group), plus a date-sorted row order. Built once at upload time
+so filtered dashboard requests slice only the matching rows instead of masking
+the whole report on every request.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+@dataclass
+class Grouping:
+    """Rows grouped by key: rows of group g are order[offsets[g]:offsets[g + 1]], in row order."""
+    keys: Dict[Any, int]
+    order: np.ndarray
+    offsets: np.ndarray
+
+    def rows(self, key) -> np.ndarray:
+        group = self.keys.get(key)
+        if group is None:
+            return self.order[:0]
+        return self.order[self.offsets[group]:self.offsets[group + 1]]
+
+
+def _positions_dtype(n: int):
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+def _grouping(codes: np.ndarray, keys: list) -> Grouping:
+    """Group rows by factorized codes (-1 = missing, never matched by a filter)."""
+    if len(keys) < np.iinfo(np.int16).max:
+        codes = codes.astype(np.int16)  # Stable sort of 16-bit ints is a radix sort
+    order = np.argsort(codes, kind='stable').astype(_positions_dtype(len(codes)))
+    counts = np.bincount(codes[codes >= 0], minlength=len(keys))
+    missing = len(codes) - int(counts.sum())
+    offsets = np.concatenate([[0], np.cumsum(counts)]) + missing
+    return Grouping({key: i for i, key in enumerate(keys)}, order, offsets)
+
+
+@dataclass
+class SessionIndex:
+    """Per-session filter index (see build_session_index)."""
+    row_count: int
+    campaigns: Optional[Grouping] = None
+    ad_groups: Optional[Grouping] = None
+    campaign_ad_groups: Optional[Grouping] = None
+    # Row positions sorted by date (missing dates last)
+    date_order: Optional[np.ndarray] = None
+
+    def select(
+        self,
+        df: pd.DataFrame,
+        campaign: Optional[str] = None,
+        ad_group: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Row positions (ascending) matching the filters, with the same semantics as
+        df['Campaign Name'] == campaign, df['Date'] >= start_date, etc.
+        Returns None when the index can't answer and the caller should mask instead.
+        """
+        if len(df) != self.row_count:
+            return None
+
+        positions = None
+        if campaign and ad_group:
+            if self.campaign_ad_groups is None:
+                return None
+            positions = self.campaign_ad_groups.rows((campaign, ad_group))
+        elif campaign:
+            if self.campaigns is None:
+                return None
+            positions = self.campaigns.rows(campaign)
+        elif ad_group:
+            if self.ad_groups is None:
+                return None
+            positions = self.ad_groups.rows(ad_group)
+
+        if not start_date and not end_date:
+            return positions
+        if self.date_order is None:
+            return None
+        try:
+            start = pd.Timestamp(start_date).to_datetime64() if start_date else None
+            end = pd.Timestamp(end_date).to_datetime64() if end_date else None
+        except (ValueError, TypeError):
+            return None
+
+        dates = df['Date'].to_numpy()
+        if positions is not None:
+            # Few rows left: compare their dates directly
+            dates = dates[positions]
+            keep = np.ones(len(positions), dtype=bool)
+            if start is not None:
+                keep &= dates >= start
+            if end is not None:
+                keep &= dates <= end
+            return positions[keep]
+
+        # Date range only: binary search through the date order (missing dates sort last)
+        lo = np.searchsorted(dates, start, side='left', sorter=self.date_order) if start is not None else 0
+        hi = np.searchsorted(dates, end, side='right', sorter=self.date_order) if end is not None \
+            else len(dates) - np.count_nonzero(np.isnat(dates))
+        matched = self.date_order[lo:hi]
+        if len(matched) * 16 < len(dates):
+            return np.sort(matched)
+        # Wide ranges: a row bitmap is cheaper than sorting the positions
+        keep = np.zeros(len(dates), dtype=bool)
+        keep[matched] = True
+        return np.flatnonzero(keep)
+
+
+def _take_chunked(values: pa.ChunkedArray, positions: np.ndarray) -> pa.ChunkedArray:
+    """Take from each chunk separately (positions ascending)."""
+    bounds = np.cumsum([0] + [len(chunk) for chunk in values.chunks])
+    starts = np.searchsorted(positions, bounds)
+    pieces = [
+        values.chunk(i).take(pa.array(positions[starts[i]:starts[i + 1]] - bounds[i]))
+        for i in range(values.num_chunks)
+        if starts[i + 1] > starts[i]
+    ]
+    return pa.chunked_array(pieces, type=values.type)
+
+
+def take_rows(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+    """
+    df.take(positions) for ascending positions, in O(len(positions)).
+    pyarrow's take on multi-chunk string columns (as read from a streamed session
+    file) concatenates all chunks first, i.e. costs O(total rows).
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col].array
+        dtype = values.dtype
+        if hasattr(values, '__arrow_array__') and hasattr(dtype, '__from_arrow__'):
+            chunked = values.__arrow_array__()
+            if isinstance(chunked, pa.ChunkedArray) and chunked.num_chunks > 1:
+                columns[col] = dtype.__from_arrow__(_take_chunked(chunked, positions))
+                continue
+        columns[col] = values.take(positions)
+    return pd.DataFrame(columns, index=df.index.take(positions), columns=df.columns)
+
+
+def build_session_index(df: pd.DataFrame) -> SessionIndex:
+    """Build the filter index of a processed Search Term Report."""
+    index = SessionIndex(row_count=len(df))
+
+    campaign_codes = ad_group_codes = None
+    if 'Campaign Name' in df.columns:
+        campaign_codes, campaigns = pd.factorize(df['Campaign Name'])
+        index.campaigns = _grouping(campaign_codes, list(campaigns))
+    if 'Ad Group Name' in df.columns:
+        ad_group_codes, ad_groups = pd.factorize(df['Ad Group Name'])
+        index.ad_groups = _grouping(ad_group_codes, list(ad_groups))
+    if campaign_codes is not None and ad_group_codes is not None:
+        valid = (campaign_codes >= 0) & (ad_group_codes >= 0)
+        pair_codes = np.full(len(df), -1, dtype=np.intp)
+        codes, pairs = pd.factorize(campaign_codes[valid].astype(np.int64) * len(ad_groups) + ad_group_codes[valid])
+        pair_codes[valid] = codes
+        keys = [(campaigns[p // len(ad_groups)], ad_groups[p % len(ad_groups)]) for p in pairs]
+        index.campaign_ad_groups = _grouping(pair_codes, keys)
+
+    if 'Date' in df.columns and pd.api.types.is_datetime64_dtype(df['Date']):
+        dates = df['Date'].to_numpy()
+        index.date_order = np.argsort(dates, kind='stable').astype(_positions_dtype(len(df)))
+
+    return index
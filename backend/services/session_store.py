@@ -0,0 +1,854 @@
+"""
+Session Storage.
+Pluggable stores for uploaded reports and derived session data (bulk files,
+analysis results).
+
+Every store behaves like a dict keyed by session key ("<id>", "<id>_bulk",
+"<id>_results", ...), so routers can keep using `sessions[key]`:
+- MemorySessionStore: in-process LRU with TTL and size-based eviction
+- DiskSessionStore: Arrow IPC files memory-mapped on read; the directory can
+  be shared by several worker processes
+- TieredSessionStore: memory LRU tier that spills to the disk tier
+  (single process only, since the memory tier is private)
+- RedisSessionStore: any Redis-compatible client (Arrow IPC payloads)
+
+DataFrames are stored as Arrow IPC; values Arrow cannot represent (e.g. object
+columns mixing numbers and text, or non-DataFrame values) fall back to pickle.
+"""
+
+import json
+import os
+import pickle
+import re
+import tempfile
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, BinaryIO, Callable, Dict, Hashable, Iterable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+
+# File/payload formats
+ARROW = b'ARW1'
+PICKLE = b'PKL1'
+
+# Keys are used as file names, so only allow a safe character set
+_SAFE_KEY = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+
+def validate_key(key: str) -> str:
+    """Reject keys that are unsafe to use as file names (e.g. '../x')."""
+    if not isinstance(key, str) or not _SAFE_KEY.match(key):
+        raise ValueError(f"Invalid session key: {key!r}")
+    return key
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a stored value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def _to_arrow(value: Any) -> Optional[pa.Table]:
+    """Convert a DataFrame to an Arrow table, or None if Arrow can't represent it."""
+    if not isinstance(value, pd.DataFrame):
+        return None
+    try:
+        return pa.Table.from_pandas(value, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        return None
+
+
+# Schema metadata listing streamed categorical columns whose categories must be re-sorted on read
+SORT_CATEGORIES_METADATA = b'ppc.sort_categories'
+
+# Schema metadata listing streamed categorical columns stored as plain strings (see _stream_schema)
+DECODED_CATEGORIES_METADATA = b'ppc.decoded_categories'
+
+# Schema metadata holding a random id per write of an Arrow file (see DiskSessionStore.version)
+WRITE_ID_METADATA = b'ppc.write_id'
+
+
+def _with_write_id(schema: pa.Schema) -> pa.Schema:
+    return schema.with_metadata({**(schema.metadata or {}), WRITE_ID_METADATA: uuid.uuid4().hex.encode('ascii')})
+
+
+def _extend_categories(chunk: pd.DataFrame, dictionaries: Dict[str, pd.Index]) -> pd.DataFrame:
+    """
+    Re-code a chunk's categorical columns against per-stream categories that only
+    grow (new values are appended), so every chunk's dictionary extends the
+    previous one and can be written as an IPC dictionary delta.
+    """
+    categorical = chunk.select_dtypes('category').columns
+    if len(categorical) == 0:
+        return chunk
+    chunk = chunk.copy(deep=False)
+    for col in categorical:
+        categories = chunk[col].cat.categories
+        known = dictionaries.get(col)
+        if known is None:
+            dictionaries[col] = categories
+            continue
+        new = categories[~categories.isin(known)]
+        if len(new):
+            known = dictionaries[col] = known.append(new)
+        chunk[col] = chunk[col].cat.set_categories(known)
+    return chunk
+
+
+def _stream_schema(table: pa.Table) -> pa.Schema:
+    """
+    Schema of a chunk stream, from its first chunk. Dictionary index types are fixed
+    to int32 (pandas picks the smallest type per chunk). A categorical column that is
+    blank throughout the first chunk has no dictionary values (nor a value type) to
+    extend, and an IPC file can't replace its dictionary later, so it is stored as
+    plain strings and made categorical again on read.
+    """
+    fields = []
+    names = []
+    decoded = []
+    for field in table.schema:
+        if pa.types.is_dictionary(field.type):
+            if all(len(chunk.dictionary) == 0 for chunk in table.column(field.name).chunks):
+                field = pa.field(field.name, pa.large_string(), field.nullable, field.metadata)
+                decoded.append(field.name)
+            else:
+                field = pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type), field.nullable, field.metadata)
+                names.append(field.name)
+        fields.append(field)
+    metadata = dict(table.schema.metadata or {})
+    if names:
+        metadata[SORT_CATEGORIES_METADATA] = json.dumps(names).encode('utf-8')
+    if decoded:
+        metadata[DECODED_CATEGORIES_METADATA] = json.dumps(decoded).encode('utf-8')
+    return pa.schema(fields, metadata=metadata)
+
+
+def _table_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Convert a stored table back to pandas."""
+    # split_blocks keeps one block per column so null-free numeric columns can
+    # stay zero-copy views of a memory-mapped file
+    df = table.to_pandas(split_blocks=True)
+    metadata = table.schema.metadata or {}
+    for col in json.loads(metadata.get(SORT_CATEGORIES_METADATA, b'[]')):
+        # Streamed categories are in order of appearance; keep them sorted, as astype('category') does
+        categories = df[col].cat.categories
+        if not categories.is_monotonic_increasing:
+            df[col] = df[col].cat.reorder_categories(categories.sort_values())
+    for col in json.loads(metadata.get(DECODED_CATEGORIES_METADATA, b'[]')):
+        df[col] = df[col].astype('category')
+    return df
+
+
+def serialize(value: Any) -> bytes:
+    """Serialize a value to bytes (Arrow IPC for DataFrames, pickle otherwise)."""
+    table = _to_arrow(value)
+    if table is None:
+        return PICKLE + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return ARROW + sink.getvalue().to_pybytes()
+
+
+def deserialize(payload: bytes) -> Any:
+    """Inverse of serialize()."""
+    header, body = payload[:4], payload[4:]
+    if header == ARROW:
+        return _table_to_pandas(pa.ipc.open_file(pa.py_buffer(body)).read_all())
+    if header == PICKLE:
+        return pickle.loads(body)
+    raise ValueError("Unknown session payload format")
+
+
+class SessionStore(MutableMapping):
+    """
+    Base class for session stores.
+    Subclasses implement get_value/put/delete/keys; dict-style access maps onto them.
+    """
+
+    def get_value(self, key: str) -> Any:
+        """Return the stored value or raise KeyError."""
+        raise NotImplementedError
+
+    def put(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def put_stream(self, key: str, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Store a DataFrame given as a stream of chunks; returns the number of rows.
+        Stores that can append incrementally override this to bound memory use.
+        """
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True)
+        # Categoricals with different categories per chunk concatenate as plain values
+        for col in frames[0].select_dtypes('category').columns:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        self.put(key, df)
+        return len(df)
+
+    def delete(self, key: str) -> None:
+        """Remove a key (no error if it is missing)."""
+        raise NotImplementedError
+
+    def link(self, src_key: str, dst_key: str) -> None:
+        """
+        Store src_key's value under dst_key as well (KeyError if src_key is missing).
+        Stores that can share the stored data instead of copying it override this.
+        """
+        self.put(dst_key, self.get_value(src_key))
+
+    def version(self, key: str) -> Optional[Hashable]:
+        """
+        Token that changes whenever the key's value is replaced (the same in every
+        worker), or None if the key is missing or the store can't tell.
+        Used to key caches of results derived from a stored value.
+        """
+        return None
+
+    def keys(self):
+        raise NotImplementedError
+
+    def __getitem__(self, key: str) -> Any:
+        return self.get_value(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.put(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.delete(key)
+
+    def __contains__(self, key: object) -> bool:
+        # Subclasses override this with a check that doesn't load the value
+        try:
+            self.get_value(key)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.keys()))
+
+    def __len__(self) -> int:
+        return len(list(self.keys()))
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process LRU store.
+    Entries expire `ttl_seconds` after their last access; when the total size
+    exceeds `max_bytes`, least recently used entries are evicted and handed to
+    `on_evict` (used by the tiered store to spill them to disk).
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[str, Any], None]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, list]" = OrderedDict()  # key -> [value, size, last_access, version]
+        self._versions = itertools.count(1)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def _expired(self, last_access: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - last_access > self.ttl_seconds
+
+    def _remove(self, key: str) -> Any:
+        value, size, _, _ = self._entries.pop(key)
+        self._total_bytes -= size
+        return value
+
+    def _evict_expired(self) -> None:
+        for key in [k for k, (_, _, last, _) in self._entries.items() if self._expired(last)]:
+            self._remove(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry[2])
+
+    def get_value(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise KeyError(key)
+            if self._expired(entry[2]):
+                self._remove(key)
+                raise KeyError(key)
+            entry[2] = time.time()
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: Optional[int] = None) -> None:
+        size = estimate_size(value) if size is None else size
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._evict_expired()
+            self._entries[key] = [value, size, time.time(), next(self._versions)]
+            self._total_bytes += size
+            # Size-based eviction (never evicts the entry just written)
+            while self.max_bytes is not None and self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key = next(iter(self._entries))
+                evicted.append((old_key, self._remove(old_key)))
+        for old_key, old_value in evicted:
+            if self.on_evict:
+                self.on_evict(old_key, old_value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def link(self, src_key: str, dst_key: str) -> None:
+        # Both keys reference the same (immutable) value; its size is counted per key
+        with self._lock:
+            value = self.get_value(src_key)
+            size = self._entries[src_key][1]
+        self.put(dst_key, value, size=size)
+
+    def version(self, key: str) -> Optional[Hashable]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[2]):
+                return None
+            return ('memory', id(self), entry[3])
+
+    def keys(self):
+        with self._lock:
+            self._evict_expired()
+            return list(self._entries.keys())
+
+
+class DiskSessionStore(SessionStore):
+    """
+    On-disk store, safe to share between processes (e.g. uvicorn workers).
+    DataFrames are written once as uncompressed Arrow IPC files and
+    memory-mapped on read, so numeric and string columns reference the page
+    cache instead of being copied into each worker's heap. Other values are
+    pickled.
+
+    Each process keeps the frames it has opened, keyed by the file's identity
+    (inode and size); a file replaced or deleted by another process is
+    detected with a single stat() and re-read. A file's mtime tracks its last
+    access and drives TTL and size-based (LRU) eviction.
+
+    Version tokens also carry a random id written into each Arrow file's
+    schema metadata: once a replaced file is gone, its inode can be reused by
+    a new file of the same size (same schema and row count), which the file
+    identity alone would not tell apart.
+
+    link() adds a hard link, so keys can share one file: its data stays on disk
+    until the last key referencing it is removed, and size-based eviction
+    counts it once.
+
+    Eviction scans the whole directory, so writes only trigger it every
+    EVICT_INTERVAL seconds, or once EVICT_WRITE_FRACTION of max_bytes has been
+    written since the last scan; small frequent writes (progress records) stay
+    cheap however many sessions are stored.
+    """
+
+    # Don't rewrite mtime on every read; this is plenty for hour-scale TTLs
+    TOUCH_INTERVAL = 60
+
+    # Eviction scan throttling (see class docstring)
+    EVICT_INTERVAL = 30
+    EVICT_WRITE_FRACTION = 0.05
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._opened: Dict[str, tuple] = {}  # key -> (file identity, arrow table, value)
+        self._write_ids: Dict[str, tuple] = {}  # key -> (file identity and ctime, write id)
+        self._last_evict = time.monotonic()
+        self._written_since_evict = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key: str):
+        try:
+            validate_key(key)
+        except ValueError:
+            raise KeyError(key)
+        base = os.path.join(self.directory, key)
+        return base + '.arrow', base + '.pkl'
+
+    def _stat(self, key: str):
+        """Return (path, stat) for the key's file or raise KeyError."""
+        for path in self._paths(key):
+            try:
+                return path, os.stat(path)
+            except FileNotFoundError:
+                continue
+        raise KeyError(key)
+
+    def _expired(self, mtime: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - mtime > self.ttl_seconds
+
+    def _read(self, path: str):
+        """Load a file, returning (arrow table or None, value)."""
+        if path.endswith('.arrow'):
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            return table, _table_to_pandas(table)
+        with open(path, 'rb') as f:
+            return None, pickle.load(f)
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            _, stat = self._stat(key)
+        except KeyError:
+            return False
+        return not self._expired(stat.st_mtime)
+
+    def _write_id(self, key: str, path: str, stat: os.stat_result) -> Hashable:
+        """
+        Id of the write that produced a key's file. Read from the Arrow footer once
+        per file (again after this process writes the key, or after the ctime changes,
+        as on a replacement by another process or an access touch); pickles and Arrow
+        files without one use the ctime.
+        """
+        identity = (path, stat.st_dev, stat.st_ino, stat.st_size, stat.st_ctime_ns)
+        with self._lock:
+            cached = self._write_ids.get(key)
+        if cached is not None and cached[0] == identity:
+            return cached[1]
+        write_id = stat.st_ctime_ns
+        if path.endswith('.arrow'):
+            try:
+                with pa.memory_map(path, 'r') as source:
+                    metadata = pa.ipc.open_file(source).schema.metadata or {}
+            except (FileNotFoundError, pa.ArrowInvalid):
+                metadata = {}
+            write_id = metadata.get(WRITE_ID_METADATA, write_id)
+        with self._lock:
+            self._write_ids[key] = (identity, write_id)
+        return write_id
+
+    def version(self, key: str) -> Optional[Hashable]:
+        # Every write renames a new file with a new write id into place (access
+        # only touches the mtime)
+        try:
+            path, stat = self._stat(key)
+        except KeyError:
+            return None
+        if self._expired(stat.st_mtime):
+            return None
+        return (path, stat.st_dev, stat.st_ino, stat.st_size, self._write_id(key, path, stat))
+
+    def get_value(self, key: str) -> Any:
+        with self._lock:
+            try:
+                path, stat = self._stat(key)
+            except KeyError:
+                self._opened.pop(key, None)
+                raise
+            if self._expired(stat.st_mtime):
+                self.delete(key)
+                raise KeyError(key)
+
+            identity = (path, stat.st_dev, stat.st_ino, stat.st_size)
+            opened = self._opened.get(key)
+            if opened is not None and opened[0] == identity:
+                value = opened[2]
+            else:
+                try:
+                    table, value = self._read(path)
+                except FileNotFoundError:
+                    raise KeyError(key)
+                # Holding the table keeps the mapping (and so the inode) alive
+                self._opened[key] = (identity, table, value)
+
+            if time.time() - stat.st_mtime > self.TOUCH_INTERVAL:
+                try:
+                    os.utime(path)  # Record access for LRU/TTL
+                except FileNotFoundError:
+                    pass
+            return value
+
+    def _write(self, key: str, arrow: bool, write: Callable[[BinaryIO], Any]) -> Any:
+        """
+        Write a key's file through `write(f)`. The data goes to a temp file that is
+        renamed into place, so readers never see a partial file.
+        """
+        arrow_path, pickle_path = self._paths(validate_key(key))
+        path, other = (arrow_path, pickle_path) if arrow else (pickle_path, arrow_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                result = write(f)
+            with self._lock:
+                os.replace(tmp_path, path)
+                self._opened.pop(key, None)
+                self._write_ids.pop(key, None)
+                # Drop a stale copy in the other format
+                if os.path.exists(other):
+                    os.remove(other)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        try:
+            written = os.path.getsize(path)
+        except OSError:
+            written = 0
+        self._maybe_evict(keep=path, written=written)
+        return result
+
+    def put(self, key: str, value: Any) -> None:
+        table = _to_arrow(value)
+
+        def write(f):
+            if table is None:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                return
+            with pa.ipc.new_file(f, _with_write_id(table.schema)) as writer:
+                writer.write_table(table)
+
+        self._write(key, table is not None, write)
+
+    def put_stream(self, key: str, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        Append DataFrame chunks to a single Arrow file, one record batch group per
+        chunk, so only one chunk is in memory at a time. Chunks are cast to the
+        first chunk's schema; categorical columns share one growing dictionary
+        (written as dictionary deltas). Returns the number of rows written.
+        """
+        def write(f):
+            writer = None
+            schema = None
+            dictionaries: Dict[str, pd.Index] = {}
+            rows = 0
+            try:
+                for chunk in chunks:
+                    try:
+                        table = pa.Table.from_pandas(_extend_categories(chunk, dictionaries), preserve_index=False)
+                        if schema is None:
+                            schema = _with_write_id(_stream_schema(table))
+                            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                            writer = pa.ipc.new_file(f, schema, options=options)
+                        table = table.cast(schema)
+                    except (pa.ArrowException, TypeError, ValueError) as e:
+                        raise ValueError(f"Inconsistent column types across chunks: {e}")
+                    writer.write_table(table)
+                    rows += len(chunk)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                raise ValueError("No data to store")
+            return rows
+
+        return self._write(key, True, write)
+
+    def delete(self, key: str) -> None:
+        try:
+            paths = self._paths(key)
+        except KeyError:
+            return
+        with self._lock:
+            self._opened.pop(key, None)
+            self._write_ids.pop(key, None)
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def link(self, src_key: str, dst_key: str) -> None:
+        src_path, stat = self._stat(src_key)
+        if self._expired(stat.st_mtime):
+            raise KeyError(src_key)
+        arrow_path, pickle_path = self._paths(validate_key(dst_key))
+        path, other = (arrow_path, pickle_path) if src_path.endswith('.arrow') else (pickle_path, arrow_path)
+
+        tmp_path = os.path.join(self.directory, f'{uuid.uuid4().hex}.tmp')
+        try:
+            os.link(src_path, tmp_path)
+        except FileNotFoundError:
+            raise KeyError(src_key)
+        except OSError:
+            # File system without hard links: store a copy
+            super().link(src_key, dst_key)
+            return
+        try:
+            with self._lock:
+                os.replace(tmp_path, path)
+                self._opened.pop(dst_key, None)
+                self._write_ids.pop(dst_key, None)
+                if os.path.exists(other):
+                    os.remove(other)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _files(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.arrow') or name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime, (stat.st_dev, stat.st_ino)
+
+    def _maybe_evict(self, keep: str, written: int) -> None:
+        """Run eviction after a write when it is due (see EVICT_INTERVAL)."""
+        with self._lock:
+            self._written_since_evict += written
+            due = time.monotonic() - self._last_evict >= self.EVICT_INTERVAL or (
+                self.max_bytes is not None
+                and self._written_since_evict >= self.max_bytes * self.EVICT_WRITE_FRACTION
+            )
+        if due:
+            self._evict(keep=keep)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Remove expired files, then least recently used files beyond max_bytes."""
+        with self._lock:
+            self._last_evict = time.monotonic()
+            self._written_since_evict = 0
+            # Release frames whose file was replaced or removed (possibly by another worker)
+            for key, (identity, _, _) in list(self._opened.items()):
+                try:
+                    stat = os.stat(identity[0])
+                except FileNotFoundError:
+                    stat = None
+                if stat is None or (stat.st_dev, stat.st_ino, stat.st_size) != identity[1:]:
+                    del self._opened[key]
+            for key, (identity, _) in list(self._write_ids.items()):
+                if not os.path.exists(identity[0]):
+                    del self._write_ids[key]
+
+            files = []
+            for path, size, mtime, inode in self._files():
+                if path != keep and self.ttl_seconds is not None and time.time() - mtime > self.ttl_seconds:
+                    os.remove(path)
+                else:
+                    files.append((mtime, path, size, inode))
+            if self.max_bytes is None:
+                return
+            # Linked keys share a file: count its size once, and free it with its last link
+            links: Dict[tuple, int] = {}
+            total = 0
+            for _, _, size, inode in files:
+                if inode not in links:
+                    total += size
+                links[inode] = links.get(inode, 0) + 1
+            for _, path, size, inode in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path != keep:
+                    os.remove(path)
+                    links[inode] -= 1
+                    if not links[inode]:
+                        total -= size
+
+    def keys(self):
+        with self._lock:
+            self._evict()
+            return [os.path.splitext(os.path.basename(path))[0] for path, _, _, _ in self._files()]
+
+
+class TieredSessionStore(SessionStore):
+    """
+    Memory LRU tier in front of a disk tier.
+    Entries evicted from memory for size are spilled to disk and promoted back
+    on the next read.
+    """
+
+    def __init__(self, memory: MemorySessionStore, disk: DiskSessionStore):
+        self.memory = memory
+        self.disk = disk
+        self.memory.on_evict = self._spill
+
+    def _spill(self, key: str, value: Any) -> None:
+        if key not in self.disk:
+            self.disk.put(key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.memory or key in self.disk
+
+    def get_value(self, key: str) -> Any:
+        try:
+            return self.memory.get_value(key)
+        except KeyError:
+            pass
+        value = self.disk.get_value(key)
+        self.memory.put(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        # Validate the key for the disk tier up front and drop any stale spilled copy
+        validate_key(key)
+        self.disk.delete(key)
+        if self.memory.max_bytes is not None and estimate_size(value) > self.memory.max_bytes:
+            self.disk.put(key, value)
+            self.memory.delete(key)
+        else:
+            self.memory.put(key, value)
+
+    def put_stream(self, key: str, chunks: Iterable[pd.DataFrame]) -> int:
+        # Streamed data is typically too large for the memory tier
+        validate_key(key)
+        self.memory.delete(key)
+        return self.disk.put_stream(key, chunks)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def link(self, src_key: str, dst_key: str) -> None:
+        validate_key(dst_key)
+        if src_key in self.memory:
+            self.disk.delete(dst_key)
+            self.memory.link(src_key, dst_key)
+        else:
+            self.memory.delete(dst_key)
+            self.disk.link(src_key, dst_key)
+
+    def version(self, key: str) -> Optional[Hashable]:
+        version = self.memory.version(key)
+        return version if version is not None else self.disk.version(key)
+
+    def keys(self):
+        return sorted(set(self.memory.keys()) | set(self.disk.keys()))
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store backed by a Redis-compatible client.
+    The client only needs get, set(name, value, ex=None), delete, exists, expire
+    and scan_iter(match=pattern), so a local stand-in with the same methods can
+    be used instead of a real server.
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix: str = 'ppc:session:',
+        ttl_seconds: Optional[float] = None,
+        version_prefix: str = 'ppc:version:'
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        # Version tokens live outside `prefix` so keys() doesn't list them
+        self.version_prefix = version_prefix
+
+    def __contains__(self, key: object) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+    def get_value(self, key: str) -> Any:
+        payload = self.client.get(self.prefix + key)
+        if payload is None:
+            raise KeyError(key)
+        if self.ttl_seconds is not None:
+            # Sliding expiry: refresh on access
+            self.client.expire(self.prefix + key, int(self.ttl_seconds))
+            self.client.expire(self.version_prefix + key, int(self.ttl_seconds))
+        return deserialize(payload)
+
+    def put(self, key: str, value: Any) -> None:
+        ex = int(self.ttl_seconds) if self.ttl_seconds is not None else None
+        self.client.set(self.prefix + key, serialize(value), ex=ex)
+        self.client.set(self.version_prefix + key, uuid.uuid4().hex, ex=ex)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+        self.client.delete(self.version_prefix + key)
+
+    def version(self, key: str) -> Optional[Hashable]:
+        token = self.client.get(self.version_prefix + key)
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        return token
+
+    def keys(self):
+        keys = []
+        for name in self.client.scan_iter(match=self.prefix + '*'):
+            if isinstance(name, bytes):
+                name = name.decode('utf-8')
+            keys.append(name[len(self.prefix):])
+        return keys
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    return float(value)
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the session store from environment settings:
+    - PPC_SESSION_BACKEND: 'disk' (default), 'tiered', 'memory' or 'redis'
+      ('disk' and 'redis' can be shared by multiple uvicorn workers)
+    - PPC_SESSION_DIR: directory for the disk tier (shared by all workers)
+    - PPC_SESSION_TTL_HOURS: idle time before a session expires (default 24)
+    - PPC_SESSION_MEMORY_MB: memory tier budget (default 1024)
+    - PPC_SESSION_DISK_MB: disk tier budget (default 20480)
+    - PPC_REDIS_URL: Redis connection URL for the 'redis' backend
+    """
+    backend = os.environ.get('PPC_SESSION_BACKEND', 'disk').lower()
+    ttl_hours = _env_float('PPC_SESSION_TTL_HOURS', 24)
+    ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+    memory_mb = _env_float('PPC_SESSION_MEMORY_MB', 1024)
+    disk_mb = _env_float('PPC_SESSION_DISK_MB', 20480)
+    directory = os.environ.get('PPC_SESSION_DIR') or os.path.join(tempfile.gettempdir(), 'ppc_sessions')
+
+    def memory_store() -> MemorySessionStore:
+        return MemorySessionStore(
+            max_bytes=int(memory_mb * 1024 * 1024) if memory_mb else None,
+            ttl_seconds=ttl_seconds
+        )
+
+    def disk_store() -> DiskSessionStore:
+        return DiskSessionStore(
+            directory,
+            max_bytes=int(disk_mb * 1024 * 1024) if disk_mb else None,
+            ttl_seconds=ttl_seconds
+        )
+
+    if backend == 'memory':
+        return memory_store()
+    if backend == 'disk':
+        return disk_store()
+    if backend == 'redis':
+        import redis
+        client = redis.Redis.from_url(os.environ.get('PPC_REDIS_URL', 'redis://localhost:6379/0'))
+        return RedisSessionStore(client, ttl_seconds=ttl_seconds)
+    if backend == 'tiered':
+        return TieredSessionStore(memory_store(), disk_store())
+    raise ValueError(f"Unknown session backend: {backend}")
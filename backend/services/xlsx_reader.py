@@ -0,0 +1,315 @@
+"""
+Streaming XLSX reader.
+Reads a single sheet of a workbook straight from the package XML, converting
+only the cells of the requested columns.
+
+Bulk Operations workbooks carry several large sheets (SB/SD campaigns, portfolios,
+search terms) plus dozens of columns we never use. pd.read_excel/openpyxl parse
+every cell of every sheet they touch; here the sheet is located from workbook
+metadata and all other cells are skipped without conversion.
+"""
+
+import re
+import zipfile
+import posixpath
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse, parse
+
+from pandas.io.parsers import TextParser
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_ROW = MAIN_NS + 'row'
+_CELL = MAIN_NS + 'c'
+_VALUE = MAIN_NS + 'v'
+_TEXT = MAIN_NS + 't'
+_INLINE = MAIN_NS + 'is'
+_RUN = MAIN_NS + 'r'
+_SHEET_DATA = MAIN_NS + 'sheetData'
+_DIMENSION = MAIN_NS + 'dimension'
+
+# Row tags in raw sheet XML (counted without parsing when a sheet has no dimension)
+_ROW_TAGS = (b'<row ', b'<row>')
+
+
+def column_index(letters: str) -> int:
+    """Zero-based column index of a column reference ('A' -> 0, 'AB' -> 27)."""
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def _column_names(names: list) -> List[str]:
+    """
+    Header names as pd.read_excel gives them: blank cells become 'Unnamed: N' and
+    duplicates are numbered ('a', 'a.1'), by the same parser read_excel uses.
+    """
+    return list(TextParser([names], header=0).read().columns)
+
+
+class XlsxWorkbook:
+    """Metadata of an XLSX package: sheet names/paths, shared strings and date styles."""
+
+    def __init__(self, source):
+        self.zip = zipfile.ZipFile(BytesIO(source) if isinstance(source, bytes) else source)
+        self.sheets = self._read_sheets()
+        self._shared_strings: Optional[List[str]] = None
+        self._date_styles: Optional[set] = None
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.sheets.keys())
+
+    def close(self) -> None:
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_sheets(self) -> Dict[str, str]:
+        """Map sheet name -> part path, in workbook order."""
+        workbook = parse(self.zip.open('xl/workbook.xml')).getroot()
+        properties = workbook.find(MAIN_NS + 'workbookPr')
+        self.epoch = CALENDAR_WINDOWS_1900
+        if properties is not None and properties.get('date1904') in ('1', 'true'):
+            self.epoch = CALENDAR_MAC_1904
+
+        rels = parse(self.zip.open('xl/_rels/workbook.xml.rels')).getroot()
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(PKG_REL_NS + 'Relationship')}
+
+        sheets = {}
+        for sheet in workbook.iter(MAIN_NS + 'sheet'):
+            target = targets.get(sheet.get(REL_NS + 'id'))
+            if target is None:
+                continue
+            if target.startswith('/'):
+                path = target.lstrip('/')
+            else:
+                path = posixpath.normpath(posixpath.join('xl', target))
+            sheets[sheet.get('name')] = path
+        return sheets
+
+    @property
+    def shared_strings(self) -> List[str]:
+        if self._shared_strings is None:
+            strings = []
+            if 'xl/sharedStrings.xml' in self.zip.namelist():
+                for _, item in iterparse(self.zip.open('xl/sharedStrings.xml')):
+                    if item.tag == MAIN_NS + 'si':
+                        text = item.find(_TEXT)
+                        if text is not None:
+                            strings.append(text.text or '')
+                        else:
+                            # Rich text: concatenate the runs (phonetic hints are not part of the value)
+                            strings.append(''.join(run.findtext(_TEXT) or '' for run in item.iter(_RUN)))
+                        item.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    @property
+    def date_styles(self) -> set:
+        """Indices of cell styles whose number format is a date format."""
+        if self._date_styles is None:
+            styles = set()
+            if 'xl/styles.xml' in self.zip.namelist():
+                root = parse(self.zip.open('xl/styles.xml')).getroot()
+                formats = dict(BUILTIN_FORMATS)
+                for fmt in root.iter(MAIN_NS + 'numFmt'):
+                    formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+                cell_xfs = root.find(MAIN_NS + 'cellXfs')
+                if cell_xfs is not None:
+                    for i, xf in enumerate(cell_xfs.iter(MAIN_NS + 'xf')):
+                        code = formats.get(int(xf.get('numFmtId', 0)))
+                        if code and is_date_format(code):
+                            styles.add(str(i))
+            self._date_styles = styles
+        return self._date_styles
+
+    def _cell_value(self, cell, cell_type: Optional[str]):
+        if cell_type == 'inlineStr':
+            inline = cell.find(_INLINE)
+            return ''.join(t.text or '' for t in inline.iter(_TEXT)) if inline is not None else None
+
+        value = cell.findtext(_VALUE)
+        if not value:
+            return None  # No value, or a formula without a cached result
+        if cell_type is None or cell_type == 'n':
+            if '.' in value or 'E' in value or 'e' in value:
+                number = float(value)
+                # Whole floats come back as ints, like pd.read_excel
+                if number.is_integer():
+                    number = int(number)
+            else:
+                number = int(value)
+            if cell.get('s') in self.date_styles:
+                return from_excel(number, self.epoch)
+            return number
+        if cell_type == 's':
+            return self.shared_strings[int(value)]
+        if cell_type == 'str':
+            return value
+        if cell_type == 'b':
+            return value == '1'
+        if cell_type == 'd':
+            return from_ISO8601(value)
+        # 'e' (error cells such as #N/A) read as missing, like pd.read_excel
+        return None
+
+    def row_count(self, sheet_name: str) -> int:
+        """
+        Number of rows below the header of a sheet, from the used range ('A1:X5000')
+        its metadata declares. Sheets without one have their row tags counted.
+        """
+        with self.zip.open(self.sheets[sheet_name]) as f:
+            for _, element in iterparse(f, events=('start',)):
+                if element.tag == _DIMENSION:
+                    rows = [int(r) for r in re.findall(r'\d+', element.get('ref', ''))]
+                    if len(rows) == 2:
+                        return max(rows[1] - rows[0], 0)
+                    break  # Single cell ref ('A1'): writers that don't track the range
+                if element.tag == _SHEET_DATA:
+                    break
+
+        count = 0
+        tail = b''
+        with self.zip.open(self.sheets[sheet_name]) as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                # Prefix the previous block's last bytes (shorter than a tag) so tags
+                # split across blocks are counted once
+                data = tail + block
+                count += sum(data.count(tag) for tag in _ROW_TAGS)
+                tail = data[-4:]
+        return max(count - 1, 0)
+
+    def read_rows(
+        self,
+        sheet_name: str,
+        usecols: Optional[Callable[[str], bool]] = None,
+        max_rows: Optional[int] = None
+    ) -> Tuple[List[str], List[list]]:
+        """
+        Stream one sheet and return (header, rows) for the columns accepted by `usecols`,
+        laid out as pd.read_excel lays them out: blank header cells (and values past the
+        header) are named 'Unnamed: N' by sheet column, duplicate names are numbered,
+        empty cells are '' (NaN once parsed), empty rows between data rows are kept,
+        and trailing empty rows are dropped. Unlike read_excel, empty rows above the
+        header are skipped (the first non-empty row is the header).
+        With `max_rows`, reading stops after that many rows.
+        """
+        header = None
+        keep: Dict[int, int] = {}  # Sheet column -> index in header
+        checked = set()  # Sheet columns past the header already offered to usecols
+        rows = []
+        blank_rows = 0  # Empty rows seen since the last non-empty one
+        row_number = 0
+        positions: Dict[str, int] = {}  # Column letters -> index
+
+        def cell_position(ref: str) -> int:
+            letters = ref.rstrip('0123456789')
+            position = positions.get(letters)
+            if position is None:
+                position = positions[letters] = column_index(letters)
+            return position
+
+        def wanted(name: str) -> bool:
+            return usecols is None or usecols(name)
+
+        container = None
+        for event, element in iterparse(self.zip.open(self.sheets[sheet_name]), events=('start', 'end')):
+            if event == 'start':
+                if element.tag == _SHEET_DATA:
+                    container = element
+                continue
+            if element.tag != _ROW:
+                continue
+
+            number = element.get('r')
+            number = int(number) if number else row_number + 1
+            # Rows missing from the sheet XML are empty rows
+            skipped = number - row_number - 1
+            row_number = number
+
+            if header is None:
+                # Header row: convert every cell to find the wanted columns
+                cells = {}
+                position = 0
+                for cell in element.iter(_CELL):
+                    ref = cell.get('r')
+                    if ref:
+                        position = cell_position(ref)
+                    value = self._cell_value(cell, cell.get('t'))
+                    if value is not None and value != '':
+                        cells[position] = value
+                    position += 1
+                # Parsed rows are dropped as we go, so memory doesn't grow with the sheet
+                container.clear()
+                if not cells:
+                    continue
+                header = []
+                for position, name in enumerate(_column_names([cells.get(i, '') for i in range(max(cells) + 1)])):
+                    if wanted(str(name)):
+                        keep[position] = len(header)
+                        header.append(name)
+                checked.update(range(max(cells) + 1))
+                continue
+
+            blank_rows += skipped
+            row = [''] * len(header)
+            empty = True
+            position = 0
+            for cell in element.iter(_CELL):
+                ref = cell.get('r')
+                if ref:
+                    position = cell_position(ref)
+                target = keep.get(position)
+                if target is None and position not in checked:
+                    # A value past the header adds an unnamed column, as in read_excel
+                    if self._cell_value(cell, cell.get('t')) not in (None, ''):
+                        checked.add(position)
+                        if wanted(f'Unnamed: {position}'):
+                            target = keep[position] = len(header)
+                            header.append(f'Unnamed: {position}')
+                            row.append('')
+                position += 1
+                if target is None:
+                    # Cells of other columns only decide whether the row is empty
+                    if empty and (cell.findtext(_VALUE) or cell.find(_INLINE) is not None):
+                        empty = False
+                    continue
+                value = self._cell_value(cell, cell.get('t'))
+                if value is not None and value != '':
+                    row[target] = value
+                    empty = False
+            container.clear()
+            if empty:
+                blank_rows += 1
+                continue
+            rows.extend([''] * len(header) for _ in range(blank_rows))
+            blank_rows = 0
+            rows.append(row)
+            if max_rows is not None and len(rows) >= max_rows:
+                del rows[max_rows:]
+                break
+
+        if header is None:
+            return [], []
+        # Rows read before an unnamed column was added are shorter
+        for row in rows:
+            row.extend([''] * (len(header) - len(row)))
+        order = sorted(keep, key=keep.get)
+        if order != sorted(order):
+            # Unnamed columns were found out of sheet order: lay them out by sheet column
+            columns = [keep[position] for position in sorted(order)]
+            header = [header[i] for i in columns]
+            rows = [[row[i] for i in columns] for row in rows]
+        return header, rows
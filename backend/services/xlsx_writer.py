@@ -0,0 +1,186 @@
+"""
+Streaming XLSX writer.
+Writes a single-sheet workbook straight into the package ZIP, one row at a time.
+
+Bulk files used to go list of dicts -> DataFrame -> openpyxl workbook, which
+keeps a Python object per cell until the workbook is saved. Here each row is
+encoded to sheet XML as it is produced and compressed right away, so memory is
+bounded by the compressed output rather than by rows x columns. Strings are
+written inline (no shared-strings table to accumulate).
+"""
+
+import math
+import numbers
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Any, BinaryIO, Iterable, Iterator, List, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+from services.bulk_rows import BulkRow
+
+
+# Rows encoded per write to the compressed sheet stream
+FLUSH_ROWS = 512
+
+# Characters XML 1.0 does not allow (Excel refuses files containing them)
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def column_letter(index: int) -> str:
+    """Column reference of a zero-based column index (0 -> 'A', 27 -> 'AB')."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _workbook(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name={quoteattr(sheet_name)} sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _cell(ref: str, value: Any) -> str:
+    """Sheet XML of one cell ('' for empty cells, which are left out)."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        if not value:
+            return ''
+        text = value
+    elif isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    elif isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    elif isinstance(value, numbers.Real):
+        # NaN (pandas' missing value) is empty, like DataFrame.to_excel
+        value = float(value)
+        return f'<c r="{ref}"><v>{value!r}</v></c>' if math.isfinite(value) else ''
+    elif pd.isna(value):
+        return ''
+    elif isinstance(value, (date, datetime)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    text = _ILLEGAL_XML.sub('', text)
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _row(number: int, refs: List[str], values: Iterable[Any]) -> str:
+    cells = ''.join(_cell(f'{letter}{number}', value) for letter, value in zip(refs, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def _sparse_row(number: int, refs: List[str], cells: Iterable[Tuple[int, Any]]) -> str:
+    cells = ''.join(_cell(f'{refs[position]}{number}', value) for position, value in cells)
+    return f'<row r="{number}">{cells}</row>'
+
+
+def write_sheet(
+    output: BinaryIO,
+    columns: List[str],
+    rows: Iterable[Union[dict, BulkRow]],
+    sheet_name: str = 'Sheet1'
+) -> int:
+    """
+    Write a header row plus one row per dict (values looked up by column name)
+    or BulkRow as a single-sheet XLSX into `output`. Returns the number of data
+    rows. BulkRows whose schema has exactly these columns write only their set cells.
+    """
+    letters = [column_letter(i) for i in range(len(columns))]
+    count = 0
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as package:
+        package.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        package.writestr('_rels/.rels', _ROOT_RELS)
+        package.writestr('xl/workbook.xml', _workbook(sheet_name))
+        package.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        package.writestr('xl/styles.xml', _STYLES)
+
+        with package.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            buffer = [_SHEET_START, _row(1, letters, columns)]
+            for row in rows:
+                count += 1
+                if isinstance(row, BulkRow) and row.schema.columns is columns:
+                    buffer.append(_sparse_row(count + 1, letters, row.set_cells()))
+                else:
+                    buffer.append(_row(count + 1, letters, (row.get(col) for col in columns)))
+                if len(buffer) >= FLUSH_ROWS:
+                    sheet.write(''.join(buffer).encode('utf-8'))
+                    buffer.clear()
+            buffer.append(_SHEET_END)
+            sheet.write(''.join(buffer).encode('utf-8'))
+    return count
+
+
+def iter_chunks(source: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Read a file-like object in fixed-size chunks (for StreamingResponse)."""
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
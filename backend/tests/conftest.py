@@ -0,0 +1,83 @@
+"""
+Shared test setup.
+Points the session store and ingestion plan registry at a fresh temp directory
+(before any router module is imported), and provides report fixtures.
+
+Usage (from backend/):
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_TEST_DIR = tempfile.mkdtemp(prefix='ppc_tests_')
+os.environ['PPC_SESSION_BACKEND'] = 'disk'
+os.environ['PPC_SESSION_DIR'] = os.path.join(_TEST_DIR, 'sessions')
+os.environ['PPC_PLAN_DIR'] = os.path.join(_TEST_DIR, 'plans')
+os.environ.setdefault('PPC_COMPUTE_EXECUTOR', 'thread')
+
+SAMPLE_REPORT = Path(__file__).resolve().parents[2] / 'sample_amazon_ppc_report.xlsx'
+
+
+@pytest.fixture(scope='session')
+def sample_report() -> pd.DataFrame:
+    """The 4-row sample Search Term Report, as read from its XLSX file."""
+    return pd.read_excel(SAMPLE_REPORT)
+
+
+@pytest.fixture(scope='session')
+def make_report(sample_report):
+    """
+    Factory of synthetic raw Search Term Reports in the sample's layout:
+    make_report(dates, rows_per_day=40, seed=0).
+    """
+    def make(dates, rows_per_day: int = 40, seed: int = 0) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        days = []
+        for date in dates:
+            rows = sample_report.sample(rows_per_day, replace=True, random_state=int(rng.integers(1_000_000)))
+            rows = rows.assign(
+                **{
+                    'Date': pd.Timestamp(date),
+                    'Campaign Name': [f'Campaign {i}' for i in rng.integers(0, 5, rows_per_day)],
+                    'Customer Search Term': [f'term {i}' for i in rng.integers(0, 60, rows_per_day)],
+                    'Impressions': rng.integers(0, 500, rows_per_day),
+                    'Clicks': rng.integers(0, 20, rows_per_day),
+                    'Spend': rng.uniform(0, 10, rows_per_day).round(2),
+                    '7 Day Total Sales ($)': np.where(rng.random(rows_per_day) < 0.5, 0.0, rng.uniform(0, 50, rows_per_day).round(2)),
+                    '7 Day Total Orders (#)': rng.integers(0, 3, rows_per_day),
+                }
+            )
+            days.append(rows)
+        return pd.concat(days, ignore_index=True)
+
+    return make
+
+
+@pytest.fixture
+def client():
+    """API test client (with lifespan, so background jobs run)."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def upload(client):
+    """upload(df_or_bytes, filename='report.csv') -> session_id of a Search Term Report upload."""
+    def post(data, filename: str = 'report.csv') -> str:
+        if isinstance(data, pd.DataFrame):
+            data = data.to_csv(index=False).encode()
+        response = client.post('/api/upload/search-term-report', files={'file': (filename, data)})
+        assert response.status_code == 200, response.text
+        return response.json()['session_id']
+
+    return post
@@ -0,0 +1,173 @@
+"""Bulk file writers: XLSX and CSV/TSV output read back with pandas, and parity with DataFrame.to_excel/to_csv."""
+
+import io
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import bulk_optimizer, campaign_generator, manual_campaign_generator, negative_generator
+from services.bulk_rows import BulkSchema
+from services.bulk_writer import write_bulk_file, write_delimited
+from services.xlsx_writer import write_sheet
+
+
+COLUMNS = ['Text', 'Integer', 'Float', 'Flag', 'Missing', 'Day']
+SCHEMA = BulkSchema(COLUMNS)
+
+ROWS = [
+    {'Text': '<b>Tom & "Jerry"</b>', 'Integer': 1, 'Float': 2.5, 'Flag': True, 'Missing': None,
+     'Day': date(2025, 9, 1)},
+    {'Text': "it's\x07 a\x0b bell\ttab", 'Integer': np.int64(7), 'Float': np.nan, 'Flag': np.bool_(False),
+     'Missing': float('nan'), 'Day': datetime(2025, 9, 2, 13, 30)},
+    {'Text': None, 'Integer': None, 'Float': None, 'Flag': None, 'Missing': pd.NA, 'Day': pd.NaT},
+    {'Text': 'ünïcödé ✓', 'Integer': -3, 'Float': np.float32(0.5), 'Flag': False, 'Missing': '',
+     'Day': pd.Timestamp('2025-09-03')},
+]
+
+
+def sparse_rows():
+    # The same rows as BulkRows with only the non-missing cells set
+    return [SCHEMA.row({col: value for col, value in row.items() if value is not None}) for row in ROWS]
+
+
+def xlsx_frame(rows, columns=COLUMNS) -> pd.DataFrame:
+    output = io.BytesIO()
+    assert write_sheet(output, columns, rows, 'Data') == len(rows)
+    output.seek(0)
+    return pd.read_excel(output, sheet_name='Data')
+
+
+def delimited_frame(rows, delimiter: str, columns=COLUMNS) -> pd.DataFrame:
+    output = io.BytesIO()
+    assert write_delimited(output, columns, rows, delimiter) == len(rows)
+    output.seek(0)
+    return pd.read_csv(output, sep=delimiter)
+
+
+def test_xlsx_round_trip():
+    df = xlsx_frame(ROWS)
+    assert list(df.columns) == COLUMNS
+    # XML-special characters survive; characters XML can't hold are dropped
+    filled = df.drop(index=2)
+    assert filled['Text'].tolist() == ['<b>Tom & "Jerry"</b>', "it's a bell\ttab", 'ünïcödé ✓']
+    assert filled['Integer'].tolist() == [1, 7, -3]
+    assert filled['Float'].fillna(0).tolist() == [2.5, 0, 0.5]
+    assert filled['Flag'].tolist() == [True, False, False]
+    # None, NaN, NA, NaT and '' are all empty cells
+    assert df['Missing'].isna().all() and df.iloc[2].isna().all()
+    # Dates are written as ISO text
+    assert filled['Day'].tolist() == ['2025-09-01', '2025-09-02T13:30:00', '2025-09-03T00:00:00']
+
+
+@pytest.mark.parametrize('delimiter', [',', '\t'])
+def test_delimited_round_trip(delimiter):
+    df = delimited_frame(ROWS, delimiter)
+    assert list(df.columns) == COLUMNS
+    # The delimiter, quotes and control characters are kept as they are (quoted where needed)
+    filled = df.drop(index=2)
+    assert filled['Text'].tolist() == ['<b>Tom & "Jerry"</b>', "it's\x07 a\x0b bell\ttab", 'ünïcödé ✓']
+    assert filled['Integer'].tolist() == [1, 7, -3]
+    assert filled['Float'].fillna(0).tolist() == [2.5, 0, 0.5]
+    assert filled['Flag'].tolist() == [True, False, False]
+    assert df['Missing'].isna().all() and df.iloc[2].isna().all()
+    assert filled['Day'].tolist() == ['2025-09-01', '2025-09-02 13:30:00', '2025-09-03 00:00:00']
+
+
+def test_sparse_rows_match_dict_rows():
+    pd.testing.assert_frame_equal(xlsx_frame(sparse_rows()), xlsx_frame(ROWS))
+    for delimiter in (',', '\t'):
+        pd.testing.assert_frame_equal(delimited_frame(sparse_rows(), delimiter), delimited_frame(ROWS, delimiter))
+    # BulkRows of another schema are looked up by column name
+    other = ['Day', 'Text', 'Flag']
+    pd.testing.assert_frame_equal(xlsx_frame(sparse_rows(), other), xlsx_frame(ROWS, other))
+    pd.testing.assert_frame_equal(delimited_frame(sparse_rows(), ',', other), delimited_frame(ROWS, ',', other))
+
+
+def test_rows_past_a_flush_are_written(monkeypatch):
+    from services import xlsx_writer
+
+    monkeypatch.setattr(xlsx_writer, 'FLUSH_ROWS', 3)
+    rows = [{'Text': f'term {i}', 'Integer': i} for i in range(10)]
+    df = xlsx_frame(rows)
+    assert df['Text'].tolist() == [row['Text'] for row in rows]
+    assert df['Integer'].tolist() == list(range(10))
+
+
+AD_GROUPS = [
+    {'ad_group_name': 'Ad Group 1', 'default_bid': 0.75, 'skus': ['SKU-1', 'SKU-2'],
+     'close_match': True, 'close_match_bid': 0.8, 'loose_match': True, 'loose_match_bid': None,
+     'substitutes': False, 'complements': True, 'complements_bid': 0.5},
+]
+
+MANUAL_AD_GROUPS = [
+    {'ad_group_name': 'Keywords & "Phrases"', 'default_bid': 1.2, 'skus': ['SKU-1'],
+     'keywords': [
+         {'keyword': 'dog bed', 'match_type': 'exact', 'bid': 1.5},
+         {'keyword': 'pet <bed>', 'match_type': 'phrase'},
+     ],
+     'product_targets': [{'asin': 'b0abc12345', 'bid': 0.9}]},
+]
+
+NEGATIVE_ITEMS = [
+    {'customer_search_term': 'cheap/free', 'campaign_name': "'Campaign 1'", 'ad_group_name': 'Ad Group 1',
+     'campaign_id': '123', 'ad_group_id': '456'},
+    {'customer_search_term': 'b0xyz98765', 'campaign_name': 'Campaign 2', 'ad_group_name': 'Ad Group 2',
+     'is_asin': True, 'portfolio_id': '789'},
+]
+
+BID_ITEMS = [
+    {'targeting': 'dog bed', 'campaign_name': 'Campaign 1', 'campaign_id': '123', 'ad_group_name': 'Ad Group 1',
+     'ad_group_id': '456', 'match_type': 'exact', 'suggested_bid': 1.25},
+    {'targeting': 'asin="B0XYZ98765"', 'campaign_name': 'Campaign 2', 'suggested_bid': 0.4},
+]
+
+BUDGET_ITEMS = [
+    {'campaign_name': 'Campaign 1', 'campaign_id': '123', 'suggested_budget': 25.0},
+    {'campaign_name': 'Campaign 2', 'suggested_budget': 12.5},
+]
+
+GENERATORS = {
+    'auto_campaign': (campaign_generator, lambda format: campaign_generator.generate_auto_campaign_bulk_file(
+        'Auto <Campaign>', 30.0, 'dynamic bids - down only', date(2025, 9, 1), AD_GROUPS,
+        portfolio='111', placement_bid_adjustment={'top_of_search': 50, 'product_pages': 0}, format=format)),
+    'manual_campaign': (
+        manual_campaign_generator, lambda format: manual_campaign_generator.generate_manual_campaign_bulk_file(
+            'Manual Campaign', 20.0, 'fixed bids', date(2025, 9, 1), MANUAL_AD_GROUPS, format=format)
+    ),
+    'negatives': (negative_generator, lambda format: negative_generator.generate_negatives_bulk_file(
+        NEGATIVE_ITEMS, format=format)),
+    'bid_changes': (bulk_optimizer, lambda format: bulk_optimizer.generate_bid_changes_file(BID_ITEMS, format)),
+    'budget_changes': (
+        bulk_optimizer, lambda format: bulk_optimizer.generate_budget_changes_file(BUDGET_ITEMS, format)
+    ),
+}
+
+
+@pytest.mark.parametrize('name', GENERATORS)
+def test_generators_match_dataframe_output(name, monkeypatch):
+    module, generate = GENERATORS[name]
+    written = []
+
+    def capture(schema, rows, sheet_name, format='xlsx'):
+        rows = list(rows)
+        written.append((schema, rows, sheet_name))
+        return write_bulk_file(schema, rows, sheet_name, format)
+
+    monkeypatch.setattr(module, 'write_bulk_file', capture)
+    files = {format: generate(format) for format in ('xlsx', 'csv', 'tsv')}
+    schema, rows, sheet_name = written[0]
+    assert rows
+
+    # What the generators wrote before streaming: a DataFrame of the rows through pandas
+    baseline = pd.DataFrame([row.to_dict() for row in rows], columns=schema.columns)
+    excel = io.BytesIO()
+    baseline.to_excel(excel, sheet_name=sheet_name, index=False)
+    excel.seek(0)
+    pd.testing.assert_frame_equal(
+        pd.read_excel(files['xlsx'], sheet_name=sheet_name), pd.read_excel(excel, sheet_name=sheet_name)
+    )
+    for format, delimiter in (('csv', ','), ('tsv', '\t')):
+        expected = pd.read_csv(io.StringIO(baseline.to_csv(index=False, sep=delimiter)), sep=delimiter)
+        pd.testing.assert_frame_equal(pd.read_csv(files[format], sep=delimiter), expected)
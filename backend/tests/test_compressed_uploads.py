@@ -0,0 +1,78 @@
+"""Compressed Search Term Report uploads (.gz and .zip)."""
+
+import gzip
+import io
+import zipfile
+
+import pandas as pd
+
+from routers.upload import get_session
+
+
+DATES = pd.date_range('2025-09-01', '2025-09-06', freq='D')
+
+
+def zip_bytes(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode()
+
+
+def post(client, data: bytes, filename: str):
+    return client.post('/api/upload/search-term-report', files={'file': (filename, data)})
+
+
+def test_gzip_upload_matches_plain_upload(client, upload, make_report):
+    report = make_report(DATES, rows_per_day=30, seed=1)
+    plain = upload(report)
+    response = post(client, gzip.compress(csv_bytes(report)), 'report.csv.gz')
+    assert response.status_code == 200, response.text
+    assert response.json()['row_count'] == len(report)
+    pd.testing.assert_frame_equal(get_session(response.json()['session_id']), get_session(plain))
+
+
+def test_zip_members_are_combined(client, upload, make_report):
+    first = make_report(DATES[:3], rows_per_day=30, seed=2)
+    second = make_report(DATES[3:], rows_per_day=30, seed=3)
+    archive = zip_bytes({
+        'reports/week1.csv': csv_bytes(first),
+        'reports/week2.csv': csv_bytes(second),
+        'reports/notes.txt': b'not a report',
+        '__MACOSX/reports/._week1.csv': b'resource fork',
+    })
+    response = post(client, archive, 'reports.zip')
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['row_count'] == len(first) + len(second)
+    assert body['date_range'] == {'start': '2025-09-01', 'end': '2025-09-06'}
+
+    combined = upload(pd.concat([first, second], ignore_index=True))
+    stored = get_session(body['session_id'])
+    pd.testing.assert_frame_equal(stored, get_session(combined), check_categorical=False)
+
+
+def test_zip_members_with_different_columns(client, make_report):
+    first = make_report(DATES[:3], rows_per_day=30, seed=4)
+    second = make_report(DATES[3:], rows_per_day=30, seed=5).drop(columns=['Portfolio name', '7 Day Total Units (#)'])
+    second = second[list(reversed(second.columns))]
+    archive = zip_bytes({'week1.csv': csv_bytes(first), 'week2.csv': csv_bytes(second)})
+
+    response = post(client, archive, 'reports.zip')
+    assert response.status_code == 200, response.text
+    stored = get_session(response.json()['session_id'])
+    assert len(stored) == len(first) + len(second)
+    assert isinstance(stored['Portfolio'].dtype, pd.CategoricalDtype)
+    # The second report's rows have no portfolio and no units
+    later = stored['Date'] >= DATES[3]
+    assert stored.loc[later, 'Portfolio'].isna().all()
+    assert stored.loc[~later, 'Portfolio'].notna().all()
+    assert (stored.loc[later, 'Units'] == 0).all()
+
+    kpis = client.get(f"/api/analysis/kpis/{response.json()['session_id']}").json()
+    assert kpis['clicks'] == int(first['Clicks'].sum() + second['Clicks'].sum())
@@ -0,0 +1,148 @@
+"""Background jobs: API round trip and job record updates."""
+
+import asyncio
+import io
+import threading
+import time
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from services.jobs import CANCELLED, DONE, JobCancelled, JobContext, JobManager, job_key
+from services.session_store import MemorySessionStore
+
+
+ANALYSIS_CONFIG = {'min_spend': 0, 'target_acos': 1, 'include_poor_roas': True}
+
+
+def wait_for(client, job_id: str, timeout: float = 30) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f'/api/jobs/{job_id}').json()
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_job_results_match_synchronous_routes(client, make_report):
+    report = make_report(pd.date_range('2025-09-01', periods=5), rows_per_day=40)
+    # ACoS where there are sales, blank otherwise (as Amazon reports it)
+    sales = report['7 Day Total Sales ($)']
+    report['Total Advertising Cost of Sales (ACoS) '] = (report['Spend'] / sales * 100).where(sales > 0)
+    response = client.post(
+        '/api/jobs/search-term-report',
+        files={'file': ('report.csv', report.to_csv(index=False).encode())},
+    )
+    assert response.status_code == 202, response.text
+    job = wait_for(client, response.json()['job_id'])
+    assert job['status'] == DONE, job
+    upload = client.get(f"/api/jobs/{job['job_id']}/result").json()
+    assert upload['row_count'] == len(report)
+    session_id = upload['session_id']
+
+    response = client.post(f'/api/jobs/search-terms/{session_id}', json=ANALYSIS_CONFIG)
+    job = wait_for(client, response.json()['job_id'])
+    assert job['status'] == DONE, job
+    result = client.get(f"/api/jobs/{job['job_id']}/result")
+    assert result.status_code == 200, result.text
+
+    expected = client.post(f'/api/analysis/search-terms/{session_id}', json=ANALYSIS_CONFIG).json()
+    assert result.json() == expected
+    # Flagged zero-sales terms have no ACoS (NaN in the frame, null in JSON)
+    assert any(term['acos'] is None for term in expected['results'])
+    assert any(term['acos'] is not None for term in expected['results'])
+
+
+def test_missing_session_and_job_are_not_found(client):
+    assert client.post('/api/jobs/search-terms/missing', json=ANALYSIS_CONFIG).status_code == 404
+    assert client.get('/api/jobs/missing/result').status_code == 404
+
+
+class RecordingStore(MemorySessionStore):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def __setitem__(self, key, value):
+        self.writes.append(key)
+        super().__setitem__(key, value)
+
+
+def test_progress_never_writes_the_job_record():
+    manager = JobManager(RecordingStore())
+    manager.store[job_key('j1')] = {'job_id': 'j1', 'status': 'running', 'started_at': 1.0, 'progress': {}}
+    manager.store.writes.clear()
+    ctx = JobContext(manager, 'j1')
+    ctx.progress(rows_processed=10)
+    ctx.progress(bytes_read=100)
+    # So a report that started before a cancellation can't write back the old status
+    assert job_key('j1') not in manager.store.writes
+    assert manager.get('j1')['progress'] == {'rows_processed': 10, 'bytes_read': 100}
+
+
+def test_finished_status_is_never_overwritten():
+    manager = JobManager(MemorySessionStore())
+    manager.store[job_key('j1')] = {'job_id': 'j1', 'status': 'running', 'started_at': 1.0, 'progress': {}}
+    manager.cancel('j1')
+    # e.g. the job's own completion racing a cancellation from another worker
+    manager._update('j1', status=DONE, finished_at=2.0)
+    assert manager.get('j1')['status'] == CANCELLED
+
+
+def test_cancelling_a_job_that_reports_progress():
+    manager = JobManager(MemorySessionStore())
+    stop = threading.Event()
+
+    async def work(ctx: JobContext):
+        def chunks() -> None:
+            chunk = 0
+            while not stop.is_set():
+                chunk += 1
+                ctx.progress(chunks=chunk)
+
+        await asyncio.get_running_loop().run_in_executor(None, chunks)
+        return 'result'
+
+    async def run() -> str:
+        job_id = manager.submit('test', work)['job_id']
+        while not manager.get(job_id)['progress']:
+            await asyncio.sleep(0.001)
+        manager.cancel(job_id)
+        await asyncio.sleep(0.01)  # More progress reports after the cancellation
+        stop.set()
+        while job_id in manager._tasks:
+            await asyncio.sleep(0.001)
+        return job_id
+
+    job_id = asyncio.run(run())
+    job = manager.get(job_id)
+    assert job['status'] == CANCELLED and job['progress']['chunks'] > 0
+    assert f'{job_id}_job_result' not in manager.store
+
+
+def test_cancelled_upload_removes_its_session(client, make_report, monkeypatch):
+    from routers import upload as upload_router
+
+    monkeypatch.setattr(
+        upload_router, 'iter_search_term_chunks', partial(upload_router.iter_search_term_chunks, chunksize=50)
+    )
+    deleted = []
+    delete = upload_router.sessions.delete
+    monkeypatch.setattr(upload_router.sessions, 'delete', lambda key: (deleted.append(key), delete(key)))
+    reports = []
+
+    def on_progress(progress: dict) -> None:
+        # Like JobContext.progress once the job is cancelled: every later report raises too
+        reports.append(progress)
+        if progress['rows_processed']:
+            raise JobCancelled()
+
+    data = make_report(pd.date_range('2025-09-01', periods=5), rows_per_day=40).to_csv(index=False).encode()
+    with pytest.raises(JobCancelled):
+        upload_router._ingest_stream(io.BytesIO(data), 'report.csv', len(data), 'cancelled1', 'u1', on_progress)
+    assert deleted == ['cancelled1']
+    assert 'cancelled1' not in upload_router.sessions
+    assert reports[-1]['status'] == 'cancelled'
+    assert upload_router.sessions['u1_progress']['status'] == 'cancelled'
@@ -0,0 +1,126 @@
+"""Metrics cube parity: cube-backed KPI, campaign and monthly results match the raw rows."""
+
+import pandas as pd
+import pytest
+
+from services.analyzer import calculate_campaign_metrics, calculate_kpis, calculate_monthly_data
+from services.metrics_cube import CUBE_DIMENSIONS, build_metrics_cube, cube_row_count, update_metrics_cube
+from services.parser import get_date_range, get_unique_ad_groups, get_unique_campaigns, get_unique_portfolios
+from services.parser import process_search_term_report
+from services.report_append import merge_report
+from routers.analysis import filter_rows
+
+
+DATES = pd.date_range('2025-08-20', '2025-09-15', freq='D')
+
+FILTERS = [
+    {},
+    {'campaign': 'Campaign 2'},
+    {'campaign': 'Campaign 3', 'ad_group': 'Ad Group 1'},
+    {'start_date': '2025-09-01'},
+    {'end_date': '2025-08-31'},
+    {'start_date': '2025-08-25', 'end_date': '2025-09-05'},
+    {'campaign': 'Campaign 1', 'start_date': '2025-09-03', 'end_date': '2025-09-03'},
+    {'campaign': 'No Such Campaign'},
+]
+
+
+@pytest.fixture(scope='module')
+def report(make_report) -> pd.DataFrame:
+    raw = make_report(DATES, rows_per_day=40, seed=1)
+    raw['Ad Group Name'] = [f'Ad Group {i % 3}' for i in range(len(raw))]
+    raw['Portfolio name'] = [f'Portfolio {i % 4}' for i in range(len(raw))]
+    return process_search_term_report(raw)
+
+
+def _sorted_cells(cube: pd.DataFrame) -> pd.DataFrame:
+    dimensions = [col for col in CUBE_DIMENSIONS if col in cube.columns]
+    cells = cube.astype({col: object for col in dimensions if col != 'Date'})
+    return cells.sort_values(dimensions).reset_index(drop=True)
+
+
+def assert_parity(rows: pd.DataFrame, cube: pd.DataFrame) -> None:
+    for filters in FILTERS:
+        selected_rows = filter_rows(rows, **filters)
+        cells = filter_rows(cube, **filters)
+        assert calculate_kpis(cells) == calculate_kpis(selected_rows), filters
+        assert calculate_campaign_metrics(cells) == calculate_campaign_metrics(selected_rows), filters
+        assert calculate_monthly_data(cells) == calculate_monthly_data(selected_rows), filters
+
+
+def test_cube_matches_raw_rows(report):
+    cube = build_metrics_cube(report)
+    assert cube_row_count(cube) == len(report)
+    assert len(cube) < len(report)
+    assert_parity(report, cube)
+
+
+def test_cube_filter_options_match_raw_rows(report):
+    cube = build_metrics_cube(report)
+    assert get_unique_campaigns(cube) == get_unique_campaigns(report)
+    assert get_unique_ad_groups(cube) == get_unique_ad_groups(report)
+    assert get_unique_portfolios(cube) == get_unique_portfolios(report)
+    assert get_date_range(cube) == get_date_range(report)
+
+
+def test_missing_dimension_values_keep_their_own_cells(report):
+    rows = report.copy()
+    rows['Portfolio'] = rows['Portfolio'].astype(object)
+    rows.loc[rows.index[::5], 'Portfolio'] = None
+    cube = build_metrics_cube(rows)
+    assert cube_row_count(cube) == len(rows)
+    assert_parity(rows, cube)
+
+
+def test_updated_cube_matches_rebuilt_cube(report, make_report):
+    df = report[report['Date'] < '2025-09-13'].reset_index(drop=True)
+    cube = build_metrics_cube(df)
+    # A restatement of the last two days plus one new day
+    new_df = process_search_term_report(make_report(DATES[-4:], rows_per_day=30, seed=2))
+
+    for window_days in (None, 10):
+        result = merge_report(df, cube, new_df, window_days)
+        merged = pd.concat([result.kept, result.added], ignore_index=True)
+        assert cube_row_count(result.cube) == len(merged)
+        pd.testing.assert_frame_equal(
+            _sorted_cells(result.cube), _sorted_cells(build_metrics_cube(merged)), check_dtype=False
+        )
+        assert_parity(merged, result.cube)
+
+
+def test_update_drops_cells_before_keep_from(report):
+    cube = build_metrics_cube(report)
+    last_day = report[report['Date'] == DATES[-1]]
+    updated = update_metrics_cube(cube, last_day, [DATES[-1]], keep_from=DATES[-7])
+    kept = report[report['Date'] >= DATES[-7]]
+    assert cube_row_count(updated) == len(kept)
+    assert_parity(kept, updated)
+
+
+def test_api_results_match_raw_rows_after_append(client, upload, make_report):
+    from routers.upload import get_session
+
+    session_id = upload(make_report(DATES[:-3], rows_per_day=40, seed=3))
+    appended = make_report(DATES[-5:], rows_per_day=40, seed=4).to_csv(index=False).encode()
+
+    for step in ('upload', 'append'):
+        if step == 'append':
+            response = client.post(
+                f'/api/upload/search-term-report/{session_id}/append',
+                files={'file': ('latest.csv', appended)},
+            )
+            assert response.status_code == 200, response.text
+        rows = get_session(session_id)
+        for filters in FILTERS:
+            selected = filter_rows(rows, **filters)
+            kpis = client.get(f'/api/analysis/kpis/{session_id}', params=filters).json()
+            assert kpis == calculate_kpis(selected), (step, filters)
+
+            dates = {key: value for key, value in filters.items() if key.endswith('_date')}
+            campaigns = client.get(f'/api/analysis/campaigns/{session_id}', params=dates).json()
+            assert campaigns == calculate_campaign_metrics(filter_rows(rows, **dates)), (step, filters)
+
+        for campaign in (None, 'Campaign 4'):
+            params = {'campaign': campaign} if campaign else {}
+            monthly = client.get(f'/api/analysis/monthly/{session_id}', params=params).json()
+            assert monthly == calculate_monthly_data(filter_rows(rows, campaign=campaign)), (step, campaign)
@@ -0,0 +1,87 @@
+"""Parity of the vectorized metric cleaning kernels with the scalar clean_* helpers."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.parser import (
+    clean_currency,
+    clean_currency_series,
+    clean_integer,
+    clean_integer_series,
+    clean_percentage,
+    clean_percentage_series,
+    process_search_term_report,
+)
+
+
+CELLS = [
+    None, np.nan, '', '   ', 'n/a', '--', True, False,
+    0, 7, -3, 12.0, 2.75, -0.5,
+    '0', '42', ' 1,234 ', '1,234.56', '-17.9', '1e3',
+    '$0.00', '$1,234.56', ' $12 ', '-$3.20',
+    '12.5%', '0%', ' 1,000% ', '-4.5 %',
+]
+
+KERNELS = [
+    (clean_integer, clean_integer_series),
+    (clean_currency, clean_currency_series),
+    (clean_percentage, clean_percentage_series),
+]
+
+
+def _expected(scalar, cells) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in map(scalar, cells)], dtype='float64')
+
+
+@pytest.mark.parametrize('scalar, kernel', KERNELS, ids=lambda f: f.__name__)
+def test_kernel_matches_scalar_helper_on_mixed_cells(scalar, kernel):
+    cells = pd.Series(CELLS, dtype=object)
+    result = kernel(cells)
+    np.testing.assert_array_equal(result.to_numpy(dtype='float64'), _expected(scalar, CELLS))
+
+
+@pytest.mark.parametrize('scalar, kernel', KERNELS, ids=lambda f: f.__name__)
+@pytest.mark.parametrize('dtype', ['int64', 'float64', 'str', 'object'])
+def test_kernel_matches_scalar_helper_per_column_dtype(scalar, kernel, dtype):
+    values = [3, 0, 125000, 9]
+    cells = pd.Series([f'{v:,}' for v in values] if dtype == 'str' else values).astype(dtype)
+    result = kernel(cells)
+    np.testing.assert_array_equal(result.to_numpy(dtype='float64'), _expected(scalar, list(cells)))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_randomized_frames_match_scalar_cleaning(seed):
+    rng = np.random.default_rng(seed)
+    pool = np.array(CELLS, dtype=object)
+
+    def column():
+        return pool[rng.integers(0, len(pool), 300)]
+
+    raw = pd.DataFrame({
+        'Impressions': column(), 'Clicks': column(), 'Spend': column(),
+        '7 Day Total Sales ($)': column(), '7 Day Total Orders (#)': column(),
+        'Total Advertising Cost of Sales (ACoS) ': column(), 'Click-Thru Rate (CTR)': column(),
+    })
+    df = process_search_term_report(raw.copy())
+
+    checks = {
+        'Impressions': ('Impressions', clean_integer), 'Clicks': ('Clicks', clean_integer),
+        'Spend': ('Spend', clean_currency), 'Sales': ('7 Day Total Sales ($)', clean_currency),
+        'Orders': ('7 Day Total Orders (#)', clean_integer),
+        'ACOS': ('Total Advertising Cost of Sales (ACoS) ', clean_percentage),
+        'CTR': ('Click-Thru Rate (CTR)', clean_percentage),
+    }
+    for col, (raw_col, scalar) in checks.items():
+        np.testing.assert_array_equal(df[col].to_numpy(dtype='float64'), _expected(scalar, raw[raw_col]), err_msg=col)
+
+
+def test_integer_kernel_downcasts_only_when_values_fit():
+    assert clean_integer_series(pd.Series(['1,000', '2'])).dtype == 'int32'
+    assert clean_integer_series(pd.Series(['3,000,000,000'])).dtype == 'int64'
+    assert clean_integer_series(pd.Series([], dtype=object)).dtype == 'int32'
+
+
+def test_integer_kernel_truncates_toward_zero():
+    result = clean_integer_series(pd.Series(['2.9', '-2.9', 7.99]))
+    assert result.tolist() == [clean_integer('2.9'), clean_integer('-2.9'), clean_integer(7.99)] == [2, -2, 7]
@@ -0,0 +1,98 @@
+"""Report append: merging a newer Search Term Report into a session."""
+
+import pandas as pd
+import pytest
+
+from services.metrics_cube import build_metrics_cube, cube_row_count
+from services.parser import process_search_term_report
+from services.report_append import DEDUP_KEY, merge_report
+
+
+DATES = pd.date_range('2025-09-01', '2025-09-10', freq='D')
+
+
+@pytest.fixture(scope='module')
+def session(make_report) -> pd.DataFrame:
+    return process_search_term_report(make_report(DATES, rows_per_day=30, seed=1))
+
+
+def merged(result) -> pd.DataFrame:
+    return pd.concat([result.kept, result.added], ignore_index=True)
+
+
+def test_missing_optional_columns_are_filled(session, make_report):
+    raw = make_report(DATES[-1:] + pd.Timedelta(days=1), rows_per_day=20, seed=2)
+    raw = raw.drop(columns=['7 Day Total Units (#)', '7 Day Advertised SKU Units (#)', 'Currency'])
+    new_df = process_search_term_report(raw)
+
+    result = merge_report(session, build_metrics_cube(session), new_df)
+    assert list(result.added.columns) == list(session.columns)
+    assert result.added.dtypes.equals(session.dtypes)
+    # Metrics and integer columns count as 0; other columns are left empty
+    assert (result.added['Units'] == 0).all()
+    assert (result.added['7 Day Advertised SKU Units (#)'] == 0).all()
+    assert result.added['Currency'].isna().all()
+    assert result.replaced == 0 and len(result.added) == 20
+
+
+def test_overlapping_dates_are_restated(session, make_report):
+    # The latest pull of the last two days, covering some of the same terms
+    restated = session[session['Date'] >= DATES[-2]].copy()
+    restated['Spend'] = restated['Spend'] + 1
+    extra = process_search_term_report(make_report(DATES[-1:], rows_per_day=5, seed=3))
+    extra['Customer Search Term'] = [f'new term {i}' for i in range(len(extra))]
+    new_df = pd.concat([restated, extra], ignore_index=True)
+
+    result = merge_report(session, build_metrics_cube(session), new_df)
+    rows = merged(result)
+    deduped = new_df.drop_duplicates([col for col in DEDUP_KEY if col in new_df.columns], keep='last')
+    assert result.replaced == len(restated)
+    assert len(rows) == len(session) - len(restated) + len(deduped)
+    # The restated days carry the new report's values, the older days are untouched
+    recent = rows[rows['Date'] >= DATES[-2]]
+    assert recent['Spend'].sum() == pytest.approx(deduped['Spend'].sum())
+    expected = session[session['Date'] < DATES[-2]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(result.kept, expected)
+    assert cube_row_count(result.cube) == len(rows)
+
+
+def test_window_days_drops_old_rows(session, make_report):
+    new_df = process_search_term_report(make_report([DATES[-1] + pd.Timedelta(days=2)], rows_per_day=10, seed=4))
+
+    result = merge_report(session, build_metrics_cube(session), new_df, window_days=5)
+    rows = merged(result)
+    keep_from = DATES[-1] + pd.Timedelta(days=2 - 4)
+    assert rows['Date'].min() == keep_from
+    assert result.expired == int((session['Date'] < keep_from).sum())
+    assert len(rows) == len(session) - result.expired + len(new_df)
+    assert cube_row_count(result.cube) == len(rows)
+    assert result.cube['Date'].min() >= keep_from
+
+
+def test_window_days_applies_to_a_full_restatement(session):
+    new_df = session.copy()
+    new_df['Spend'] = new_df['Spend'] + 1
+
+    result = merge_report(session, build_metrics_cube(session), new_df, window_days=5)
+    keep_from = DATES[-1] - pd.Timedelta(days=4)
+    assert result.replaced == len(session) and result.kept.empty
+    assert result.added['Date'].min() == keep_from
+    assert result.expired == int((new_df['Date'] < keep_from).sum())
+    assert cube_row_count(result.cube) == len(result.added)
+
+
+def test_append_endpoint(client, upload, make_report):
+    session_id = upload(make_report(DATES, rows_per_day=30, seed=5))
+    latest = make_report(DATES[-2:], rows_per_day=20, seed=6).drop(columns=['7 Day Total Units (#)'])
+
+    response = client.post(
+        f'/api/upload/search-term-report/{session_id}/append',
+        params={'window_days': 7},
+        files={'file': ('latest.csv', latest.to_csv(index=False).encode())},
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['date_range'] == {'start': '2025-09-04', 'end': '2025-09-10'}
+
+    kpis = client.get(f'/api/analysis/kpis/{session_id}').json()
+    assert kpis['impressions'] > 0
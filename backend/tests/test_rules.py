@@ -0,0 +1,94 @@
+"""Rule DSL: compilation, evaluation, operand checks and the compile cache."""
+
+import pandas as pd
+import pytest
+
+from services import rules
+from services.rules import RuleError, Rule, compile_expression, evaluate_rules, first_matching_rule, load_rules
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Spend': [12.0, 3.0, 25.0, 0.0],
+        'Sales': [0.0, 10.0, 0.0, 0.0],
+        'Targeting': pd.Series(['b0abc12345', 'shoes', 'red shoes', None], dtype='category'),
+        'Match Type': ['BROAD', 'EXACT', 'PHRASE', 'BROAD'],
+    })
+
+
+def test_expression_compiles_to_mask(df):
+    mask = compile_expression('Spend >= 10 and Sales == 0 and not is_asin(Targeting)').evaluate(df)
+    assert mask.tolist() == [False, False, True, False]
+
+
+def test_parameters_columns_and_arithmetic(df):
+    mask = compile_expression("Spend > limit * 2 - 1 and Match_Type in ('BROAD', 'PHRASE')").evaluate(df, {'limit': 6})
+    assert mask.tolist() == [True, False, True, False]
+    assert compile_expression('-Spend < -5').evaluate(df).tolist() == [True, False, True, False]
+
+
+def test_rules_evaluate_in_one_pass_with_first_match(df):
+    masks = evaluate_rules(df, [Rule('bleeding', 'Spend >= 10 and Sales == 0'), Rule('any_spend', 'Spend > 0')])
+    assert first_matching_rule(masks).tolist() == ['bleeding', 'any_spend', 'bleeding', None]
+
+
+@pytest.mark.parametrize('expression', [
+    'contains(Targeting, "ab" * 100000000)',
+    '"ab" + "cd" == Targeting',
+    '(1, 2) * 3 == Spend',
+    '-"abc" == Targeting',
+])
+def test_arithmetic_rejects_non_numeric_constants(df, expression):
+    with pytest.raises(RuleError):
+        evaluate_rules(df, [Rule('r', expression)])
+
+
+@pytest.mark.parametrize('expression', ['Targeting * 100000000 == Spend', 'Match_Type + Match_Type == Spend'])
+def test_arithmetic_rejects_text_columns(df, expression):
+    with pytest.raises(RuleError, match='numeric'):
+        evaluate_rules(df, [Rule('r', expression)])
+
+
+def test_arithmetic_rejects_text_parameters(df):
+    with pytest.raises(RuleError, match='numeric'):
+        evaluate_rules(df, [Rule('r', 'Spend > limit * 2')], params={'limit': 'x' * 10})
+
+
+def test_invalid_rules_fail_to_load():
+    with pytest.raises(RuleError):
+        load_rules([{'name': 'r', 'expression': 'Spend >'}])
+    with pytest.raises(RuleError):
+        load_rules([{'name': 'r', 'expression': 'Spend ** 2 > 1'}])
+    with pytest.raises(RuleError):
+        load_rules([{'name': 'r', 'expression': 'Spend > 1'}, {'name': 'r', 'expression': 'Sales > 1'}])
+
+
+def test_compile_cache_is_bounded_lru(monkeypatch):
+    monkeypatch.setattr(rules, 'COMPILED_CACHE_SIZE', 3)
+    monkeypatch.setattr(rules, '_compiled', type(rules._compiled)())
+    first = compile_expression('Spend > 0')
+    oldest = compile_expression('Spend > 1')
+    compile_expression('Spend > 2')
+    assert compile_expression('Spend > 0') is first  # A hit refreshes recency
+    compile_expression('Spend > 3')
+    assert len(rules._compiled) == 3
+    assert oldest.hash not in rules._compiled
+    assert first.hash in rules._compiled
+
+
+def test_rules_endpoint_rejects_string_arithmetic(client, upload, sample_report):
+    session_id = upload(sample_report)
+    response = client.post(
+        f'/api/analysis/rules/{session_id}',
+        json={'rules': [{'name': 'bomb', 'expression': 'contains(Targeting, "ab" * 100000000 * 5)'}]},
+    )
+    assert response.status_code == 400
+    assert 'numeric' in response.json()['detail']
+
+    response = client.post(
+        f'/api/analysis/rules/{session_id}',
+        json={'rules': [{'name': 'spend', 'expression': 'Spend > 0 and Sales == 0'}]},
+    )
+    assert response.status_code == 200
+    assert response.json()['total_rows'] == len(sample_report)
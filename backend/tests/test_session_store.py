@@ -0,0 +1,349 @@
+"""Session stores: memory, disk, tiered and Redis (against a local stand-in client)."""
+
+import fnmatch
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import session_store
+from services.session_store import (
+    DiskSessionStore,
+    MemorySessionStore,
+    RedisSessionStore,
+    TieredSessionStore,
+)
+
+
+class FakeRedis:
+    """In-process stand-in for the Redis client methods RedisSessionStore uses."""
+
+    def __init__(self):
+        self.data = {}  # name -> (value, expires_at or None)
+
+    def _live(self, name):
+        entry = self.data.get(name)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[name]
+            return None
+        return entry
+
+    def get(self, name):
+        entry = self._live(name)
+        return None if entry is None else entry[0]
+
+    def set(self, name, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.data[name] = (value, time.time() + ex if ex else None)
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+    def exists(self, name):
+        return int(self._live(name) is not None)
+
+    def expire(self, name, seconds):
+        entry = self._live(name)
+        if entry is not None:
+            self.data[name] = (entry[0], time.time() + seconds)
+
+    def scan_iter(self, match='*'):
+        for name in list(self.data):
+            if self._live(name) is not None and fnmatch.fnmatchcase(name, match):
+                yield name.encode('utf-8')
+
+
+@pytest.fixture(params=['memory', 'disk', 'tiered', 'redis'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore()
+    if request.param == 'disk':
+        return DiskSessionStore(str(tmp_path))
+    if request.param == 'tiered':
+        return TieredSessionStore(MemorySessionStore(max_bytes=50_000), DiskSessionStore(str(tmp_path)))
+    return RedisSessionStore(FakeRedis())
+
+
+@pytest.fixture
+def report() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Campaign Name': pd.Categorical(rng.choice(['A', 'B', 'C'], 200)),
+        'Customer Search Term': [f'term {i}' for i in range(200)],
+        'Date': pd.date_range('2025-01-01', periods=200, freq='h'),
+        'Clicks': rng.integers(0, 10, 200).astype('int32'),
+        'Spend': rng.uniform(0, 5, 200),
+    })
+
+
+def test_round_trip_and_dict_access(store, report):
+    store['s1'] = report
+    pd.testing.assert_frame_equal(store['s1'], report)
+    assert 's1' in store and 'missing' not in store
+    assert store.get('missing') is None
+    with pytest.raises(KeyError):
+        store['missing']
+    assert list(store.keys()) == ['s1']
+
+
+def test_non_dataframe_values_fall_back_to_pickle(store):
+    progress = {'status': 'processing', 'rows_processed': 10}
+    store['p1'] = progress
+    assert store['p1'] == progress
+    mixed = pd.DataFrame({'a': [1, 'x', 2.5]})  # Arrow can't store mixed object columns
+    store['m1'] = mixed
+    assert store['m1']['a'].tolist() == [1, 'x', 2.5]
+
+
+def test_delete_and_version(store, report):
+    assert store.version('s1') is None
+    store['s1'] = report
+    first = store.version('s1')
+    store['s1'] = report.head(10)
+    second = store.version('s1')
+    if first is not None:
+        assert second != first
+    assert len(store['s1']) == 10
+    store.delete('s1')
+    store.delete('s1')  # Deleting a missing key is a no-op
+    assert 's1' not in store and store.version('s1') is None
+
+
+def test_unsafe_keys_are_rejected(store, report):
+    if isinstance(store, (MemorySessionStore, RedisSessionStore)):
+        pytest.skip('keys are only file names for the disk tier')
+    with pytest.raises(ValueError):
+        store['../escape'] = report
+
+
+@pytest.mark.parametrize('first_chunk', ['valued', 'blank', 'blank_object', 'blank_float'])
+def test_put_stream_merges_chunk_categories(store, report, first_chunk):
+    chunks = [report.iloc[:100].copy(), report.iloc[100:].copy()]
+    chunks[0]['Campaign Name'] = chunks[0]['Campaign Name'].astype(str).astype('category')
+    chunks[1]['Campaign Name'] = chunks[1]['Campaign Name'].astype(str).replace('A', 'Z').astype('category')
+    if first_chunk != 'valued':
+        # No values (so no categories) in the first chunk, e.g. a blank Portfolio column
+        blank = {'blank': [None] * 100, 'blank_object': pd.Series([None] * 100, dtype=object),
+                 'blank_float': [np.nan] * 100}[first_chunk]
+        chunks[0]['Campaign Name'] = pd.Categorical(blank)
+    rows = store.put_stream('s1', chunks)
+    stored = store['s1']
+    assert rows == len(stored) == 200
+    assert isinstance(stored['Campaign Name'].dtype, pd.CategoricalDtype)
+    assert list(stored['Campaign Name'].cat.categories) == sorted(set(stored['Campaign Name'].dropna()))
+    expected = pd.concat(chunks, ignore_index=True)
+    assert stored['Campaign Name'].astype(object).fillna('').tolist() == expected['Campaign Name'].astype(object).fillna('').tolist()
+    pd.testing.assert_series_equal(stored['Spend'], expected['Spend'])
+
+
+def test_link_shares_value_and_survives_source_changes(store, report):
+    store['dataset'] = report
+    store.link('dataset', 'session')
+    pd.testing.assert_frame_equal(store['session'], report)
+
+    # Replacing or deleting the source leaves the linked key intact
+    store['dataset'] = report.head(5)
+    assert len(store['session']) == len(report)
+    store.delete('dataset')
+    pd.testing.assert_frame_equal(store['session'], report)
+
+    with pytest.raises(KeyError):
+        store.link('missing', 'other')
+
+
+def test_disk_link_is_a_hard_link_counted_once_for_eviction(tmp_path, report):
+    store = DiskSessionStore(str(tmp_path))
+    store['dataset'] = report
+    store.link('dataset', 'session')
+    dataset = os.stat(tmp_path / 'dataset.arrow')
+    session = os.stat(tmp_path / 'session.arrow')
+    assert (dataset.st_ino, dataset.st_nlink) == (session.st_ino, 2)
+
+    # A budget that fits the file once (but not twice) keeps both links
+    store.max_bytes = int(dataset.st_size * 1.5)
+    store._evict()
+    assert 'dataset' in store and 'session' in store
+
+    # Under budget pressure the shared file is only freed with its last link
+    store.max_bytes = 1
+    store['new'] = report.head(1)
+    store._evict(keep=str(tmp_path / 'new.arrow'))
+    assert 'dataset' not in store and 'session' not in store and 'new' in store
+
+
+def test_disk_writes_replace_atomically(tmp_path, report):
+    store = DiskSessionStore(str(tmp_path))
+    store['s1'] = report
+    reader = store['s1']  # Memory-mapped view of the current file
+
+    def failing_chunks():
+        yield report.head(3)
+        raise RuntimeError('upload aborted')
+
+    with pytest.raises(RuntimeError):
+        store.put_stream('s1', failing_chunks())
+    # The failed write left no partial file and the old value in place
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+    pd.testing.assert_frame_equal(store['s1'], report)
+
+    # A replaced file stays readable through frames opened before the write
+    store['s1'] = report.head(1)
+    pd.testing.assert_frame_equal(reader, report)
+    assert len(store['s1']) == 1
+
+
+def test_disk_store_is_shared_between_instances(tmp_path, report):
+    writer = DiskSessionStore(str(tmp_path))
+    reader = DiskSessionStore(str(tmp_path))
+    writer['s1'] = report
+    pd.testing.assert_frame_equal(reader['s1'], report)
+    writer['s1'] = report.head(2)
+    assert len(reader['s1']) == 2  # Replacement detected from the file identity
+
+
+def test_disk_version_changes_when_a_replacement_reuses_the_inode(tmp_path, report, monkeypatch):
+    store = DiskSessionStore(str(tmp_path))
+    real_stat = os.stat
+
+    def reused_inode(path, *args, **kwargs):
+        # A filesystem that hands the freed inode to the next file, within one ctime tick
+        stat = real_stat(path, *args, **kwargs)
+        fields = list(stat[:10])
+        fields[1] = 1  # st_ino
+        return os.stat_result(fields, {'st_mtime': stat.st_mtime, 'st_mtime_ns': stat.st_mtime_ns, 'st_ctime_ns': 0})
+
+    monkeypatch.setattr(session_store.os, 'stat', reused_inode)
+    store['s1'] = report
+    first = store.version('s1')
+    store['s1'] = report.assign(Spend=report['Spend'] + 1)  # Same size
+    assert store.version('s1') != first
+
+
+def test_disk_version_survives_access_touches(tmp_path, report):
+    store = DiskSessionStore(str(tmp_path))
+    store['s1'] = report
+    first = store.version('s1')
+    past = time.time() - store.TOUCH_INTERVAL - 10
+    os.utime(tmp_path / 's1.arrow', (past, past))
+    store.get_value('s1')  # Touches the mtime (and so the ctime)
+    assert os.stat(tmp_path / 's1.arrow').st_mtime > past
+    assert store.version('s1') == first
+
+
+def test_memory_ttl_and_size_eviction(report, monkeypatch):
+    store = MemorySessionStore(ttl_seconds=60)
+    store['old'] = report
+    now = time.time()
+    monkeypatch.setattr(session_store.time, 'time', lambda: now + 120)
+    assert 'old' not in store and store.keys() == []
+
+    monkeypatch.undo()
+    size = session_store.estimate_size(report)
+    store = MemorySessionStore(max_bytes=int(size * 2.5))
+    for key in ('a', 'b', 'c'):
+        store[key] = report
+    assert store.keys() == ['b', 'c']
+    store['b']  # Refresh recency
+    store['d'] = report
+    assert store.keys() == ['b', 'd']
+
+
+def test_disk_ttl_eviction(tmp_path, report):
+    store = DiskSessionStore(str(tmp_path), ttl_seconds=60)
+    store['old'] = report
+    store['fresh'] = report
+    past = time.time() - 120
+    os.utime(tmp_path / 'old.arrow', (past, past))
+    assert 'old' not in store and store.version('old') is None
+    assert store.keys() == ['fresh']
+
+
+def test_disk_size_eviction_removes_least_recently_used(tmp_path, report):
+    store = DiskSessionStore(str(tmp_path))
+    store['a'] = report
+    size = os.path.getsize(tmp_path / 'a.arrow')
+    store.max_bytes = int(size * 2.5)
+    store['b'] = report
+    past = time.time() - 1000
+    os.utime(tmp_path / 'a.arrow', (past, past))
+    store['c'] = report
+    store._evict()
+    assert sorted(store.keys()) == ['b', 'c']
+
+
+def test_disk_eviction_scan_is_throttled(tmp_path, report, monkeypatch):
+    store = DiskSessionStore(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    for i in range(20):
+        store[f'session{i}'] = report
+    scans = []
+    real_evict = store._evict
+    monkeypatch.setattr(store, '_evict', lambda keep=None: scans.append(keep) or real_evict(keep))
+
+    # Small progress-style writes don't scan the directory
+    for i in range(200):
+        store['progress'] = {'rows_processed': i}
+    assert scans == []
+
+    # Writing a large share of the budget does
+    store['big'] = pd.DataFrame({'x': np.arange(200_000, dtype='float64')})
+    assert len(scans) == 1
+
+    # So does the first write after the interval
+    store._last_evict -= store.EVICT_INTERVAL
+    store['progress'] = {'rows_processed': -1}
+    assert len(scans) == 2
+
+
+def test_tiered_store_spills_and_promotes(tmp_path, report):
+    size = session_store.estimate_size(report)
+    store = TieredSessionStore(MemorySessionStore(max_bytes=int(size * 1.5)), DiskSessionStore(str(tmp_path)))
+    store['a'] = report
+    store['b'] = report  # Evicts 'a' from memory, spilling it to disk
+    assert 'a' not in store.memory and 'a' in store.disk
+    pd.testing.assert_frame_equal(store['a'], report)
+    assert 'a' in store.memory  # Promoted on read
+    assert sorted(store.keys()) == ['a', 'b']
+    store.delete('a')
+    assert 'a' not in store and 'a' not in store.disk
+
+
+def test_redis_ttl_and_version_keys(report):
+    client = FakeRedis()
+    store = RedisSessionStore(client, ttl_seconds=60)
+    store['s1'] = report
+    assert store.keys() == ['s1']  # Version tokens are not listed
+    version = store.version('s1')
+    store['s1'] = report
+    assert store.version('s1') != version
+    for name, (value, _) in list(client.data.items()):
+        client.data[name] = (value, time.time() - 1)
+    assert 's1' not in store and store.version('s1') is None
+
+
+def test_streamed_upload_with_blank_first_chunk(client, upload, make_report, monkeypatch):
+    from functools import partial
+    from routers import upload as upload_router
+
+    monkeypatch.setattr(
+        upload_router, 'iter_search_term_chunks', partial(upload_router.iter_search_term_chunks, chunksize=50)
+    )
+    report = make_report(pd.date_range('2025-09-01', periods=5), rows_per_day=40)
+    report['Portfolio name'] = [None] * 120 + [f'Portfolio {i % 3}' for i in range(80)]
+    stored = upload_router.get_session(upload(report))
+    assert stored['Portfolio'].astype(object).fillna('').tolist() == report['Portfolio name'].fillna('').tolist()
+    assert isinstance(stored['Portfolio'].dtype, pd.CategoricalDtype)
+
+    # Appending to a session whose Portfolio column is blank throughout
+    blank = make_report(pd.date_range('2025-09-01', periods=2), rows_per_day=40, seed=1).assign(**{'Portfolio name': None})
+    session_id = upload(blank)
+    latest = make_report([pd.Timestamp('2025-09-03')], rows_per_day=40, seed=2)
+    response = client.post(
+        f'/api/upload/search-term-report/{session_id}/append',
+        files={'file': ('latest.csv', latest.to_csv(index=False).encode())},
+    )
+    assert response.status_code == 200, response.text
+    stored = upload_router.get_session(session_id)
+    assert stored['Portfolio'].notna().sum() == len(latest)
@@ -0,0 +1,260 @@
+"""Streaming XLSX reader: parity with pd.read_excel."""
+
+import zipfile
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from services.parser import read_xlsx
+from services.xlsx_reader import XlsxWorkbook, column_index
+
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet2.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="/xl/worksheets/sheet2.xml"/>'
+    '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId4" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/></Relationships>'
+)
+
+# Style 1: built-in date format 14; style 2: custom date-time format; style 3: custom number format
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/>'
+    '<numFmt numFmtId="165" formatCode="#,##0.00"/></numFmts>'
+    '<fonts count="1"><font/></fonts><fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0"/><xf numFmtId="14"/><xf numFmtId="164"/><xf numFmtId="165"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+# Plain, empty, rich text (runs) and rich text with a phonetic hint
+SHARED_STRINGS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<si><t>Campaign Name</t></si>'
+    '<si><t>Spend</t></si>'
+    '<si><t>Date</t></si>'
+    '<si><t>Campaign A</t></si>'
+    '<si><t></t></si>'
+    '<si><r><rPr><b/></rPr><t>Rich</t></r><r><t xml:space="preserve"> Text</t></r></si>'
+    '<si><r><t>Kanji</t></r><rPh sb="0" eb="1"><t>hint</t></rPh></si>'
+    '<si><t>Other</t></si>'
+    '</sst>'
+)
+
+
+def sheet_xml(rows: str, dimension: str = '') -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'{dimension}<sheetData>{rows}</sheetData></worksheet>'
+    )
+
+
+def package(rows: str, date1904: bool = False, dimension: str = '') -> bytes:
+    """Two-sheet workbook whose first sheet has the given <row> elements."""
+    properties = '<workbookPr date1904="1"/>' if date1904 else '<workbookPr/>'
+    workbook = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'{properties}<sheets><sheet name="Report" sheetId="1" r:id="rId1"/>'
+        '<sheet name="Other" sheetId="2" r:id="rId2"/></sheets></workbook>'
+    )
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', ROOT_RELS)
+        archive.writestr('xl/workbook.xml', workbook)
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', STYLES)
+        archive.writestr('xl/sharedStrings.xml', SHARED_STRINGS)
+        archive.writestr('xl/worksheets/sheet1.xml', sheet_xml(rows, dimension))
+        archive.writestr('xl/worksheets/sheet2.xml', sheet_xml('<row r="1"><c r="A1" t="s"><v>7</v></c></row>'))
+    return output.getvalue()
+
+
+def openpyxl_package(rows: list, epoch=None) -> bytes:
+    workbook = Workbook()
+    if epoch is not None:
+        workbook.epoch = epoch
+    sheet = workbook.active
+    for r, values in enumerate(rows, start=1):
+        for c, value in enumerate(values, start=1):
+            if value is not None:
+                sheet.cell(row=r, column=c, value=value)
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+def assert_parity(content: bytes, usecols=None) -> pd.DataFrame:
+    expected = pd.read_excel(BytesIO(content), usecols=usecols)
+    actual = read_xlsx(content, usecols)
+    pd.testing.assert_frame_equal(actual, expected)
+    return actual
+
+
+# Every cell type the reader converts, with row gaps and cells without references
+CELL_TYPES = (
+    '<row r="1">'
+    '<c r="A1" t="s"><v>2</v></c><c r="B1" t="s"><v>0</v></c><c r="C1" t="inlineStr"><is><t>Search Term</t></is></c>'
+    '<c r="D1" t="s"><v>1</v></c><c r="E1" t="str"><v>Orders</v></c><c r="F1" t="s"><v>7</v></c>'
+    '<c r="G1" t="s"><v>5</v></c><c r="H1" t="s"><v>6</v></c>'
+    '</row>'
+    '<row r="2">'
+    '<c r="A2" s="1"><v>45901</v></c><c r="B2" t="s"><v>3</v></c><c r="C2" t="inlineStr"><is><t>shoes</t></is></c>'
+    '<c r="D2" s="3"><v>12.5</v></c><c r="E2"><v>3</v></c><c r="F2" t="b"><v>1</v></c>'
+    '<c r="G2" t="s"><v>5</v></c><c r="H2" t="e"><v>#N/A</v></c>'
+    '</row>'
+    '<row r="4">'
+    '<c r="A4" s="2"><v>45902.75</v></c><c r="B4" t="s"><v>4</v></c>'
+    '<c r="C4" t="inlineStr"><is><r><t>red</t></r><r><t xml:space="preserve"> boots</t></r></is></c>'
+    '<c r="D4"><v>4.0</v></c><c r="E4" t="str"><f>1+1</f><v>2</v></c><c r="F4" t="b"><v>0</v></c>'
+    '<c r="G4" t="s"><v>6</v></c><c r="H4" t="e"><v>#DIV/0!</v></c>'
+    '</row>'
+    '<row r="5">'
+    '<c r="A5" s="1"><v>45903</v></c><c><v>1E-3</v></c><c t="inlineStr"><is><t>x</t></is></c>'
+    '<c r="F5"><v>7</v></c><c/>'
+    '</row>'
+    '<row r="6"></row>'
+)
+
+
+def test_cell_types_match_read_excel():
+    actual = assert_parity(package(CELL_TYPES))
+    assert list(actual.columns) == ['Date', 'Campaign Name', 'Search Term', 'Spend', 'Orders', 'Other', 'Rich Text', 'Kanji']
+    assert actual['Date'].tolist() == [
+        pd.Timestamp('2025-09-01'), pd.NaT, pd.Timestamp('2025-09-02 18:00'), pd.Timestamp('2025-09-03')
+    ]
+    # Rich text runs are joined (phonetic hints dropped); row 3 is missing from the XML
+    assert actual['Rich Text'].fillna('-').tolist() == ['Rich Text', '-', 'Kanji', '-']
+    assert actual['Search Term'].fillna('-').tolist() == ['shoes', '-', 'red boots', 'x']
+    # Error cells read as missing
+    assert actual['Kanji'].isna().all()
+
+
+def test_1904_epoch_dates():
+    content = package(CELL_TYPES, date1904=True)
+    actual = assert_parity(content)
+    assert actual['Date'][0] == pd.Timestamp('2029-09-02')
+
+
+def test_openpyxl_workbook_values():
+    rows = [
+        ['Date', 'Campaign Name', 'Spend', 'Orders', 'Active', 'Note'],
+        [datetime(2025, 9, 1), 'Campaign <A> & "B"', 1.25, 3, True, None],
+        [datetime(2025, 9, 2, 13, 30), 'Campaign B', 2.0, None, False, '=not a formula'],
+        [None, None, None, None, None, None],
+        [datetime(2025, 9, 3), 'Campaign C', 0.1, 7, True, 'x'],
+    ]
+    assert_parity(openpyxl_package(rows))
+    assert_parity(openpyxl_package(rows, epoch=CALENDAR_MAC_1904))
+
+
+@pytest.mark.parametrize('rows', [
+    [['a', 'b'], [1, 2], [None, None], [None, None], [3, 4]],  # Blank interior rows
+    [['a', 'b'], [1, 2], [None, None]],  # Trailing blank row
+    [['a', None, 'c'], [1, 2, 3]],  # Blank header cell
+    [[None, 'b', None, 'd'], [1, 2, 3, 4]],  # Sparse header
+    [['a', 'b'], [1, 2, None, None], [None, None, None, 5], [3, None, 4]],  # Values past the header
+    [['a', 'b', 'x'], [1, 2, 3], [None, None, 9], [4, 5, 6]],  # Row with only an unused column
+    [['a', 'b'], ['', 2], [3, '']],  # Empty strings
+    [['a', 'a', 'b', 'a.1'], [1, 2, 3, 4]],  # Duplicate names
+])
+@pytest.mark.parametrize('usecols', [None, lambda name: name in ('a', 'b', 'd', 'Unnamed: 3')])
+def test_layout_matches_read_excel(rows, usecols):
+    assert_parity(openpyxl_package(rows), usecols)
+
+
+def test_usecols_on_cell_types():
+    content = package(CELL_TYPES)
+    actual = assert_parity(content, lambda name: name in ('Campaign Name', 'Spend', 'Other'))
+    assert list(actual.columns) == ['Campaign Name', 'Spend', 'Other']
+
+
+def test_max_rows_and_row_count():
+    content = package(CELL_TYPES)
+    with XlsxWorkbook(content) as workbook:
+        assert workbook.sheet_names == ['Report', 'Other']
+        header, rows = workbook.read_rows('Report', max_rows=2)
+        # Row 3 is missing from the XML: an empty row, as in read_excel
+        assert len(rows) == 2 and rows[1] == [''] * len(header)
+        header, rows = workbook.read_rows('Report', max_rows=10)
+        assert len(rows) == 4
+        assert workbook.row_count('Report') == 4  # Row tags below the header (no dimension)
+
+    with XlsxWorkbook(package(CELL_TYPES, dimension='<dimension ref="A1:H120"/>')) as workbook:
+        assert workbook.row_count('Report') == 119
+
+    with XlsxWorkbook(content) as workbook:
+        header, rows = workbook.read_rows('Other')
+        assert header == ['Other'] and rows == []
+
+
+def test_header_is_first_non_empty_row():
+    # Documented difference: read_excel would take the empty first row as the header
+    content = openpyxl_package([[None, None], ['a', 'b'], [1, 2]])
+    with XlsxWorkbook(content) as workbook:
+        assert workbook.read_rows('Sheet') == (['a', 'b'], [[1, 2]])
+
+
+def test_column_index():
+    assert [column_index(letters) for letters in ('A', 'Z', 'AA', 'AB', 'XFD')] == [0, 25, 26, 27, 16383]
+
+
+def test_validate_and_upload_workbook_with_unnamed_headers(client, upload, make_report):
+    report = make_report(pd.date_range('2025-09-01', periods=2), rows_per_day=10)
+    report.insert(3, None, 'x')  # A blank header cell
+    report.insert(5, 2025, 1)  # A numeric header cell
+    rows = [list(report.columns)] + report.astype(object).where(report.notna(), None).values.tolist()
+    content = openpyxl_package(rows)
+
+    response = client.post('/api/upload/validate', files={'file': ('report.xlsx', content)})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body['valid'] and body['row_count'] == len(report)
+    assert body['columns'][3] == 'Unnamed: 3' and body['columns'][5] == 2025
+
+    response = client.get(f"/api/analysis/kpis/{upload(content, 'report.xlsx')}")
+    assert response.status_code == 200 and response.json()['clicks'] == int(report['Clicks'].sum())
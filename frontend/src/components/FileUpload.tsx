@@ -61,6 +61,8 @@ export default function FileUpload({ onUploadComplete, onSessionCreated, autoNav
             'text/csv': ['.csv'],
             'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': ['.xlsx'],
             'application/vnd.ms-excel': ['.xls'],
+            'application/gzip': ['.gz'],
+            'application/zip': ['.zip'],
         },
         maxFiles: 1,
         disabled: uploading,
@@ -119,7 +121,7 @@ export default function FileUpload({ onUploadComplete, onSessionCreated, autoNav
                                     {isDragActive ? 'Drop your file here' : 'Drag & drop your Search Term Report'}
                                 </p>
                                 <p className="text-sm text-[var(--foreground-muted)] mt-1">
-                                    or click to browse (CSV, XLSX)
+                                    or click to browse (CSV, XLSX, .gz, .zip)
                                 </p>
                             </div>
                         </>